@@ -1,18 +1,28 @@
 from config import ALPACA_CONFIG
+from custom_alpaca import CustomAlpaca
 from datetime import datetime
-from lumibot.brokers import Alpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import numpy as np
 import pandas as pd
 import logging
-import talib
+from indicator_cache import cached, cached_ema
+from indicators import atr, macd, rsi
 import alpaca_trade_api as tradeapi
+from trade_journal import TradeJournaling
+from risk_aggregator import RiskChecked
+from order_pipeline import AsyncOrders, order_key
+from event_bus import LiveEvents
+from signal_store import SignalRecording
+from history_batch import HistoryBatch
+import sampling_profiler
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class Trend(Strategy):
+class Trend(LiveEvents, SignalRecording, AsyncOrders, RiskChecked, TradeJournaling, Strategy):
+    track_fills = True  # Bracket entries and exits are polled from the broker, see on_api_fill
+
     def initialize(self):
         self.symbols = ["GME", "MRNA"]  # List of tickers
         self.start = "2022-01-01"
@@ -29,8 +39,8 @@ class Trend(Strategy):
         self.macd_long = 26  # MACD long-term EMA
         self.macd_signal = 9  # MACD signal line
 
-    def create_bracket_order(self, symbol, qty, side, take_profit_price, stop_loss_price):
-        """Create a bracket order with stop loss and take profit, handle errors."""
+    def create_bracket_order(self, symbol, qty, side, take_profit_price, stop_loss_price, key=None, context=None):
+        """Queue a bracket order with stop loss and take profit; returns its client_order_id."""
         try:
             logging.info(f"Creating {side.upper()} bracket order for {symbol}: Qty={qty}, "
                          f"TP={take_profit_price}, SL={stop_loss_price}")
@@ -45,35 +55,34 @@ class Trend(Strategy):
                 "take_profit": {"limit_price": str(take_profit_price)},
                 "stop_loss": {"stop_price": str(stop_loss_price)}
             }
-            created_order = self.broker.api.submit_order(**order)
-            return created_order
+            return self.queue_order(order, key=key, context=context)
         except Exception as e:
             logging.error(f"Error creating order for {symbol}: {e}")
             return None
 
-    def calculate_atr(self, high, low, close, period=14):
-        """Calculate the Average True Range (ATR) using talib."""
-        return talib.ATR(high, low, close, timeperiod=period)
-
-    def calculate_rsi(self, close, period=14):
-        """Calculate the Relative Strength Index (RSI) using talib."""
-        return talib.RSI(close, timeperiod=period)
+    def on_order_ack(self, ack):
+        super().on_order_ack(ack)
+        if ack.status != "accepted":
+            return
+        # Orders sent straight to the broker API bypass lumibot's order events, so journal them here
+        self.journal_order(ack.symbol, ack.side, ack.qty, type="bracket",
+                           order_id=getattr(ack.order, "id", None), status="submitted")
 
-    def calculate_macd(self, close, fastperiod=12, slowperiod=26, signalperiod=9):
-        """Calculate MACD and Signal Line using talib."""
-        macd, macdsignal, macdhist = talib.MACD(close, fastperiod=fastperiod, slowperiod=slowperiod, signalperiod=signalperiod)
-        return macd, macdsignal
+    def on_api_fill(self, order, qty, price):
+        super().on_api_fill(order, qty, price)
+        # The entry and whichever of the take-profit and stop-loss legs fills, at the broker's fill price
+        self.journal_fill(order.symbol, order.side, qty, price, order_id=order.id)
+        self.record_fill(order.symbol, order.side, qty, price)
 
     def on_trading_iteration(self):
+        self.process_order_acks()
+        # 15-minute bars for every symbol in as few multi-symbol requests as possible
+        history = HistoryBatch(self.broker.client, self.timeframe)
+        history.request_all(self.symbols, start=datetime.strptime(self.start, "%Y-%m-%d").astimezone())
+        history.fetch(end=datetime.now().astimezone())
         for symbol in self.symbols:
             try:
-                # Fetch 15-minute bar data
-                bars = self.broker.api.get_bars(
-                    symbol=symbol,
-                    timeframe=self.timeframe,
-                    start=datetime.strptime(self.start, "%Y-%m-%d"),
-                    end=datetime.now()
-                )
+                bars = history.get(symbol)
 
                 if bars.empty:
                     logging.info(f"No historical data found for {symbol}")
@@ -81,16 +90,20 @@ class Trend(Strategy):
 
                 # Convert the bar data to a DataFrame
                 stock_data = bars.df
-                stock_data.set_index('timestamp', inplace=True)
+                if 'timestamp' in stock_data.columns:
+                    stock_data.set_index('timestamp', inplace=True)
 
                 # Apply EMAs over the aggregated 5-minute data
-                stock_data[f'{self.ema_short}-period'] = stock_data['close'].ewm(span=self.ema_short, adjust=False).mean()
-                stock_data[f'{self.ema_long}-period'] = stock_data['close'].ewm(span=self.ema_long, adjust=False).mean()
+                stock_data[f'{self.ema_short}-period'] = cached_ema(symbol, "15min", stock_data, self.ema_short)
+                stock_data[f'{self.ema_long}-period'] = cached_ema(symbol, "15min", stock_data, self.ema_long)
                 
-                # Calculate technical indicators using talib
-                stock_data['ATR'] = self.calculate_atr(stock_data['high'], stock_data['low'], stock_data['close'])
-                stock_data['RSI'] = self.calculate_rsi(stock_data['close'])
-                stock_data['MACD'], stock_data['Signal_Line'] = self.calculate_macd(stock_data['close'])
+                # Calculate technical indicators with talib's definitions (Wilder smoothing, SMA-seeded MACD)
+                stock_data['ATR'] = cached(symbol, "15min", "atr_talib", (14,), stock_data,
+                                           lambda d: atr(d['high'], d['low'], d['close'], 14, method="wilder"))
+                stock_data['RSI'] = cached(symbol, "15min", "rsi_talib", (14,), stock_data,
+                                           lambda d: rsi(d['close'], 14, method="wilder"))
+                stock_data['MACD'], stock_data['Signal_Line'], _ = cached(symbol, "15min", "macd_talib", (12, 26, 9), stock_data,
+                                                                          lambda d: macd(d['close'], 12, 26, 9, method="talib"))
 
                 # Print out the data used for decision-making
                 logging.info(f"{symbol} data for decision:\n{stock_data.tail()}")
@@ -114,15 +127,21 @@ class Trend(Strategy):
 
                 signal = stock_data.iloc[-1]['Signal']
                 logging.info(f"{symbol}: Detected Signal = {signal}")
+                self.publish_signal(symbol, signal, price=float(stock_data.iloc[-1]['close']))
+                self.record_signal(symbol, signal, stock_data.iloc[-1])
+                self.journal_mark(symbol, stock_data.iloc[-1]['close'])
 
                 if signal:
-                    open_orders = self.broker.api.get_orders()
+                    open_orders = self.broker.client.get_orders()
                     if any(o.symbol == symbol for o in open_orders):
                         logging.info(f"Skipping {symbol}, open orders found.")
                         continue  # Skip if there are open orders for this symbol
 
                     entry_price = stock_data.iloc[-1]['close']
                     atr_value = stock_data.iloc[-1]['ATR']
+                    self.mark_price(symbol, entry_price)
+                    if not self.risk_allows(symbol, signal.lower(), self.shares_per_trade, entry_price):
+                        continue
                     if signal == 'BUY':
                         stop_loss_price = round(entry_price - (self.atr_multiplier * atr_value), 2)
                         take_profit_price = round(entry_price + (self.atr_multiplier * atr_value * self.risk_reward_ratio), 2)
@@ -133,15 +152,19 @@ class Trend(Strategy):
                     # Log order details before submission
                     logging.info(f"Order Details - {symbol}: TP at {take_profit_price}, SL at {stop_loss_price}")
 
-                    order = self.create_bracket_order(symbol, self.shares_per_trade, signal.lower(), take_profit_price, stop_loss_price)
+                    # Keyed on the signal bar, so re-evaluating the same bar can't place a second order
+                    key = order_key(self.name, symbol, signal, stock_data.index[-1])
+                    order = self.create_bracket_order(symbol, self.shares_per_trade, signal.lower(), take_profit_price, stop_loss_price,
+                                                      key=key)
                     if order:
-                        logging.info(f"{signal} order submitted for {symbol} with TP at {take_profit_price} and SL at {stop_loss_price}")
+                        logging.info(f"{signal} order queued for {symbol} with TP at {take_profit_price} and SL at {stop_loss_price}")
             except Exception as e:
                 logging.error(f"Error processing {symbol}: {e}")
 
 if __name__ == "__main__":
-    broker = Alpaca(ALPACA_CONFIG)
+    broker = CustomAlpaca(ALPACA_CONFIG)
     strategy = Trend(broker=broker)
     bot = Trader()
     bot.add_strategy(strategy)
+    sampling_profiler.install("5min_gldn")
     bot.run_all()
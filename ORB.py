@@ -1,18 +1,27 @@
 from config import ALPACA_CONFIG
 from datetime import datetime
 from lumibot.backtesting import YahooDataBacktesting
-from lumibot.brokers import Alpaca
+from custom_alpaca import CustomAlpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import numpy as np
 import pandas as pd
 import logging
+from indicator_cache import cached_ema
+from trade_journal import TradeJournaling
+from risk_aggregator import RiskChecked
+from bar_scheduler import BarAligned
+from event_bus import LiveEvents
+from signal_store import SignalRecording
+from history_batch import BatchedHistory
+import sampling_profiler
 
 
-class OpenRangeBreakout(Strategy):
+class OpenRangeBreakout(LiveEvents, SignalRecording, BarAligned, RiskChecked, BatchedHistory, TradeJournaling, Strategy):
     def initialize(self):
         self.tickers = ["GME", "MRNA"]  # List of tickers
-        self.sleeptime = "1S"
+        self.sleeptime = "1S"  # First iteration only; schedule_next_iteration() sets the rest
+        self.bar_timeframe = "5min"  # Wake when a bar of this timeframe closes
         self.ema_short = 9  # 9-period EMA
         self.ema_long = 20  # 20-period EMA
         self.open_range_minutes = 30  # First 30 minutes for the opening range
@@ -35,14 +44,16 @@ class OpenRangeBreakout(Strategy):
         return opening_range_high, opening_range_low
 
     def on_trading_iteration(self):
+        # Daily bars for every ticker in one multi-symbol request
+        self.prefetch_history(self.tickers, 22)
         for symbol in self.tickers:
             # Fetch daily data
-            bars = self.get_historical_prices(symbol, 22, "day")
+            bars = self.get_history(symbol, 22)
             data = bars.df
 
             # Calculate EMAs
-            data[f'{self.ema_short}-day'] = data['close'].ewm(span=self.ema_short, adjust=False).mean()
-            data[f'{self.ema_long}-day'] = data['close'].ewm(span=self.ema_long, adjust=False).mean()
+            data[f'{self.ema_short}-day'] = cached_ema(symbol, "day", data, self.ema_short)
+            data[f'{self.ema_long}-day'] = cached_ema(symbol, "day", data, self.ema_long)
 
             # Check volume condition
             last_volume = data.iloc[-1]['volume']
@@ -61,6 +72,8 @@ class OpenRangeBreakout(Strategy):
 
             opening_range_high, opening_range_low = self.open_range_breakout[symbol]
             latest_price = data.iloc[-1]['close']
+            self.mark_price(symbol, latest_price)
+            self.journal_mark(symbol, latest_price)
             short_ema = data.iloc[-1][f'{self.ema_short}-day']
             long_ema = data.iloc[-1][f'{self.ema_long}-day']
 
@@ -74,33 +87,32 @@ class OpenRangeBreakout(Strategy):
 
             # Log the detected signal
             logging.info(f"{symbol}: Detected Signal = {signal}")
+            self.publish_signal(symbol, signal, price=float(latest_price))
+            self.record_signal(symbol, signal, data.iloc[-1], range_high=opening_range_high,
+                               range_low=opening_range_low)
 
             # Execute the detected signal
             quantity = 100  # Adjust this value as needed
-            if signal == 'BUY':
-                pos = self.get_position(symbol)
-                if pos is not None:
-                    self.sell_all()
+            if signal in ('BUY', 'SELL'):
+                # Close only this symbol's position; sell_all() would flatten every ticker
+                self.close_position(symbol)
 
-                order = self.create_order(symbol, quantity, "buy")
-                self.submit_order(order)
+                side = signal.lower()
+                if self.risk_allows(symbol, side, quantity, latest_price):
+                    order = self.create_order(symbol, quantity, side)
+                    self.submit_order(order)
 
-            elif signal == 'SELL':
-                pos = self.get_position(symbol)
-                if pos is not None:
-                    self.sell_all()
-
-                order = self.create_order(symbol, quantity, "sell")
-                self.submit_order(order)
+        self.schedule_next_iteration()
 
 
 if __name__ == "__main__":
     trade = True  # If true, will trade
     if trade:
-        broker = Alpaca(ALPACA_CONFIG)
+        broker = CustomAlpaca(ALPACA_CONFIG)
         strategy = OpenRangeBreakout(broker=broker)
         bot = Trader()
         bot.add_strategy(strategy)
+        sampling_profiler.install("ORB")
         bot.run_all()
     else:
         start = datetime(2022, 4, 15)
@@ -122,6 +122,145 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
+    // Live signal/order/status feed pushed from app.py; replaces polling for bot state
+    const signalItems = {};
+
+    function renderSignal(event) {
+        const list = document.getElementById('signalsList');
+        if (!list) {
+            return;
+        }
+        const key = `${event.bot}:${event.symbol}`;
+        let item = signalItems[key];
+        if (!item) {
+            item = document.createElement('li');
+            item.className = 'list-group-item';
+            list.appendChild(item);
+            signalItems[key] = item;
+        }
+        const price = event.price != null ? ` @ ${Number(event.price).toFixed(2)}` : '';
+        const time = new Date(event.ts * 1000).toLocaleTimeString();
+        item.textContent = `${event.bot} ${event.symbol}: ${event.signal || 'none'}${price} (${time})`;
+    }
+
+    function renderOrder(event) {
+        const list = document.getElementById('ordersList');
+        if (!list) {
+            console.log('Order event:', event);
+            return;
+        }
+        const item = document.createElement('li');
+        item.className = 'list-group-item';
+        item.textContent = `${event.bot} ${event.side} ${event.qty} ${event.symbol}: ${event.status}` +
+            (event.error ? ` (${event.error})` : '');
+        list.prepend(item);
+        while (list.children.length > 50) {
+            list.removeChild(list.lastChild);
+        }
+    }
+
+    function handleEvent(event) {
+        if (event.type === 'signal') {
+            renderSignal(event);
+        } else if (event.type === 'order') {
+            renderOrder(event);
+        } else if (event.type === 'status' && event.bot === 'lumibot_trend') {
+            const status = document.getElementById('botStatus');
+            if (status) {
+                status.textContent = event.status.charAt(0).toUpperCase() + event.status.slice(1);
+            }
+        } else if (event.type === 'lagged') {
+            console.warn(`Event feed fell behind, ${event.dropped} events dropped`);
+        }
+    }
+
+    let feedRetry = 1000;
+
+    function connectEventFeed() {
+        const socket = new WebSocket('ws://localhost:8000/ws/events');
+        socket.onopen = () => {
+            feedRetry = 1000;
+        };
+        socket.onmessage = message => {
+            // Each message is a batch; an empty one is a heartbeat
+            JSON.parse(message.data).forEach(handleEvent);
+        };
+        socket.onclose = () => {
+            setTimeout(connectEventFeed, feedRetry);
+            feedRetry = Math.min(feedRetry * 2, 30000);
+        };
+    }
+
+    if (document.getElementById('signalsList') || document.getElementById('botStatus')) {
+        connectEventFeed();
+    }
+
+    // Account and positions from app.py's cached snapshot: the full list once, then only changes
+    const positionItems = {};
+
+    function renderPosition(symbol, position) {
+        const list = document.getElementById('positionsList');
+        let item = positionItems[symbol];
+        if (!position) {
+            if (item) {
+                item.remove();
+                delete positionItems[symbol];
+            }
+            return;
+        }
+        if (!item) {
+            item = document.createElement('li');
+            item.className = 'list-group-item';
+            list.appendChild(item);
+            positionItems[symbol] = item;
+        }
+        const pnl = position.unrealized_pl != null ? ` P&L ${Number(position.unrealized_pl).toFixed(2)}` : '';
+        item.textContent = `${symbol}: ${position.qty} @ ${Number(position.current_price).toFixed(2)}${pnl}`;
+    }
+
+    function renderAccount(account) {
+        const equity = document.getElementById('accountEquity');
+        if (equity && account) {
+            equity.textContent = Number(account.equity).toFixed(2);
+        }
+    }
+
+    function handlePortfolioChange(change) {
+        if (change.type === 'snapshot') {
+            Object.keys(positionItems).forEach(symbol => renderPosition(symbol, null));
+            change.positions.forEach(position => renderPosition(position.symbol, position));
+            renderAccount(change.account);
+        } else if (change.type === 'position') {
+            renderPosition(change.symbol, change.position);
+        } else if (change.type === 'account') {
+            renderAccount(change.account);
+        } else if (change.type === 'lagged') {
+            // Changes were dropped; reconnecting starts over from a full snapshot
+            portfolioSocket.close();
+        }
+    }
+
+    let portfolioSocket = null;
+    let portfolioRetry = 1000;
+
+    function connectPortfolioFeed() {
+        portfolioSocket = new WebSocket('ws://localhost:8000/ws/portfolio');
+        portfolioSocket.onopen = () => {
+            portfolioRetry = 1000;
+        };
+        portfolioSocket.onmessage = message => {
+            JSON.parse(message.data).forEach(handlePortfolioChange);
+        };
+        portfolioSocket.onclose = () => {
+            setTimeout(connectPortfolioFeed, portfolioRetry);
+            portfolioRetry = Math.min(portfolioRetry * 2, 30000);
+        };
+    }
+
+    if (document.getElementById('positionsList')) {
+        connectPortfolioFeed();
+    }
+
     window.startBot = startBot;
     window.stopBot = stopBot;
     window.updateSymbols = updateSymbols;
@@ -1,24 +1,32 @@
 from config import ALPACA_CONFIG
+from custom_alpaca import CustomAlpaca
 from datetime import datetime
 from lumibot.backtesting import YahooDataBacktesting
-from lumibot.brokers import Alpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import numpy as np
 import pandas as pd
 import logging
-import talib
+from indicator_cache import cached, cached_ema
+from indicators import atr, macd, rsi
 import alpaca_trade_api as tradeapi
+from trade_journal import TradeJournaling
+from bar_scheduler import BarAligned
+from event_bus import LiveEvents
+from signal_store import SignalRecording
+from history_batch import BatchedHistory
+import sampling_profiler
 
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class Trend(Strategy):
+class Trend(LiveEvents, SignalRecording, BarAligned, BatchedHistory, TradeJournaling, Strategy):
     def initialize(self):
         self.symbols = ["SIX", "HPQ", "TQQQ"]  # List of tickers
         self.start = "2022-01-01"
-        self.sleeptime = "1S"
+        self.sleeptime = "1S"  # First iteration only; schedule_next_iteration() sets the rest
+        self.bar_timeframe = "1D"  # Wake when a bar of this timeframe closes
         self.shares_per_trade = 100  # Total number of shares per trade
         self.minimum_volume = 100000  # Minimum trading volume requirement
         self.ema_short = 9  # Adjustable short-term EMA
@@ -54,42 +62,32 @@ class Trend(Strategy):
             logging.error(f"Error creating bracket order for {symbol}: {e}")
             return None
 
-    def calculate_rsi(self, data):
-        """Calculate the Relative Strength Index (RSI) using talib."""
-        rsi = talib.RSI(data['close'], timeperiod=self.rsi_period)
-        return rsi
-
-    def calculate_macd(self, data):
-        """Calculate MACD and Signal Line using talib."""
-        macd, macdsignal, _ = talib.MACD(data['close'], fastperiod=self.macd_short, slowperiod=self.macd_long, signalperiod=self.macd_signal)
-        return macd, macdsignal
-
-    def calculate_atr(self, data):
-        """Calculate the Average True Range (ATR) using talib."""
-        atr = talib.ATR(data['high'], data['low'], data['close'], timeperiod=14)  # Standard ATR period is 14
-        return atr
-
     def on_trading_iteration(self):
+        self.prefetch_history(self.symbols, 200)
         for symbol in self.symbols:
             try:
                 # Fetch historical data with the specified timeframe
-                bars = self.get_historical_prices(symbol, 200, "day")
+                bars = self.get_history(symbol, 200)
                 if bars.df.empty:
                     logging.info(f"No historical data found for {symbol}")
                     continue
                 
                 stock_data = bars.df
-                stock_data[f'{self.ema_short}-day'] = stock_data['close'].ewm(span=self.ema_short, adjust=False).mean()
-                stock_data[f'{self.ema_long}-day'] = stock_data['close'].ewm(span=self.ema_long, adjust=False).mean()
+                stock_data[f'{self.ema_short}-day'] = cached_ema(symbol, "day", stock_data, self.ema_short)
+                stock_data[f'{self.ema_long}-day'] = cached_ema(symbol, "day", stock_data, self.ema_long)
 
                 # Calculate RSI
-                stock_data['RSI'] = self.calculate_rsi(stock_data)
+                stock_data['RSI'] = cached(symbol, "day", "rsi_talib", (self.rsi_period,), stock_data,
+                                           lambda d: rsi(d['close'], self.rsi_period, method="wilder"))
 
                 # Calculate MACD
-                stock_data['MACD'], stock_data['Signal_Line'] = self.calculate_macd(stock_data)
+                stock_data['MACD'], stock_data['Signal_Line'], _ = cached(
+                    symbol, "day", "macd_talib", (self.macd_short, self.macd_long, self.macd_signal), stock_data,
+                    lambda d: macd(d['close'], self.macd_short, self.macd_long, self.macd_signal, method="talib"))
 
                 # Calculate ATR
-                stock_data['ATR'] = self.calculate_atr(stock_data)
+                stock_data['ATR'] = cached(symbol, "day", "atr_talib", (14,), stock_data,  # Standard ATR period is 14
+                                           lambda d: atr(d['high'], d['low'], d['close'], 14, method="wilder"))
 
                 # Log the latest data and indicators
                 logging.info(f"Latest data for {symbol}:\n{stock_data.tail()}")
@@ -115,9 +113,12 @@ class Trend(Strategy):
 
                 signal = stock_data.iloc[-1]['Signal']
                 logging.info(f"{symbol}: Detected Signal = {signal}")
+                self.publish_signal(symbol, signal, price=float(stock_data.iloc[-1]['close']))
+                self.record_signal(symbol, signal, stock_data.iloc[-1])
+                self.journal_mark(symbol, stock_data.iloc[-1]['close'])
 
                 if signal:
-                    open_orders = self.broker.api.get_orders(status='open')
+                    open_orders = self.broker.client.get_orders(status='open')
                     if any(o.symbol == symbol for o in open_orders):
                         logging.info(f"Skipping {symbol}, open orders found.")
                         continue  # Skip if there are open orders for this symbol
@@ -143,14 +144,17 @@ class Trend(Strategy):
             except Exception as e:
                 logging.error(f"Error processing {symbol}: {e}")
 
+        self.schedule_next_iteration()
+
 
 if __name__ == "__main__":
     trade = True  # If true will trade
     if trade:
-        broker = Alpaca(ALPACA_CONFIG)
+        broker = CustomAlpaca(ALPACA_CONFIG)
         strategy = Trend(broker=broker)
         bot = Trader()
         bot.add_strategy(strategy)
+        sampling_profiler.install("advanced_trend")
         bot.run_all()
     else:
         start = datetime(2022, 4, 15)
@@ -1,12 +1,25 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from fastapi import FastAPI, Header, HTTPException, WebSocket
 from pydantic import BaseModel
-import subprocess
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+import json
 import logging
+import os
 import openai
 import uvicorn
-from typing import List
+from typing import Any, Dict, List, Optional
+from warm_pool import WarmPool
+from bot_control import publish, publish_symbols
+import trade_journal
+import risk_aggregator
+import sampling_profiler
+from event_bus import EventBus
+from signal_store import SignalStore
+from broker_client import BrokerClient
+from portfolio_snapshot import FILL_STATUSES, PortfolioSnapshot
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -34,9 +47,9 @@ def load_api_key(filepath):
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load OpenAI API key from file
+# Load OpenAI API key from file; OPENAI_API_KEY in the environment takes precedence (load_test.py sets a stub key)
 openai_api_key_file = "C:\\Users\\shane\\OneDrive\\Documents\\OPENAI_API_KEY.txt"
-openai_api_key = load_api_key(openai_api_key_file)
+openai_api_key = os.environ.get("OPENAI_API_KEY") or load_api_key(openai_api_key_file)
 
 if openai_api_key:
     openai.api_key = openai_api_key
@@ -48,8 +61,14 @@ else:
 class ChatMessage(BaseModel):
     message: str
 
+class ProfileRequest(BaseModel):
+    bot: str = 'lumibot_trend'
+    duration: float = 30  # Seconds to sample for
+    interval: float = 0.01  # Seconds between samples
+
 class SymbolsUpdate(BaseModel):
     symbols: List[str]
+    bot: Optional[str] = None  # Defaults to every bot that has been started
 
 @app.post("/chat")
 async def chat(message: ChatMessage):
@@ -58,7 +77,8 @@ async def chat(message: ChatMessage):
         raise HTTPException(status_code=500, detail="OpenAI API key not found.")
 
     try:
-        response = openai.chat.completions.create(model="gpt-3.5-turbo",
+        # The client blocks for the whole completion; run it off the event loop so other requests keep flowing
+        response = await asyncio.to_thread(openai.chat.completions.create, model="gpt-3.5-turbo",
         messages=[
             {"role": "system", "content": "You are a financial advisor."},
             {"role": "user", "content": message.message}
@@ -69,17 +89,68 @@ async def chat(message: ChatMessage):
         logger.error(f"OpenAI API error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
 
-# Dictionary to hold the subprocess.Popen objects for each bot
+# Dictionary to hold the running process (subprocess.Popen or WarmProcess) for each bot
 processes = {}
 
+# Pre-started interpreters with the trading libraries imported, so bots start without the import cost
+warm_pool = WarmPool(size=1)
+
+@app.on_event("startup")
+async def start_warm_pool():
+    warm_pool.start()
+
+@app.on_event("startup")
+async def size_thread_pool():
+    # Chat completions, bot launches and log reads run in threads; the default pool (CPUs + 4)
+    # lets a few slow chat replies hold up every start/stop behind them
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=32, thread_name_prefix="app"))
+
+# Signal, order and status events from the bots, pushed to dashboard WebSockets
+event_bus = EventBus()
+
+# Cross-bot exposure and P&L, served to the bot processes for pre-trade checks
+risk_book = None
+
+@app.on_event("startup")
+async def start_risk_service():
+    global risk_book
+    try:
+        risk_book = risk_aggregator.serve_in_background()
+    except OSError as e:
+        logger.error(f"Risk service could not start: {str(e)}")
+
+# Account and positions from the broker, cached for every dashboard client
+portfolio = None
+
+@app.on_event("startup")
+async def start_portfolio_snapshot():
+    global portfolio
+    try:
+        from config import ALPACA_CONFIG
+        portfolio = PortfolioSnapshot.from_client(BrokerClient.from_config(ALPACA_CONFIG))
+        portfolio.start()
+    except Exception as e:
+        logger.error(f"Portfolio snapshot could not start: {str(e)}")
+
+@app.on_event("shutdown")
+async def stop_warm_pool():
+    warm_pool.shutdown()
+
+@app.on_event("shutdown")
+async def stop_portfolio_snapshot():
+    if portfolio is not None:
+        await portfolio.stop()
+
 @app.post("/start_lumibot_trend")
 async def start_lumibot_trend():
     """Start the Lumibot Trend bot."""
     try:
         if 'lumibot_trend' not in processes or processes['lumibot_trend'].poll() is not None:
-            processes['lumibot_trend'] = subprocess.Popen(['python', 'lumibot_trend.py'])
-            logger.info("Lumibot Trend bot started.")
-            return {"message": "Lumibot Trend bot started"}
+            process = await asyncio.to_thread(warm_pool.launch, 'lumibot_trend', 'Trend')
+            processes['lumibot_trend'] = process
+            logger.info(f"Lumibot Trend bot started in {process.timings['startup_seconds']:.3f}s.")
+            event_bus.publish({"type": "status", "bot": "lumibot_trend", "status": "started", **process.timings})
+            return {"message": "Lumibot Trend bot started", "startup": process.timings}
         return {"message": "Lumibot Trend bot is already running"}
     except Exception as e:
         logger.error(f"Failed to start Lumibot Trend bot: {str(e)}")
@@ -91,8 +162,9 @@ async def stop_lumibot_trend():
     try:
         if 'lumibot_trend' in processes and processes['lumibot_trend'].poll() is None:
             processes['lumibot_trend'].terminate()
-            processes['lumibot_trend'].wait()  # Ensure the process has terminated
+            await asyncio.to_thread(processes['lumibot_trend'].wait)  # Ensure the process has terminated
             logger.info("Lumibot Trend bot stopped.")
+            event_bus.publish({"type": "status", "bot": "lumibot_trend", "status": "stopped"})
             return {"message": "Lumibot Trend bot stopped"}
         return {"message": "Lumibot Trend bot is not running"}
     except Exception as e:
@@ -104,19 +176,229 @@ async def update_symbols(symbols_update: SymbolsUpdate):
     """Update symbols for the bot."""
     try:
         symbols = symbols_update.symbols
-        # Here you can add the logic to update the symbols for the bot
-        # For example, save the symbols to a file or a database
-        logger.info(f"Symbols updated to: {symbols}")
-        return {"message": "Symbols updated"}
+        bots = [symbols_update.bot] if symbols_update.bot else (list(processes) or ['lumibot_trend'])
+        # Running bots apply the change between iterations; stopped bots pick it up when started
+        versions = {bot: publish_symbols(bot, symbols) for bot in bots}
+        logger.info(f"Symbols updated to: {symbols} for {bots}")
+        return {"message": "Symbols updated", "bots": bots, "versions": versions}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to update symbols: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to update symbols: {str(e)}")
 
+# Read-only connection to the trade journal the bots write to
+journal_conn = None
+
+def get_journal_conn():
+    global journal_conn
+    if journal_conn is None:
+        journal_conn = trade_journal.connect()
+    return journal_conn
+
+def to_ns(value):
+    """Parse an ISO date/datetime query parameter into nanoseconds since the epoch."""
+    return int(datetime.fromisoformat(value).timestamp() * 1_000_000_000) if value else None
+
+@app.get("/pnl/realized")
+async def get_realized_pnl(start: Optional[str] = None, end: Optional[str] = None, group_by: str = "symbol",
+                           symbol: Optional[str] = None, strategy: Optional[str] = None):
+    """Realized P&L from the trade journal, grouped by symbol, strategy or day."""
+    if group_by not in trade_journal.GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {list(trade_journal.GROUP_COLUMNS)}")
+    try:
+        rows = trade_journal.realized_pnl(get_journal_conn(), to_ns(start), to_ns(end), group_by, symbol, strategy)
+        return {"group_by": group_by, "rows": rows, "total": sum(r["realized_pnl"] for r in rows)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to query realized P&L: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to query realized P&L: {str(e)}")
+
+@app.get("/signals")
+async def get_signals(start: str, end: Optional[str] = None, symbols: Optional[str] = None,
+                      strategy: Optional[str] = None, columns: Optional[str] = None, active: bool = False):
+    """Stored signal rows in [start, end) as column-oriented JSON; symbols and columns are comma-separated.
+
+    active=true keeps only BUY/SELL-type rows.
+    """
+    store = SignalStore()
+    # strategy names a directory under the store, so only accept ones that exist
+    if strategy is not None and strategy not in store.strategies():
+        raise HTTPException(status_code=404, detail=f"No signals stored for strategy {strategy!r}")
+    try:
+        df = store.query(start, end or datetime.utcnow().isoformat(),
+                         symbols.split(",") if symbols else None, strategy,
+                         columns.split(",") if columns else None)
+        if active:
+            df = df[df["signal"] != "None"]
+        return Response(df.to_json(orient="split", index=False, date_format="iso"), media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to query signals: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to query signals: {str(e)}")
+
+@app.get("/pnl/unrealized")
+async def get_unrealized_pnl(strategy: Optional[str] = None):
+    """Open positions from the trade journal valued at their latest marks."""
+    try:
+        rows = trade_journal.unrealized_pnl(get_journal_conn(), strategy)
+        return {"rows": rows, "total": sum(r["unrealized_pnl"] or 0.0 for r in rows)}
+    except Exception as e:
+        logger.error(f"Failed to query unrealized P&L: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to query unrealized P&L: {str(e)}")
+
+@app.get("/pnl/summary")
+async def get_pnl_summary(strategy: Optional[str] = None):
+    """Realized and unrealized P&L totals per strategy."""
+    try:
+        return {"rows": trade_journal.pnl_summary(get_journal_conn(), strategy)}
+    except Exception as e:
+        logger.error(f"Failed to query P&L summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to query P&L summary: {str(e)}")
+
+@app.get("/risk")
+async def get_risk():
+    """Current cross-bot exposure, P&L and per-symbol concentration."""
+    if risk_book is None:
+        raise HTTPException(status_code=503, detail="Risk service is not running")
+    return risk_book.snapshot()
+
+@app.post("/events")
+async def post_events(events: List[Dict[str, Any]]):
+    """Bots publish batches of signal, order and status events here."""
+    try:
+        for event in events:
+            event_bus.publish(event)
+            if portfolio is not None and event["type"] == "order" and event.get("status") in FILL_STATUSES:
+                portfolio.poke()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"published": len(events)}
+
+@app.get("/events/latest")
+async def get_latest_events(bot: Optional[str] = None):
+    """Latest signal and status per bot, for pages that poll instead of holding a WebSocket."""
+    return {"events": event_bus.snapshot(bot), "stats": event_bus.stats()}
+
+@app.websocket("/ws/events")
+async def events_feed(websocket: WebSocket, bot: Optional[str] = None):
+    """Live event feed. Each message is a JSON array of events; the first carries the latest state."""
+    await websocket.accept()
+    subscriber = event_bus.subscribe(bot)
+    try:
+        while True:
+            message = await subscriber.next_message()
+            # A client that can't take a frame in 10s is dropped; it reconnects and gets the latest state
+            await asyncio.wait_for(websocket.send_text(message), timeout=10)
+    except Exception as e:
+        logger.info(f"Event feed client disconnected: {type(e).__name__}")
+    finally:
+        event_bus.unsubscribe(subscriber)
+
+def get_portfolio_snapshot():
+    """The snapshot service, or a 503 until it has a first view of the account."""
+    if portfolio is None or portfolio.body is None:
+        detail = "Portfolio snapshot is not available"
+        if portfolio is not None and portfolio.error:
+            detail += f": {portfolio.error}"
+        raise HTTPException(status_code=503, detail=detail)
+    return portfolio
+
+@app.get("/portfolio")
+async def get_portfolio(if_none_match: Optional[str] = Header(None)):
+    """Cached account and positions; send the ETag back in If-None-Match to get a 304 when nothing changed."""
+    snapshot = get_portfolio_snapshot()
+    body, etag = snapshot.read(if_none_match)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/portfolio/changes")
+async def get_portfolio_changes(since: int):
+    """Account and position changes after version `since` (a closed position has position null)."""
+    snapshot = get_portfolio_snapshot()
+    changes = snapshot.changes_since(since)
+    if changes is None:
+        raise HTTPException(status_code=410, detail="Version too old, fetch /portfolio again")
+    return {"version": snapshot.version, "changes": changes}
+
+@app.get("/portfolio/status")
+async def get_portfolio_status():
+    if portfolio is None:
+        raise HTTPException(status_code=503, detail="Portfolio snapshot is not running")
+    return portfolio.status()
+
+@app.websocket("/ws/portfolio")
+async def portfolio_feed(websocket: WebSocket):
+    """Position feed: the first message carries the full snapshot, later ones only what changed."""
+    await websocket.accept()
+    if portfolio is None:
+        await websocket.close(code=1013)
+        return
+    subscriber = portfolio.subscribe()
+    try:
+        while True:
+            message = await subscriber.next_message()
+            await asyncio.wait_for(websocket.send_text(message), timeout=10)
+    except Exception as e:
+        logger.info(f"Portfolio feed client disconnected: {type(e).__name__}")
+    finally:
+        portfolio.unsubscribe(subscriber)
+
+@app.post("/profile/start")
+async def start_profile(request: ProfileRequest):
+    """Ask a bot to sample its stacks for a while; results land in profiles/.
+
+    Any bot with the profiling hook installed picks this up, including ones not
+    started from here (standalone scripts, strategy_runner.py).
+    """
+    try:
+        publish(request.bot, "profile", {"action": "start", "duration": request.duration, "interval": request.interval})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Profiling {request.bot} for {request.duration}s")
+    return {"message": f"Profiling {request.bot}", "duration": request.duration}
+
+@app.post("/profile/stop")
+async def stop_profile(request: ProfileRequest):
+    """End a profiling run early; the bot still writes out what it sampled."""
+    try:
+        publish(request.bot, "profile", {"action": "stop"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": f"Stopping profile of {request.bot}"}
+
+@app.get("/profile/{bot}")
+async def get_profile(bot: str):
+    """Top functions and per-package share from the bot's latest profile."""
+    path = sampling_profiler.latest_report(bot)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No profile for {bot} yet")
+    with open(path) as file:
+        return json.load(file)
+
+@app.get("/profile/{bot}/collapsed")
+async def get_profile_collapsed(bot: str):
+    """Collapsed stacks from the bot's latest profile, ready for flamegraph.pl or speedscope."""
+    path = sampling_profiler.latest_report(bot)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No profile for {bot} yet")
+    with open(path) as file:
+        collapsed = json.load(file)["collapsed"]
+    with open(collapsed) as file:
+        return PlainTextResponse(file.read())
+
+def read_logs():
+    with open('trading_bot.log', 'r') as file:
+        return file.read()
+
 @app.get("/logs")
 async def get_logs():
     try:
-        with open('trading_bot.log', 'r') as file:
-            logs = file.read()
+        logs = await asyncio.to_thread(read_logs)
         return JSONResponse(content={"logs": logs})
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -0,0 +1,222 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+import logging
+import math
+from zoneinfo import ZoneInfo
+import pandas as pd
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th given weekday of a month (n=-1 for the last one)."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+
+def _observed(day):
+    """Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+class MarketCalendar:
+    """NYSE regular sessions: weekdays 9:30-16:00 New York time, minus exchange holidays, with 13:00 early closes."""
+
+    def __init__(self, tz="America/New_York", open_time=time(9, 30), close_time=time(16, 0),
+                 early_close_time=time(13, 0)):
+        self.tz = ZoneInfo(tz)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.early_close_time = early_close_time
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def holidays(year):
+        days = {
+            _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+            _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+            _easter(year) - timedelta(days=2),  # Good Friday
+            _nth_weekday(year, 5, 0, -1),  # Memorial Day
+            _observed(date(year, 7, 4)),  # Independence Day
+            _nth_weekday(year, 9, 0, 1),  # Labor Day
+            _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+            _observed(date(year, 12, 25)),  # Christmas
+        }
+        new_year = date(year, 1, 1)
+        if new_year.weekday() != 5:  # NYSE doesn't close the Friday before a Saturday New Year
+            days.add(_observed(new_year))
+        if year >= 2022:
+            days.add(_observed(date(year, 6, 19)))  # Juneteenth
+        return frozenset(days)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def early_closes(year):
+        holidays = MarketCalendar.holidays(year)
+        days = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1), date(year, 7, 3), date(year, 12, 24)}
+        return frozenset(d for d in days if d.weekday() < 5 and d not in holidays)
+
+    def is_session(self, day):
+        return day.weekday() < 5 and day not in self.holidays(day.year)
+
+    def session(self, day):
+        """(open, close) datetimes of a trading day, or None if the market is closed that day."""
+        if not self.is_session(day):
+            return None
+        close = self.early_close_time if day in self.early_closes(day.year) else self.close_time
+        return (datetime.combine(day, self.open_time, self.tz), datetime.combine(day, close, self.tz))
+
+    def next_session(self, now):
+        """The session in progress at now, or the next one to open."""
+        now = now.astimezone(self.tz)
+        day = now.date()
+        for _ in range(15):
+            session = self.session(day)
+            if session is not None and now < session[1]:
+                return session
+            day += timedelta(days=1)
+        raise RuntimeError(f"No trading session within 15 days of {now}")
+
+    def is_open(self, now):
+        open_, close = self.next_session(now)
+        return open_ <= now < close
+
+
+def _step(timeframe):
+    """Bar length for 'day'/'1D' (None: one bar per session) or intraday frames like '15min', '1H'."""
+    if timeframe in ("day", "1D", "1Day", "D"):
+        return None
+    if timeframe == "minute":
+        return timedelta(minutes=1)
+    return pd.Timedelta(timeframe).to_pytimedelta()
+
+
+def _next_boundary(now, step):
+    """First multiple of step after now, counting from midnight."""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    n = math.floor((now - midnight) / step) + 1
+    return midnight + n * step
+
+
+class BarScheduler:
+    """Works out when a strategy next needs to run.
+
+    A strategy on intraday bars wakes once per bar close (plus a few seconds for
+    the bar to be published). On daily bars it wakes daily_lead_minutes before
+    the session closes, while orders can still be placed, and trades on the
+    day's bar so far. Either way it also wakes every check_interval during the
+    session while it has intrabar exits (stops/targets) to watch. Closed
+    sessions are slept through. stats counts the iterations a fixed baseline
+    sleeptime would have run in the same time.
+    """
+
+    def __init__(self, timeframe="1D", check_interval=None, calendar=None, settle_seconds=5, baseline_seconds=1,
+                 daily_lead_minutes=15):
+        self.step = _step(timeframe)
+        self.check_step = _step(check_interval) if check_interval else None
+        self.calendar = calendar or MarketCalendar()
+        self.settle = timedelta(seconds=settle_seconds)
+        self.daily_lead = timedelta(minutes=daily_lead_minutes)
+        self.baseline_seconds = baseline_seconds
+        self.stats = {"iterations": 0, "skipped": 0, "slept_seconds": 0.0}
+
+    def _next_close(self, now, open_, close):
+        if self.step is None:
+            return close
+        return min(close, max(_next_boundary(now, self.step), open_ + self.step))
+
+    def _next_daily(self, now, close):
+        wake = close - self.daily_lead
+        if now >= wake:  # Already past today's run, trade before the next session closes
+            wake = self.calendar.next_session(close)[1] - self.daily_lead
+        return wake
+
+    def next_wake(self, now, intrabar=False):
+        """(datetime, reason) of the next time the strategy should run."""
+        now = now.astimezone(self.calendar.tz)
+        open_, close = self.calendar.next_session(now)
+        if self.step is None:
+            candidates = [(self._next_daily(now, close), "before close")]
+        else:
+            candidates = [(self._next_close(max(now, open_), open_, close) + self.settle, "bar close")]
+        if intrabar and self.check_step is not None:
+            check = open_ + self.check_step if now < open_ else _next_boundary(now, self.check_step)
+            if check < close:
+                candidates.append((check, "intrabar check"))
+        return min(candidates)
+
+    def wait_seconds(self, now, intrabar=False):
+        wake, reason = self.next_wake(now, intrabar)
+        seconds = max(1, math.ceil((wake - now).total_seconds()))
+        self.stats["iterations"] += 1
+        self.stats["skipped"] += max(0, seconds // self.baseline_seconds - 1)
+        self.stats["slept_seconds"] += seconds
+        return seconds, wake, reason
+
+
+class BarAligned:
+    """Strategy mixin: replace fixed sleeptime polling with bar-close-aligned wake-ups.
+
+    Call schedule_next_iteration() at the end of on_trading_iteration; it sets
+    sleeptime to the time left until the next bar close, or the next intrabar
+    check while has_open_exits() is true. The clock is self.get_datetime(), so
+    the same schedule applies in backtests.
+    """
+
+    bar_timeframe = "1D"
+    intrabar_check = None  # e.g. "1min" to watch stops/targets between bar closes
+    daily_lead_minutes = 15  # Daily strategies run this long before the close, while orders can still fill
+    baseline_sleeptime_seconds = 1  # The fixed "1S" polling this replaces
+
+    def has_open_exits(self):
+        return False
+
+    def schedule_next_iteration(self):
+        if getattr(self, "_bar_scheduler", None) is None:
+            self._bar_scheduler = BarScheduler(self.bar_timeframe, self.intrabar_check,
+                                               baseline_seconds=self.baseline_sleeptime_seconds,
+                                               daily_lead_minutes=self.daily_lead_minutes)
+        now = self.get_datetime()
+        if now.tzinfo is None:
+            now = now.astimezone()
+        seconds, wake, reason = self._bar_scheduler.wait_seconds(now, self.has_open_exits())
+        self.sleeptime = f"{seconds}S"
+        stats = self._bar_scheduler.stats
+        logging.info(f"Next iteration at {wake:%Y-%m-%d %H:%M:%S %Z} ({reason}); "
+                     f"{stats['iterations']} iterations run, {stats['skipped']} skipped vs {self.baseline_sleeptime_seconds}s polling")
+
+
+if __name__ == "__main__":
+    # One simulated week for a daily strategy with and without an open position, vs fixed 1s polling
+    calendar = MarketCalendar()
+    for label, timeframe, check, intrabar in (("daily", "1D", None, False), ("daily + 1min stops", "1D", "1min", True),
+                                              ("15min bars", "15min", None, False)):
+        scheduler = BarScheduler(timeframe, check, calendar)
+        now = datetime(2024, 7, 1, 8, 0, tzinfo=calendar.tz)
+        end = now + timedelta(days=7)
+        while now < end:
+            seconds, wake, reason = scheduler.wait_seconds(now, intrabar)
+            now += timedelta(seconds=seconds)
+        print(f"{label:>20}: {scheduler.stats['iterations']:5d} iterations, {scheduler.stats['skipped']:7d} skipped")
+    print(f"early closes 2024: {sorted(calendar.early_closes(2024))}")
+    print(f"holidays 2024: {sorted(calendar.holidays(2024))}")
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+
+CONTROL_DIR = "bot_control"
+NAME_PATTERN = re.compile(r"[A-Za-z0-9_]+")  # Bot names and message kinds end up in file names
+
+
+def control_path(bot, kind="symbols"):
+    for name in (bot, kind):
+        if not isinstance(name, str) or not NAME_PATTERN.fullmatch(name):
+            raise ValueError(f"Invalid bot control name {name!r}, use letters, digits and underscores only")
+    return os.path.join(CONTROL_DIR, f"{bot}.{kind}.json")
+
+
+def publish(bot, kind, payload):
+    """Write a control message for a bot atomically (write a temp file, then rename over).
+
+    Raises ValueError for a bot name that isn't a plain identifier.
+    """
+    path = control_path(bot, kind)
+    os.makedirs(CONTROL_DIR, exist_ok=True)
+    message = dict(payload, version=time.time_ns())
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as file:
+        json.dump(message, file)
+    os.replace(tmp, path)
+    return message["version"]
+
+
+def publish_symbols(bot, symbols):
+    return publish(bot, "symbols", {"symbols": list(symbols)})
+
+
+class ControlChannel:
+    """Bot-side reader for one control file; poll() is a single stat() when nothing changed."""
+
+    def __init__(self, bot, kind="symbols"):
+        self.path = control_path(bot, kind)
+        self.version = None
+        self._stamp = None
+
+    def poll(self):
+        """Return the newest message if it changed since the last poll, otherwise None."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return None
+        self._stamp = stamp
+        try:
+            with open(self.path) as file:
+                message = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Unreadable control message {self.path}: {e}")
+            return None
+        if message.get("version") == self.version:
+            return None
+        self.version = message.get("version")
+        return message
+
+
+class SymbolHotSwap:
+    """Strategy mixin that applies symbol list changes from app.py without a restart.
+
+    Call apply_symbol_updates() at the top of on_trading_iteration. Removed symbols
+    are dropped, together with their entries in the per-symbol state dicts named in
+    symbol_state, while the state of unchanged symbols is kept. Added symbols are
+    warmed up (history fetched, state initialized) on a background thread and join
+    the symbol list at the first iteration after their warm-up finishes, so the list
+    only ever changes between iterations.
+    """
+
+    control_name = None  # Bot name used by app.py, e.g. "lumibot_trend"
+    symbols_attr = "symbols"  # Attribute holding the strategy's symbol list
+    symbol_state = {}  # {attribute: factory} for per-symbol dicts, e.g. {"ready_to_buy": lambda: False}
+    warmup_bars = 200
+
+    def warm_symbol(self, symbol):
+        """Prime data for a new symbol before it starts trading.
+
+        With BatchedHistory the bars are loaded here, off the trading thread, and
+        the symbol's first prefetch_history() uses them instead of fetching it.
+        """
+        warm_history = getattr(self, "warm_history", None)
+        if warm_history is not None:
+            warm_history([symbol], self.warmup_bars)
+
+    def _warm(self, symbol):
+        try:
+            self.warm_symbol(symbol)
+        except Exception as e:
+            logging.error(f"Warm-up failed for {symbol}: {e}")
+
+    def apply_symbol_updates(self):
+        if getattr(self, "_symbol_channel", None) is None:
+            self._symbol_channel = ControlChannel(self.control_name or type(self).__name__)
+            self._warming = {}
+            self._target_symbols = None
+
+        message = self._symbol_channel.poll()
+        current = list(getattr(self, self.symbols_attr))
+        if message is not None:
+            target = list(dict.fromkeys(message["symbols"]))
+            self._target_symbols = target
+            for symbol in target:
+                if symbol not in current and symbol not in self._warming:
+                    thread = threading.Thread(target=self._warm, args=(symbol,), daemon=True)
+                    thread.start()
+                    self._warming[symbol] = thread
+            for symbol in list(self._warming):
+                if symbol not in target:
+                    del self._warming[symbol]  # Removed again before it finished warming
+            logging.info(f"Symbol update received: {target} (warming {list(self._warming)})")
+
+        if self._target_symbols is None:
+            return
+
+        ready = [s for s, thread in self._warming.items() if not thread.is_alive()]
+        for symbol in ready:
+            del self._warming[symbol]
+            for attr, factory in self.symbol_state.items():
+                getattr(self, attr).setdefault(symbol, factory())
+
+        updated = [s for s in self._target_symbols if s in current or s in ready]
+        if updated == current:
+            return
+        for symbol in set(current) - set(updated):
+            for attr in self.symbol_state:
+                getattr(self, attr).pop(symbol, None)
+        setattr(self, self.symbols_attr, updated)
+        logging.info(f"Symbols now {updated}")
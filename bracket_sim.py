@@ -0,0 +1,186 @@
+import time
+import numpy as np
+import pandas as pd
+
+
+# How to resolve a bar whose range touches both the stop and the target
+BOTH_HIT_RULES = ("stop", "target", "open")
+
+
+def bracket_levels(reference_price, atr, side, atr_multiplier=1.5, risk_reward_ratio=2):
+    """Stop loss and take profit prices the way the bracket bots compute them.
+
+    Mirrors advanced_trend.py / 5min_gldn.py: the stop sits atr_multiplier * ATR away
+    from the reference price and the target risk_reward_ratio times further on the
+    other side. side is +1 for longs and -1 for shorts.
+    """
+    reference_price = np.asarray(reference_price, dtype=np.float64)
+    risk = atr_multiplier * np.asarray(atr, dtype=np.float64)
+    side = np.asarray(side, dtype=np.float64)
+    stop_loss = np.round(reference_price - side * risk, 2)
+    take_profit = np.round(reference_price + side * risk * risk_reward_ratio, 2)
+    return stop_loss, take_profit
+
+
+def simulate_brackets(open_, high, low, close, entry_index, side, stop_loss, take_profit,
+                      qty=1, max_bars=None, both_hit="stop", timestamps=None, block_size=128):
+    """Resolve bracket exits for every trade at once from OHLC arrays.
+
+    Each trade enters at the open of entry_index and is then checked bar by bar
+    (including the entry bar) against its stop and target. Unresolved trades are
+    scanned in blocks of block_size bars so memory stays bounded and trades that exit
+    early drop out of the work set. Bars that touch both legs are resolved with
+    both_hit: 'stop' (pessimistic), 'target' (optimistic) or 'open' (whichever leg is
+    closer to the bar's open fills first). Gaps through a leg fill at the open.
+
+    Returns a DataFrame with one row per trade: entry/exit index and price, exit
+    reason, P&L, return and holding time in bars (and as a timedelta when timestamps
+    are given). Trades still open after max_bars (or at the end of data) exit at
+    that bar's close.
+    """
+    if both_hit not in BOTH_HIT_RULES:
+        raise ValueError(f"both_hit must be one of {BOTH_HIT_RULES}, got {both_hit!r}")
+
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    entry_index = np.asarray(entry_index, dtype=np.int64)
+    trades = len(entry_index)
+    side, stop_loss, take_profit, qty = (
+        np.broadcast_to(np.asarray(a, dtype=np.float64), (trades,)) for a in (side, stop_loss, take_profit, qty)
+    )
+    bars = len(close)
+    is_long = side > 0
+    horizon = bars if max_bars is None else int(max_bars)
+
+    entry_price = open_[entry_index]
+    exit_index = np.minimum(entry_index + horizon - 1, bars - 1)
+    exit_price = close[exit_index]
+    exit_reason = np.where(entry_index + horizon - 1 < bars, "timeout", "end").astype(object)
+
+    pending = np.arange(trades)
+    offset = 0
+    steps = np.arange(block_size)
+    while pending.size and offset < horizon:
+        width = min(block_size, horizon - offset)
+        idx = entry_index[pending, None] + offset + steps[:width]
+        in_range = idx < bars
+        idx = np.minimum(idx, bars - 1)
+
+        bar_open, bar_high, bar_low = open_[idx], high[idx], low[idx]
+        long_ = is_long[pending, None]
+        stop = stop_loss[pending, None]
+        target = take_profit[pending, None]
+        stop_hit = np.where(long_, bar_low <= stop, bar_high >= stop) & in_range
+        target_hit = np.where(long_, bar_high >= target, bar_low <= target) & in_range
+
+        hit = stop_hit | target_hit
+        resolved = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        rows = np.flatnonzero(resolved)
+        cols = first[rows]
+        trade = pending[rows]
+
+        s_hit = stop_hit[rows, cols]
+        t_hit = target_hit[rows, cols]
+        o = bar_open[rows, cols]
+        if both_hit == "stop":
+            take_stop = s_hit
+        elif both_hit == "target":
+            take_stop = s_hit & ~t_hit
+        else:
+            closer_to_stop = np.abs(o - stop_loss[trade]) <= np.abs(take_profit[trade] - o)
+            take_stop = s_hit & (~t_hit | closer_to_stop)
+
+        # A gap through a leg fills at the open rather than at the leg's price
+        long_t = is_long[trade]
+        stop_fill = np.where(long_t, np.minimum(o, stop_loss[trade]), np.maximum(o, stop_loss[trade]))
+        target_fill = np.where(long_t, np.maximum(o, take_profit[trade]), np.minimum(o, take_profit[trade]))
+
+        exit_index[trade] = entry_index[trade] + offset + cols
+        exit_price[trade] = np.where(take_stop, stop_fill, target_fill)
+        exit_reason[trade] = np.where(take_stop, "stop_loss", "take_profit")
+
+        pending = pending[~resolved]
+        offset += width
+
+    pnl = side * (exit_price - entry_price) * qty
+    result = pd.DataFrame({
+        "entry_index": entry_index,
+        "exit_index": exit_index,
+        "side": np.where(is_long, "buy", "sell"),
+        "entry_price": entry_price,
+        "stop_loss": stop_loss,
+        "take_profit": take_profit,
+        "exit_price": exit_price,
+        "exit_reason": exit_reason,
+        "pnl": pnl,
+        "return": side * (exit_price / entry_price - 1),
+        "bars_held": exit_index - entry_index + 1,
+    })
+    if timestamps is not None:
+        timestamps = pd.DatetimeIndex(timestamps)
+        result["entry_time"] = timestamps[entry_index]
+        result["exit_time"] = timestamps[exit_index]
+        result["holding_time"] = result["exit_time"] - result["entry_time"]
+    return result
+
+
+def sweep_brackets(open_, high, low, close, atr, signal_index, side, atr_multipliers,
+                   risk_reward_ratios, qty=1, max_bars=None, both_hit="stop"):
+    """Evaluate a grid of ATR multipliers and risk/reward ratios in one simulation.
+
+    Signals fire at the close of signal_index and enter at the next bar's open with
+    levels computed from the signal bar's close and ATR, like the live bracket bots.
+    Every (trade, parameter) combination is simulated in a single vectorized call and
+    summarized per parameter pair.
+    """
+    signal_index = np.asarray(signal_index, dtype=np.int64)
+    side = np.broadcast_to(np.asarray(side, dtype=np.float64), signal_index.shape)
+    # Signals on the last bar can't be filled and bars without ATR can't set levels
+    keep = (signal_index + 1 < len(close)) & np.isfinite(np.asarray(atr, dtype=np.float64)[signal_index])
+    signal_index, side = signal_index[keep], side[keep]
+
+    grid = [(m, rr) for m in atr_multipliers for rr in risk_reward_ratios]
+    multipliers = np.repeat([m for m, _ in grid], len(signal_index))
+    ratios = np.repeat([rr for _, rr in grid], len(signal_index))
+    tiled_signal = np.tile(signal_index, len(grid))
+    tiled_side = np.tile(side, len(grid))
+
+    reference = np.asarray(close, dtype=np.float64)[tiled_signal]
+    stop_loss, take_profit = bracket_levels(reference, np.asarray(atr, dtype=np.float64)[tiled_signal],
+                                            tiled_side, multipliers, ratios)
+
+    trades = simulate_brackets(open_, high, low, close, tiled_signal + 1, tiled_side, stop_loss, take_profit,
+                               qty=qty, max_bars=max_bars, both_hit=both_hit)
+    trades["atr_multiplier"] = multipliers
+    trades["risk_reward_ratio"] = ratios
+
+    summary = trades.groupby(["atr_multiplier", "risk_reward_ratio"]).agg(
+        trades=("pnl", "size"),
+        win_rate=("pnl", lambda p: (p > 0).mean()),
+        total_pnl=("pnl", "sum"),
+        avg_pnl=("pnl", "mean"),
+        avg_bars_held=("bars_held", "mean"),
+        stop_outs=("exit_reason", lambda r: (r == "stop_loss").sum()),
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    # Benchmark on five years of synthetic 15-minute bars (26 bars per session)
+    rng = np.random.default_rng(0)
+    bars = 252 * 26 * 5
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, bars)))
+    atr = pd.Series(high - low).rolling(14).mean().bfill().to_numpy()
+
+    signal_index = np.sort(rng.choice(bars - 1, 5000, replace=False))
+    side = np.where(rng.random(5000) < 0.5, 1, -1)
+
+    start = time.perf_counter()
+    summary = sweep_brackets(open_, high, low, close, atr, signal_index, side,
+                             atr_multipliers=[1.0, 1.5, 2.0, 2.5, 3.0],
+                             risk_reward_ratios=[1, 1.5, 2, 3])
+    print(summary)
+    print(f"Simulated {5000 * len(summary)} brackets over {bars} bars in {time.perf_counter() - start:.2f}s")
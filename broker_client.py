@@ -0,0 +1,302 @@
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import threading
+import time
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DATA_URL = "https://data.alpaca.markets"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class BrokerError(Exception):
+    """Raised when the broker rejects a request or retries are exhausted."""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class Entity:
+    """Attribute access over a JSON object, like alpaca_trade_api entities (order.symbol, account.cash)."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)  # Keeps pickle/copy from recursing before _raw is set
+        try:
+            return self._raw[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __eq__(self, other):
+        return isinstance(other, Entity) and self._raw == other._raw
+
+    def __hash__(self):
+        # Consistent with __eq__: equal entities have the same fields and the same id
+        return hash((frozenset(self._raw), str(self._raw.get("id"))))
+
+    def to_dict(self):
+        return dict(self._raw)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._raw!r})"
+
+
+class Bars:
+    """Bar query result with the DataFrame under .df, like alpaca_trade_api's BarsV2."""
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def __len__(self):
+        return len(self.df)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by every thread using the client."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class BrokerClient:
+    """Alpaca REST client with connection pooling, rate limiting, coalescing and retries.
+
+    One pooled requests.Session is shared by every caller. Each HTTP attempt takes a
+    token from the bucket first (Alpaca allows 200 requests/minute). Identical GET
+    requests that are already in flight are coalesced: later callers wait for the
+    first call's response instead of sending their own. Throttled (429), 5xx and
+    connection failures are retried with exponential backoff and full jitter; order
+    submissions are only retried when they carry a client_order_id, so a retry can
+    never create a second order.
+    """
+
+    def __init__(self, key_id, secret_key, base_url, data_url=DATA_URL, rate=200 / 60, burst=20,
+                 pool_size=10, timeout=10, max_retries=4, backoff=0.25, max_backoff=8.0):
+        self.base_url = base_url.rstrip('/')
+        self.data_url = data_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        self.session.headers.update({"APCA-API-KEY-ID": key_id, "APCA-API-SECRET-KEY": secret_key})
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"requests": 0, "coalesced": 0, "retries": 0}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Build a client from an ALPACA_CONFIG-style dict."""
+        return cls(config['API_KEY'], config['API_SECRET'], config.get('ENDPOINT', config.get('PAPER')), **kwargs)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    @staticmethod
+    def _retry_after(response):
+        """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date), or None."""
+        value = response.headers.get("Retry-After") if response is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _sleep_before_retry(self, attempt, response=None):
+        delay = self._retry_after(response)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        self._count("retries")
+        time.sleep(delay)
+
+    def _send(self, method, url, params=None, json=None, retry=True):
+        attempts = self.max_retries + 1 if retry else 1
+        for attempt in range(attempts):
+            self.limiter.acquire()
+            self._count("requests")
+            try:
+                response = self.session.request(method, url, params=params, json=json, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt + 1 < attempts:
+                    logging.warning(f"{method} {url} connection failed or timed out ({e}), retrying")
+                    self._sleep_before_retry(attempt)
+                    continue
+                raise BrokerError(None, str(e)) from e
+
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                logging.warning(f"{method} {url} returned {response.status_code}, retrying")
+                self._sleep_before_retry(attempt, response)
+                continue
+            if response.status_code >= 400:
+                try:
+                    message = response.json().get("message", response.text)
+                except ValueError:
+                    message = response.text
+                raise BrokerError(response.status_code, message)
+            return response.json() if response.content else None
+
+    def _get(self, url, params=None):
+        """GET with in-flight coalescing of identical requests."""
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(self._send("GET", url, params=params))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+    # Trading API
+
+    def get_account(self):
+        return Entity(self._get(f"{self.base_url}/v2/account"))
+
+    def list_positions(self):
+        return [Entity(p) for p in self._get(f"{self.base_url}/v2/positions")]
+
+    def list_orders(self, status=None, limit=None, symbols=None):
+        params = {k: v for k, v in (("status", status), ("limit", limit)) if v is not None}
+        if symbols:
+            params["symbols"] = ",".join(symbols)
+        return [Entity(o) for o in self._get(f"{self.base_url}/v2/orders", params)]
+
+    # The strategies call get_orders(); keep it as an alias
+    get_orders = list_orders
+
+    def list_assets(self, status=None, asset_class=None):
+        params = {k: v for k, v in (("status", status), ("asset_class", asset_class)) if v is not None}
+        return [Entity(a) for a in self._get(f"{self.base_url}/v2/assets", params)]
+
+    def get_clock(self):
+        return Entity(self._get(f"{self.base_url}/v2/clock"))
+
+    def submit_order(self, symbol, qty, side, type="market", time_in_force="day", client_order_id=None, **kwargs):
+        order = {"symbol": symbol, "qty": str(qty), "side": side, "type": type, "time_in_force": time_in_force}
+        if client_order_id:
+            order["client_order_id"] = client_order_id
+        order.update({k: v for k, v in kwargs.items() if v is not None})
+        return Entity(self._send("POST", f"{self.base_url}/v2/orders", json=order, retry=bool(client_order_id)))
+
+    def get_order(self, order_id, nested=False):
+        """One order; nested=True includes a bracket order's take-profit and stop-loss legs."""
+        return Entity(self._get(f"{self.base_url}/v2/orders/{order_id}", {"nested": "true"} if nested else None))
+
+    def get_order_by_client_order_id(self, client_order_id):
+        return Entity(self._get(f"{self.base_url}/v2/orders:by_client_order_id",
+                                {"client_order_id": client_order_id}))
+
+    def cancel_order(self, order_id):
+        self._send("DELETE", f"{self.base_url}/v2/orders/{order_id}")
+
+    # Market data API
+
+    def get_bars(self, symbol, timeframe, start=None, end=None, limit=None, adjustment='raw', feed=None):
+        """Bars for one symbol or a list of symbols, following next_page_token to the end.
+
+        Returns Bars whose .df is indexed by timestamp; multi-symbol queries add a
+        'symbol' column like alpaca_trade_api does.
+        """
+        symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+        params = {"symbols": ",".join(symbols), "timeframe": str(timeframe), "adjustment": adjustment}
+        for name, value in (("start", start), ("end", end), ("limit", limit), ("feed", feed)):
+            if value is not None:
+                params[name] = value.isoformat() if hasattr(value, "isoformat") else value
+
+        rows = []
+        while True:
+            page = self._get(f"{self.data_url}/v2/stocks/bars", params)
+            for sym, bars in (page.get("bars") or {}).items():
+                rows.extend(dict(bar, S=sym) for bar in bars)
+            token = page.get("next_page_token")
+            if not token or (limit is not None and len(rows) >= limit):
+                break
+            params = dict(params, page_token=token)
+
+        return Bars(bars_frame(rows, multi=len(symbols) > 1))
+
+
+BAR_FIELDS = {"t": "timestamp", "o": "open", "h": "high", "l": "low", "c": "close", "v": "volume",
+              "n": "trade_count", "vw": "vwap", "S": "symbol"}
+
+
+def bars_frame(rows, multi=False):
+    """Turn raw v2 bar objects into a timestamp-indexed DataFrame."""
+    columns = [c for c in BAR_FIELDS.values() if c != "timestamp"]
+    if not rows:
+        df = pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], tz="UTC", name="timestamp"))
+    else:
+        df = pd.DataFrame(rows).rename(columns=BAR_FIELDS)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+        df = df.set_index("timestamp")
+    if not multi:
+        df = df.drop(columns="symbol", errors="ignore")
+    return df
+
+
+if __name__ == "__main__":
+    # Exercise the client against the local mock broker: 20 threads asking for
+    # open orders at once should reach the server as a single request.
+    from concurrent.futures import ThreadPoolExecutor
+    from mock_broker import MockBroker
+
+    with MockBroker(latency=0.2) as mock:
+        client = BrokerClient("key", "secret", mock.url, data_url=mock.url)
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            results = list(pool.map(lambda _: client.get_orders(status='open'), range(20)))
+        print(f"20 concurrent get_orders -> {mock.requests['/v2/orders']} server request(s), stats={client.stats}")
+
+        mock.fail_next = 2  # Two 429s, then success
+        bars = client.get_bars(["GME", "MRNA"], "1Day")
+        print(bars.df.groupby("symbol").size().to_dict(), f"stats={client.stats}")
@@ -0,0 +1,77 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from compact_bars import from_nanoseconds, to_nanoseconds
+
+
+STORE_DIR = "store"
+
+
+class ColumnStore:
+    """Tables kept on disk as one .npy file per column, read back through memory maps.
+
+    Each table is a directory holding index.npy (int64 nanoseconds, UTC),
+    <column>.npy and meta.json. Reading a table maps the files instead of
+    parsing them, so opening one is nearly free and only the pages a reader
+    touches are loaded. Writes go to a temporary directory that replaces the
+    table in one rename, so readers never see half a table.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.path(name), "meta.json"))
+
+    def names(self, prefix=""):
+        """Tables under a prefix such as 'inputs' or 'components'."""
+        base = self.path(prefix) if prefix else self.root
+        found = []
+        for directory, _, files in os.walk(base):
+            if "meta.json" in files and ".tmp-" not in directory and ".old-" not in directory:
+                found.append(os.path.relpath(directory, self.root).replace(os.sep, "/"))
+        return sorted(found)
+
+    def write(self, name, df, **meta):
+        """Store a DataFrame with a DatetimeIndex; extra keyword arguments are kept in meta.json."""
+        path = self.path(name)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        np.save(os.path.join(tmp, "index.npy"), to_nanoseconds(df.index))
+        for column in df.columns:
+            np.save(os.path.join(tmp, f"{column}.npy"), np.ascontiguousarray(df[column].to_numpy()))
+        with open(os.path.join(tmp, "meta.json"), "w") as file:
+            tz = str(df.index.tz) if getattr(df.index, "tz", None) is not None else None
+            json.dump(dict(meta, columns=[str(c) for c in df.columns], rows=len(df), tz=tz, written=time.time()), file)
+        if os.path.exists(path):
+            old = f"{path}.old-{os.getpid()}"
+            os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(tmp, path)
+
+    def meta(self, name):
+        with open(os.path.join(self.path(name), "meta.json")) as file:
+            return json.load(file)
+
+    def read_arrays(self, name, columns=None):
+        """(index nanoseconds, {column: array}) as read-only memory maps."""
+        path = self.path(name)
+        columns = columns or self.meta(name)["columns"]
+        index = np.load(os.path.join(path, "index.npy"), mmap_mode="r")
+        return index, {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r") for c in columns}
+
+    def read(self, name, columns=None):
+        """A table as a DataFrame over the memory-mapped columns."""
+        index, arrays = self.read_arrays(name, columns)
+        tz = self.meta(name).get("tz")
+        stamps = from_nanoseconds(np.asarray(index))
+        stamps = stamps.tz_convert(tz) if tz else stamps.tz_localize(None)
+        return pd.DataFrame(arrays, index=stamps, copy=False)
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+from indicators import ema
+
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+PRICE_DTYPE = np.float32
+VOLUME_DTYPE = np.int64
+
+
+def to_nanoseconds(index):
+    """int64 nanoseconds since the epoch (UTC) for a datetime index."""
+    return pd.DatetimeIndex(index).as_unit('ns').asi8.astype(np.int64, copy=False)
+
+
+def from_nanoseconds(stamps):
+    return pd.to_datetime(stamps, unit='ns', utc=True)
+
+
+class CompactBars:
+    """One symbol's OHLCV bars stored as contiguous float32/int64 arrays.
+
+    Strategy code reads columns with bars['close'], adds derived columns with
+    bars['9-day'] = ..., and takes the latest value with bars.last('close'). A
+    pandas DataFrame is only built when .df is accessed, and it wraps the same
+    arrays instead of copying them.
+    """
+
+    __slots__ = ('symbol', 'timeframe', 'index', 'open', 'high', 'low', 'close', 'volume', '_derived')
+
+    def __init__(self, symbol, timeframe, index, open, high, low, close, volume, derived=None):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.index = index
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self._derived = {} if derived is None else derived
+
+    @classmethod
+    def from_dataframe(cls, df, symbol, timeframe='day'):
+        """Pack a get_historical_prices-style DataFrame into compact arrays."""
+        index = to_nanoseconds(df.index)
+        prices = {c: np.ascontiguousarray(df[c].to_numpy(), dtype=PRICE_DTYPE) for c in PRICE_COLUMNS}
+        volume = np.ascontiguousarray(np.nan_to_num(df['volume'].to_numpy()), dtype=VOLUME_DTYPE)
+        return cls(symbol, timeframe, index, volume=volume, **prices)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, column):
+        if column in self._derived:
+            return self._derived[column]
+        if column in PRICE_COLUMNS or column == 'volume':
+            return getattr(self, column)
+        raise KeyError(column)
+
+    def __setitem__(self, column, values):
+        values = np.asarray(values, dtype=PRICE_DTYPE)
+        if values.shape != self.index.shape:
+            raise ValueError(f"{column} has {len(values)} values for {len(self)} bars")
+        self._derived[column] = values
+
+    def __contains__(self, column):
+        return column in self._derived or column in PRICE_COLUMNS or column == 'volume'
+
+    @property
+    def columns(self):
+        return list(PRICE_COLUMNS) + ['volume'] + list(self._derived)
+
+    @property
+    def empty(self):
+        return len(self.index) == 0
+
+    @property
+    def timestamps(self):
+        return from_nanoseconds(self.index)
+
+    def last(self, column):
+        """Latest value of a column, like data.iloc[-1][column]."""
+        return self[column][-1]
+
+    def tail(self, n):
+        """The last n bars as views of the same arrays."""
+        derived = {k: v[-n:] for k, v in self._derived.items()}
+        return CompactBars(self.symbol, self.timeframe, self.index[-n:], self.open[-n:], self.high[-n:],
+                           self.low[-n:], self.close[-n:], self.volume[-n:], derived)
+
+    def ema(self, span, column='close'):
+        return ema(self[column], span).astype(PRICE_DTYPE)
+
+    @property
+    def nbytes(self):
+        arrays = [self.index, self.open, self.high, self.low, self.close, self.volume, *self._derived.values()]
+        return sum(a.nbytes for a in arrays)
+
+    @property
+    def df(self):
+        """Pandas view of the bars, built on demand without copying the arrays."""
+        data = {c: self[c] for c in self.columns}
+        return pd.DataFrame(data, index=self.timestamps, copy=False)
+
+
+class CompactUniverse:
+    """Bars for many symbols on one shared int64 timestamp index.
+
+    Prices are (bars x symbols) float32 panels stored column-major, so each symbol's
+    series is a contiguous slice and bars(symbol) hands out CompactBars views
+    without copying. Symbols missing a bar hold NaN prices and zero volume.
+    """
+
+    __slots__ = ('symbols', 'timeframe', 'index', 'open', 'high', 'low', 'close', 'volume', '_positions')
+
+    def __init__(self, symbols, timeframe, index, open, high, low, close, volume):
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.index = index
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self._positions = {s: i for i, s in enumerate(self.symbols)}
+
+    @classmethod
+    def from_frames(cls, frames, timeframe='day'):
+        """Align {symbol: DataFrame} onto the union of their timestamps."""
+        symbols = list(frames)
+        stamps = [to_nanoseconds(df.index) for df in frames.values()]
+        index = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype=np.int64)
+        shape = (len(index), len(symbols))
+        panels = {c: np.full(shape, np.nan, dtype=PRICE_DTYPE, order='F') for c in PRICE_COLUMNS}
+        volume = np.zeros(shape, dtype=VOLUME_DTYPE, order='F')
+        for j, (symbol, df) in enumerate(frames.items()):
+            rows = np.searchsorted(index, stamps[j])
+            for c in PRICE_COLUMNS:
+                panels[c][rows, j] = df[c].to_numpy()
+            volume[rows, j] = np.nan_to_num(df['volume'].to_numpy())
+        return cls(symbols, timeframe, index, volume=volume, **panels)
+
+    @classmethod
+    def from_long(cls, df, timeframe='day'):
+        """Build a universe from a long frame with a 'symbol' column (multi-symbol API responses)."""
+        return cls.from_frames({s: g for s, g in df.groupby('symbol', sort=False)}, timeframe)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def bars(self, symbol):
+        """Zero-copy CompactBars view of one symbol."""
+        j = self._positions[symbol]
+        return CompactBars(symbol, self.timeframe, self.index, self.open[:, j], self.high[:, j],
+                           self.low[:, j], self.close[:, j], self.volume[:, j])
+
+    def tail(self, n):
+        """The last n bars of every symbol as views of the same panels."""
+        return CompactUniverse(self.symbols, self.timeframe, self.index[-n:], self.open[-n:], self.high[-n:],
+                               self.low[-n:], self.close[-n:], self.volume[-n:])
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.index, self.open, self.high, self.low, self.close, self.volume))
+
+    def to_pandas(self, column='close'):
+        """One field as a (timestamps x symbols) DataFrame wrapping the panel."""
+        return pd.DataFrame(getattr(self, column), index=from_nanoseconds(self.index),
+                            columns=self.symbols, copy=False)
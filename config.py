@@ -9,3 +9,12 @@ ALPACA_CONFIG = {
 # If you want to go live, you must change this
 "PAPER": "https://paper-api.alpaca.markets", # Change PAPER to ENDPOINT for live trading 
 }
+
+# Limits for the cross-bot risk book in app.py (see risk_aggregator.RiskBook)
+RISK_LIMITS = {
+"max_gross_exposure": 1_000_000,
+"max_symbol_exposure": 100_000,
+"max_concentration": 0.25,  # Largest share of gross exposure one symbol may take...
+"concentration_min_gross": 250_000,  # ...once gross exposure reaches this
+"concentration_min_symbols": 5,  # ...or this many symbols are open
+}
@@ -1,21 +1,31 @@
 from config import ALPACA_CONFIG
+from custom_alpaca import CustomAlpaca
 from datetime import datetime
 from lumibot.backtesting import YahooDataBacktesting
-from lumibot.brokers import Alpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import numpy as np
-import pandas as pd
 import logging
-import talib
+from indicator_cache import cached, cached_ema
+from indicators import atr, macd, rsi
+from options_pricing import historical_vol, monthly_expiry, option_value, price_chain, select_by_delta, synthetic_chain
+from trade_journal import TradeJournaling
+from order_pipeline import AsyncOrders, order_key
+from bar_scheduler import BarAligned
+from event_bus import LiveEvents
+from signal_store import SignalRecording
+from history_batch import BatchedHistory
+import sampling_profiler
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class OptionsTrend(Strategy):
+class OptionsTrend(LiveEvents, SignalRecording, BarAligned, AsyncOrders, BatchedHistory, TradeJournaling, Strategy):
     def initialize(self):
         self.symbols = ["NFLX"]  # List of underlying tickers
-        self.sleeptime = "1S"
+        self.sleeptime = "1S"  # First iteration only; schedule_next_iteration() sets the rest
+        self.bar_timeframe = "1D"  # Wake when a bar of this timeframe closes
+        self.intrabar_check = "1min"  # Check option stops every minute while a contract is open
         self.contracts_per_trade = 1  # Total number of contracts per trade
         self.minimum_volume = 100000  # Minimum trading volume requirement
         self.ema_short = 9  # Adjustable short-term EMA (9 periods)
@@ -23,7 +33,8 @@ class OptionsTrend(Strategy):
         self.ema_200 = 200  # Long-term EMA (200 periods)
         self.risk_reward_ratio = 2  # Example: 2:1 risk-reward ratio
         self.atr_multiplier = 1.5  # ATR multiplier for the stop-loss calculation
-        self.expiry_date = "2024-05-31"  # Set the expiry date for options contracts
+        self.min_days_to_expiry = 7  # Trade the nearest monthly expiry at least this many days out
+        self.expiry_date = None  # Set from the strategy clock every iteration
         self.strike_price_offset = 1  # Offset from the current price
         self.rsi_period = 14  # RSI period
         self.rsi_overbought = 70  # RSI overbought threshold
@@ -31,10 +42,15 @@ class OptionsTrend(Strategy):
         self.macd_short = 12  # MACD short-term EMA
         self.macd_long = 26  # MACD long-term EMA
         self.macd_signal = 9  # MACD signal line period
-        self.trailing_stop = {}  # Dictionary to hold trailing stop prices
-
-    def create_options_order(self, symbol, qty, side, strike_price, expiry_date, option_type):
-        """Create an options order with the specified parameters."""
+        self.target_delta = 0.50  # Select the contract closest to this absolute delta
+        self.risk_free_rate = 0.05  # Risk-free rate used for option pricing
+        self.trailing_stop_pct = 0.30  # Exit when the option falls 30% from its peak value
+        self.trailing_stop = {}  # Dictionary to hold trailing stop option values
+        self.peak_value = {}  # Highest option value seen since entry
+        self.open_contracts = {}  # Contract details (strike, type, vol) for each open position
+
+    def create_options_order(self, symbol, qty, side, strike_price, expiry_date, option_type, key=None, context=None):
+        """Queue an options order with the specified parameters; returns its client_order_id."""
         try:
             logging.info(f"Creating {side.upper()} options order for {symbol}: Qty={qty}, "
                          f"Strike Price={strike_price}, Expiry Date={expiry_date}, Type={option_type}")
@@ -49,52 +65,67 @@ class OptionsTrend(Strategy):
                 "option_type": option_type
             }
             # Ensure this matches the broker's expected order format for options
-            created_order = self.broker.api.submit_order(**order)
-            return created_order
+            return self.queue_order(order, key=key, context=context)
         except Exception as e:
             logging.error(f"Error creating options order for {symbol}: {e}")
             return None
 
-    def calculate_macd(self, data):
-        """Calculate MACD and signal lines."""
-        macd_line = data['close'].ewm(span=self.macd_short, adjust=False).mean() - data['close'].ewm(span=self.macd_long, adjust=False).mean()
-        signal_line = macd_line.ewm(span=self.macd_signal, adjust=False).mean()
-        return macd_line, signal_line
-
-    def calculate_rsi(self, data, period):
-        """Calculate the Relative Strength Index (RSI)."""
-        delta = data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-
-    def calculate_atr(self, data, period=14):
-        """Calculate the Average True Range (ATR) for a given dataset."""
-        high_low = data['high'] - data['low']
-        high_close = abs(data['high'] - data['close'].shift(1))
-        low_close = abs(data['low'] - data['close'].shift(1))
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = ranges.max(axis=1)
-        return true_range.rolling(period).mean()
+    def set_exit_levels(self, symbol, contract, peak_value, trailing_stop):
+        """Start managing a position once its entry order is accepted."""
+        self.open_contracts[symbol] = contract
+        self.peak_value[symbol] = peak_value
+        self.trailing_stop[symbol] = trailing_stop
+
+    def clear_exit_levels(self, symbol):
+        """Forget the trailing stop, peak value and contract for a closed position."""
+        del self.trailing_stop[symbol]
+        del self.peak_value[symbol]
+        del self.open_contracts[symbol]
+
+    def select_contract(self, price, closes, option_type):
+        """Select the contract closest to the target delta from a chain priced at realized vol."""
+        vol = historical_vol(closes)
+        chain = synthetic_chain(price, self.expiry_date, vol, strike_step=self.strike_price_offset)
+        chain = price_chain(chain, price, rate=self.risk_free_rate, now=self.get_datetime())
+        return select_by_delta(chain, self.target_delta, option_type)
+
+    def on_order_ack(self, ack):
+        super().on_order_ack(ack)
+        if ack.status == "accepted":
+            # Orders sent straight to the broker API bypass lumibot's order events, so journal them here
+            self.journal_order(ack.symbol, ack.side, ack.qty, type="market",
+                               order_id=getattr(ack.order, "id", None), status="submitted")
+            if ack.context is not None:
+                # Only an entry this run got through has a position to manage; a "duplicate" ack is an
+                # earlier order (e.g. from before a restart) whose position may already be closed
+                self.set_exit_levels(ack.symbol, **ack.context)
+
+    def has_open_exits(self):
+        return bool(self.open_contracts)
 
     def on_trading_iteration(self):
+        self.process_order_acks()
+        self.expiry_date = monthly_expiry(self.get_datetime(), self.min_days_to_expiry)
+        self.prefetch_history(self.symbols, 200)
         for symbol in self.symbols:
             try:
                 # Fetch historical prices and calculate EMAs
-                bars = self.get_historical_prices(symbol, 200, "day")
+                bars = self.get_history(symbol, 200)
                 if bars.df.empty:
                     logging.info(f"No historical data found for {symbol}")
                     continue
 
                 stock_data = bars.df
-                stock_data[f'{self.ema_short}-day'] = stock_data['close'].ewm(span=self.ema_short, adjust=False).mean()
-                stock_data[f'{self.ema_long}-day'] = stock_data['close'].ewm(span=self.ema_long, adjust=False).mean()
-                stock_data[f'{self.ema_200}-day'] = stock_data['close'].ewm(span=self.ema_200, adjust=False).mean()
-                stock_data['ATR'] = self.calculate_atr(stock_data)
-                stock_data['RSI'] = self.calculate_rsi(stock_data, self.rsi_period)
-                stock_data['MACD'], stock_data['Signal_Line'] = self.calculate_macd(stock_data)
+                stock_data[f'{self.ema_short}-day'] = cached_ema(symbol, "day", stock_data, self.ema_short)
+                stock_data[f'{self.ema_long}-day'] = cached_ema(symbol, "day", stock_data, self.ema_long)
+                stock_data[f'{self.ema_200}-day'] = cached_ema(symbol, "day", stock_data, self.ema_200)
+                stock_data['ATR'] = cached(symbol, "day", "atr_sma", (14,), stock_data,
+                                           lambda d: atr(d['high'], d['low'], d['close'], 14, method="sma"))
+                stock_data['RSI'] = cached(symbol, "day", "rsi_sma", (self.rsi_period,), stock_data,
+                                           lambda d: rsi(d['close'], self.rsi_period, method="sma"))
+                stock_data['MACD'], stock_data['Signal_Line'], _ = cached(
+                    symbol, "day", "macd", (self.macd_short, self.macd_long, self.macd_signal), stock_data,
+                    lambda d: macd(d['close'], self.macd_short, self.macd_long, self.macd_signal, method="ema"))
 
                 logging.info(f"{symbol} data for decision:\n{stock_data.tail()}")
 
@@ -125,56 +156,78 @@ class OptionsTrend(Strategy):
 
                 signal = stock_data.iloc[-1]['Signal']
                 logging.info(f"{symbol}: Detected Signal = {signal}")
+                self.publish_signal(symbol, signal, price=float(stock_data.iloc[-1]['close']))
+                self.record_signal(symbol, signal, stock_data.iloc[-1])
 
                 if signal:
-                    open_orders = self.broker.api.get_orders()
+                    open_orders = self.broker.client.get_orders()
                     if any(o.symbol == symbol for o in open_orders):
                         logging.info(f"Skipping {symbol}, open orders found.")
                         continue
 
                     entry_price = stock_data.iloc[-1]['close']
-                    atr = stock_data.iloc[-1]['ATR']
-                    if signal == 'BUY_CALL':
-                        strike_price = round(entry_price + self.strike_price_offset, 2)
-                        option_type = "call"
-                        stop_loss = entry_price * 0.90  # 10% stop loss for calls
-                        self.trailing_stop[symbol] = stop_loss
-                    elif signal == 'BUY_PUT':
-                        strike_price = round(entry_price - self.strike_price_offset, 2)
-                        option_type = "put"
-                        stop_loss = entry_price * 1.10  # 10% stop loss for puts
-                        self.trailing_stop[symbol] = stop_loss
+                    option_type = "call" if signal == 'BUY_CALL' else "put"
+                    contract = self.select_contract(entry_price, stock_data['close'], option_type)
+                    if contract is None:
+                        logging.info(f"No contract near delta {self.target_delta} for {symbol}")
+                        continue
+
+                    strike_price = round(float(contract['strike']), 2)
+                    entry_value = float(contract['theo'])
+                    stop_loss = entry_value * (1 - self.trailing_stop_pct)
+                    # Applied when the broker accepts the entry, so a dropped duplicate can't reset them
+                    levels = {
+                        "contract": {
+                            "strike": strike_price,
+                            "option_type": option_type,
+                            "vol": float(contract['iv']),
+                            "expiry": self.expiry_date
+                        },
+                        "peak_value": entry_value,
+                        "trailing_stop": stop_loss
+                    }
 
                     # Log order details before submission
-                    logging.info(f"Order Details - {symbol}: Strike={strike_price}, Expiry={self.expiry_date}, Type={option_type}, Stop Loss={stop_loss}")
+                    logging.info(f"Order Details - {symbol}: Strike={strike_price}, Expiry={self.expiry_date}, Type={option_type}, "
+                                 f"Delta={contract['delta']:.2f}, Value={entry_value:.2f}, Stop Loss={stop_loss:.2f}")
 
                     # Create the options order
-                    order = self.create_options_order(symbol, self.contracts_per_trade, 'buy', strike_price, self.expiry_date, option_type)
+                    key = order_key(self.name, symbol, signal, stock_data.index[-1])
+                    order = self.create_options_order(symbol, self.contracts_per_trade, 'buy', strike_price, self.expiry_date, option_type,
+                                                      key=key, context=levels)
                     if order:
-                        logging.info(f"{signal} options order submitted for {symbol} with strike at {strike_price} and expiry on {self.expiry_date}")
+                        logging.info(f"{signal} options order queued for {symbol} with strike at {strike_price} and expiry on {self.expiry_date}")
 
-                # Check trailing stop condition
-                if symbol in self.trailing_stop:
+                # Check trailing stop condition on the option value
+                if symbol in self.open_contracts:
+                    contract = self.open_contracts[symbol]
                     current_price = stock_data.iloc[-1]['close']
-                    if signal == 'BUY_CALL' and current_price < self.trailing_stop[symbol]:
-                        logging.info(f"Trailing stop hit for {symbol}, selling call option")
+                    current_value = option_value(current_price, contract['strike'], contract['expiry'], contract['vol'],
+                                                 contract['option_type'], self.risk_free_rate, now=self.get_datetime())
+                    # Option fills are journaled under the underlying's symbol, so mark it at the option's value
+                    self.journal_mark(symbol, current_value)
+                    if current_value > self.peak_value[symbol]:
+                        # Ratchet the stop up as the option gains value
+                        self.peak_value[symbol] = current_value
+                        self.trailing_stop[symbol] = current_value * (1 - self.trailing_stop_pct)
+                    elif current_value < self.trailing_stop[symbol]:
+                        logging.info(f"Trailing stop hit for {symbol} at option value {current_value:.2f}, selling {contract['option_type']} option")
                         self.sell_all()
-                        del self.trailing_stop[symbol]
-                    elif signal == 'BUY_PUT' and current_price > self.trailing_stop[symbol]:
-                        logging.info(f"Trailing stop hit for {symbol}, selling put option")
-                        self.sell_all()
-                        del self.trailing_stop[symbol]
+                        self.clear_exit_levels(symbol)
 
             except Exception as e:
                 logging.error(f"Error processing {symbol}: {e}")
 
+        self.schedule_next_iteration()
+
 if __name__ == "__main__":
     trade = True  # If true will trade
     if trade:
-        broker = Alpaca(ALPACA_CONFIG)
+        broker = CustomAlpaca(ALPACA_CONFIG)
         strategy = OptionsTrend(broker=broker)
         bot = Trader()
         bot.add_strategy(strategy)
+        sampling_profiler.install("day_trend")
         bot.run_all()
     else:
         start = datetime(2022, 4, 15)
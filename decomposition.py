@@ -0,0 +1,165 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import time
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.seasonal import STL, seasonal_decompose
+from column_store import STORE_DIR, ColumnStore
+from compact_bars import to_nanoseconds
+
+
+INPUTS = "inputs"
+COMPONENTS = "components"
+
+# period None: inferred from the series' spacing; method "stl", "additive" or "multiplicative"
+DecompositionJob = namedtuple("DecompositionJob", ["name", "column", "period", "method", "log"],
+                              defaults=["close", None, "stl", False])
+
+
+def infer_period(index):
+    """Seasonal period for a series' spacing: a session of intraday bars, a trading week of daily
+    bars, a year of weekly, monthly or quarterly data."""
+    days = np.median(np.diff(to_nanoseconds(index))) / 86_400e9
+    if days < 0.9:
+        return max(2, int(round(390 / (days * 1440))))
+    for limit, period in ((1.5, 5), (8, 52), (32, 12), (93, 4)):
+        if days <= limit:
+            return period
+    raise ValueError(f"No seasonal period for observations {days:.0f} days apart")
+
+
+def decompose(series, period=None, method="stl", log=False, robust=True):
+    """Observed, trend, seasonal and residual components of one series as a DataFrame."""
+    values = series.dropna().astype(np.float64)
+    if log:
+        values = np.log(values[values > 0])
+    period = period or infer_period(values.index)
+    if method == "stl":
+        result = STL(values, period=period, robust=robust).fit()
+    else:
+        result = seasonal_decompose(values, model=method, period=period, extrapolate_trend="freq")
+    return pd.DataFrame({
+        "observed": values.to_numpy(),
+        "trend": np.asarray(result.trend, dtype=np.float64),
+        "seasonal": np.asarray(result.seasonal, dtype=np.float64),
+        "resid": np.asarray(result.resid, dtype=np.float64),
+    }, index=values.index)
+
+
+# Opened once per worker process; each job maps its input from disk instead of receiving it pickled
+_store = None
+
+
+def _init_worker(root):
+    global _store
+    _store = ColumnStore(root)
+
+
+def _run_job(job):
+    started = time.perf_counter()
+    try:
+        series = _store.read(f"{INPUTS}/{job.name}", [job.column])[job.column]
+        period = job.period or infer_period(series.index)
+        components = decompose(series, period, job.method, job.log)
+        _store.write(f"{COMPONENTS}/{job.name}/{job.column}", components, period=period, method=job.method,
+                     log=job.log)
+        return job.name, job.column, len(components), time.perf_counter() - started, None
+    except Exception as e:
+        return job.name, job.column, 0, time.perf_counter() - started, str(e)
+
+
+def decompose_all(jobs, root=STORE_DIR, workers=None, chunksize=4):
+    """Fit every job in a process pool and write components/<name>/<column>; returns one row per job."""
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(root,)) as pool:
+        rows = list(pool.map(_run_job, jobs, chunksize=chunksize))
+    report = pd.DataFrame(rows, columns=["name", "column", "rows", "seconds", "error"])
+    for row in report[report["error"].notna()].itertuples():
+        logging.error(f"Decomposition of {row.name}/{row.column} failed: {row.error}")
+    logging.info(f"Decomposed {len(report)} series in {time.perf_counter() - started:.2f}s "
+                 f"({report['seconds'].sum():.2f}s of fitting)")
+    return report
+
+
+def default_jobs(store):
+    """STL on log close and log volume for cached bars, and on the value of cached macro series."""
+    jobs = []
+    for table in store.names(INPUTS):
+        name = table[len(INPUTS) + 1:]
+        if store.meta(table).get("kind") == "macro":
+            jobs.append(DecompositionJob(name, "value"))
+        else:
+            jobs += [DecompositionJob(name, "close", log=True), DecompositionJob(name, "volume", log=True)]
+    return jobs
+
+
+def cache_bars(api, symbols, days=756, store=None):
+    """Copy daily close and volume for symbols into the local store (inputs/<symbol>)."""
+    from history_batch import HistoryBatch
+
+    store = store or ColumnStore()
+    windows = HistoryBatch(api, "day").request_all(symbols, days).fetch()
+    for symbol, df in windows.items():
+        store.write(f"{INPUTS}/{symbol}", df[["close", "volume"]].astype(np.float64), kind="bars")
+    return sorted(windows)
+
+
+def cache_fred(series_ids, start="2010-01-01", store=None):
+    """Copy FRED macro series (e.g. UNRATE, CPIAUCSL) into the local store (inputs/<id>)."""
+    import pandas_datareader.data as web
+
+    store = store or ColumnStore()
+    for series_id in series_ids:
+        df = web.DataReader(series_id, "fred", start).dropna()
+        store.write(f"{INPUTS}/{series_id}", df.rename(columns={series_id: "value"}).astype(np.float64),
+                    kind="macro")
+    return list(series_ids)
+
+
+def seasonal_features(name, column="close", store=None):
+    """Latest trend slope, seasonal component and residual z-score from stored components.
+
+    Reads a few values from the memory-mapped columns, so strategies get the
+    features without fitting anything at trade time.
+    """
+    store = store or ColumnStore()
+    table = f"{COMPONENTS}/{name}/{column}"
+    meta = store.meta(table)
+    _, c = store.read_arrays(table, ["trend", "seasonal", "resid"])
+    period = meta["period"]
+    resid = np.asarray(c["resid"][-4 * period:])
+    return {
+        "trend_slope": float(c["trend"][-1] - c["trend"][-2]),
+        "seasonal": float(c["seasonal"][-1]),
+        "seasonal_next": float(c["seasonal"][-period]),  # The next bar's phase, one cycle back
+        "resid_z": float(resid[-1] / resid.std()) if resid.std() > 0 else 0.0,
+        "period": period,
+    }
+
+
+if __name__ == "__main__":
+    # 300 synthetic daily and monthly series through the pool, then features for one of them
+    import tempfile
+
+    logging.basicConfig(level=logging.INFO)
+    rng = np.random.default_rng(0)
+    store = ColumnStore(tempfile.mkdtemp())
+    days = pd.bdate_range("2021-01-01", periods=756)
+    for i in range(250):
+        weekly = 0.002 * np.sin(2 * np.pi * np.arange(len(days)) / 5)
+        close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(days))) + weekly)
+        volume = rng.lognormal(13, 0.3, len(days)) * (1 + 0.2 * (days.dayofweek == 0))
+        store.write(f"{INPUTS}/SYM{i:03d}", pd.DataFrame({"close": close, "volume": volume}, index=days), kind="bars")
+    months = pd.date_range("2005-01-01", periods=240, freq="MS")
+    for i in range(50):
+        value = 5 + np.cumsum(rng.normal(0, 0.1, len(months))) + np.sin(2 * np.pi * months.month / 12)
+        store.write(f"{INPUTS}/MACRO{i:02d}", pd.DataFrame({"value": value}, index=months), kind="macro")
+
+    jobs = default_jobs(store)
+    started = time.perf_counter()
+    report = decompose_all(jobs, root=store.root)
+    print(f"{len(jobs)} decompositions in {time.perf_counter() - started:.2f}s, {report['error'].notna().sum()} failed")
+    started = time.perf_counter()
+    features = seasonal_features("SYM000", "close", store)
+    print(f"features in {(time.perf_counter() - started) * 1000:.2f}ms: {features}")
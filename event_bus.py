@@ -0,0 +1,280 @@
+import asyncio
+from collections import OrderedDict
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+import requests
+
+
+EVENTS_URL = "http://localhost:8000/events"
+EVENT_TYPES = ("signal", "order", "status")
+
+
+def coalesce_key(event):
+    """Events with the same key supersede each other: the latest signal per bot and symbol, the
+    latest status per bot. Orders are never coalesced (None)."""
+    if event["type"] == "signal":
+        return ("signal", event["bot"], event.get("symbol"))
+    if event["type"] == "status":
+        return ("status", event["bot"])
+    return None
+
+
+class Subscriber:
+    """One dashboard connection's pending events.
+
+    Events wait in an ordered dict keyed by coalesce_key (or their sequence
+    number), so a client that falls behind gets only the newest signal/status
+    for each key instead of the whole backlog. Past max_pending the oldest
+    events are dropped and the next batch starts with a "lagged" notice.
+    """
+
+    def __init__(self, bot=None, max_pending=256):
+        self.bot = bot
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+        self._lagged = 0
+
+    def offer(self, key, seq, payload):
+        key = key if key is not None else seq
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = payload
+        if len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+            self._lagged += 1
+        self.ready.set()
+
+    async def next_message(self, linger=0.1, heartbeat=30.0):
+        """JSON array of everything pending, waiting up to heartbeat seconds ('[]' if nothing came).
+
+        After the first event arrives it lingers a moment so bursts go out as
+        one frame, with repeated signals already coalesced.
+        """
+        try:
+            await asyncio.wait_for(self.ready.wait(), heartbeat)
+        except asyncio.TimeoutError:
+            return "[]"
+        await asyncio.sleep(linger)
+        payloads = list(self.pending.values())
+        self.pending.clear()
+        self.ready.clear()
+        if self._lagged:
+            payloads.insert(0, json.dumps({"type": "lagged", "dropped": self._lagged}))
+            self._lagged = 0
+        return "[" + ",".join(payloads) + "]"
+
+
+class EventBus:
+    """In-process fan-out of bot events to dashboard WebSockets (lives in app.py's event loop).
+
+    Each event is serialized once and handed to every subscriber as the same
+    string, so publishing costs one dict insert per client. Slow clients only
+    grow their own pending set; nobody else waits on them. The latest
+    signal/status per key is kept so new clients start from current state.
+    """
+
+    def __init__(self, max_pending=256):
+        self.max_pending = max_pending
+        self.subscribers = set()
+        self.latest = OrderedDict()  # coalesce_key -> (seq, payload)
+        self.published = 0
+        self._seq = itertools.count(1)
+
+    def publish(self, event):
+        if event.get("type") not in EVENT_TYPES or not event.get("bot"):
+            raise ValueError(f"Events need a bot and a type in {EVENT_TYPES}: {event}")
+        seq = next(self._seq)
+        event = dict(event, seq=seq)
+        event.setdefault("ts", time.time())
+        payload = json.dumps(event, default=str)
+        key = coalesce_key(event)
+        if key is not None:
+            self.latest[key] = (seq, payload)
+        for subscriber in self.subscribers:
+            if subscriber.bot is None or subscriber.bot == event["bot"]:
+                subscriber.offer(key, seq, payload)
+        self.published += 1
+        return seq
+
+    def subscribe(self, bot=None):
+        subscriber = Subscriber(bot, self.max_pending)
+        for key, (seq, payload) in self.latest.items():
+            if bot is None or key[1] == bot:
+                subscriber.offer(key, seq, payload)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def snapshot(self, bot=None):
+        """Latest signal and status events, for clients that can't hold a WebSocket open."""
+        return [json.loads(payload) for key, (seq, payload) in self.latest.items() if bot is None or key[1] == bot]
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "subscribers": len(self.subscribers),
+            "pending": sum(len(s.pending) for s in self.subscribers),
+            "coalesced": sum(s.coalesced for s in self.subscribers),
+            "dropped": sum(s.dropped for s in self.subscribers),
+        }
+
+
+class EventPublisher:
+    """Bot-side sender: events are queued and POSTed to app.py in batches from a background thread.
+
+    publish() never blocks the strategy loop. If app.py is down, batches are
+    dropped and sending pauses for retry_after seconds.
+    """
+
+    def __init__(self, url=EVENTS_URL, max_queue=1000, max_batch=100, linger=0.05, timeout=1.0, retry_after=5.0):
+        self.url = url
+        self.max_batch = max_batch
+        self.linger = linger
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.sent = self.dropped = 0
+        self._queue = queue.Queue(max_queue)
+        self._session = requests.Session()
+        self._paused_until = 0.0
+        threading.Thread(target=self._run, name="event-publisher", daemon=True).start()
+
+    def publish(self, event):
+        event.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._batch()
+            if time.monotonic() < self._paused_until:
+                self.dropped += len(batch)
+                continue
+            try:
+                self._session.post(self.url, data=json.dumps(batch, default=str),
+                                   headers={"Content-Type": "application/json"},
+                                   timeout=self.timeout).raise_for_status()
+                self.sent += len(batch)
+            except requests.RequestException as e:
+                logging.warning(f"Could not send {len(batch)} event(s) to the dashboard: {e}")
+                self.dropped += len(batch)
+                self._paused_until = time.monotonic() + self.retry_after
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def publish_event(kind, bot, **fields):
+    """Send a signal/order/status event to the dashboard from a bot process."""
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            _publisher = EventPublisher()
+    _publisher.publish(dict(fields, type=kind, bot=bot))
+
+
+class LiveEvents:
+    """Strategy mixin: publish signals, order updates and bot status to the dashboard feed.
+
+    Events go out under control_name (the bot name app.py uses) when set, else the strategy name.
+    """
+
+    @property
+    def feed_name(self):
+        return getattr(self, "control_name", None) or self.name
+
+    def publish_signal(self, symbol, signal, **fields):
+        publish_event("signal", self.feed_name, symbol=symbol, signal=signal, **fields)
+
+    def publish_status(self, status, **fields):
+        publish_event("status", self.feed_name, status=status, **fields)
+
+    def publish_order(self, symbol, side, qty, status, **fields):
+        publish_event("order", self.feed_name, symbol=symbol, side=side, qty=float(qty), status=status, **fields)
+
+    def before_starting_trading(self):
+        self.publish_status("trading")
+        super().before_starting_trading()
+
+    def on_abrupt_closing(self):
+        self.publish_status("stopped")
+        super().on_abrupt_closing()
+
+    def on_bot_crash(self, error):
+        self.publish_status("crashed", error=str(error))
+        super().on_bot_crash(error)
+
+    def on_new_order(self, order):
+        self.publish_order(order.asset.symbol, order.side, order.quantity, "new", order_id=order.identifier)
+        super().on_new_order(order)
+
+    def on_filled_order(self, position, order, price, quantity, multiplier):
+        self.publish_order(order.asset.symbol, order.side, quantity * multiplier, "filled", price=price,
+                           order_id=order.identifier)
+        super().on_filled_order(position, order, price, quantity, multiplier)
+
+    def on_order_ack(self, ack):
+        """Orders queued through order_pipeline.AsyncOrders."""
+        self.publish_order(ack.symbol, ack.side, ack.qty, ack.status, order_id=getattr(ack.order, "id", None),
+                           key=ack.key, error=ack.error)
+        super().on_order_ack(ack)
+
+
+if __name__ == "__main__":
+    # 500 dashboard clients, 5 of them stalled, while 20 bots publish signals for 3 symbols every 100ms
+    async def main():
+        bus = EventBus()
+        clients = [bus.subscribe() for _ in range(500)]
+        delivered, frames, latency = 0, 0, []
+
+        async def reader(subscriber):
+            nonlocal delivered, frames
+            while True:
+                events = json.loads(await subscriber.next_message())
+                delivered += len(events)
+                frames += 1
+                latency.extend(time.time() - e["ts"] for e in events if "ts" in e)
+
+        readers = [asyncio.create_task(reader(c)) for c in clients[5:]]
+        started = time.perf_counter()
+        for tick in range(50):
+            for bot in range(20):
+                for symbol in ("GME", "MRNA", "AMC"):
+                    bus.publish({"type": "signal", "bot": f"bot{bot}", "symbol": symbol, "signal": "BUY", "tick": tick})
+                if tick % 10 == 0:
+                    bus.publish({"type": "order", "bot": f"bot{bot}", "symbol": "GME", "side": "buy", "qty": 1.0,
+                                 "status": "filled"})
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.2)
+        for task in readers:
+            task.cancel()
+        latency.sort()
+        print(f"{bus.published} events to {len(clients)} clients in {elapsed:.2f}s: "
+              f"{delivered} delivered in {frames} frames")
+        print(f"latency p50 {latency[len(latency) // 2] * 1000:.1f}ms, p99 {latency[int(len(latency) * 0.99)] * 1000:.1f}ms")
+        print(f"stalled client holds {len(clients[0].pending)} events; {bus.stats()}")
+
+    asyncio.run(main())
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import pandas_datareader as pdr
 import yfinance as yf
+from signal_store import SignalStore
 
 
 gld = pd.DataFrame(yf.download("GLD", "2022-01-01")['Close'])
@@ -29,7 +30,11 @@ def signal(df, start="2022-05-16", end="2022-06-16"):
 print(gld)
 print("-" * 10)
 print(gld.iloc[-1].Signal)
-gld.to_csv('gld_signal.csv')
+# Append the days not stored yet to the signal store instead of rewriting a CSV
+store = SignalStore()
+latest = store.latest("gld_signal", "GLD")
+index = gld.index.tz_localize("UTC") if gld.index.tz is None else gld.index
+store.append_frame("gld_signal", "GLD", gld[index > latest] if latest is not None else gld)
 
 data, sig = signal(gld)
 print(data)
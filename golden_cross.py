@@ -1,15 +1,19 @@
 from config import ALPACA_CONFIG
 from datetime import datetime, timedelta
 from lumibot.backtesting import YahooDataBacktesting
-from lumibot.brokers import Alpaca
+from custom_alpaca import CustomAlpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import numpy as np
 import pandas as pd
+from trade_journal import TradeJournaling
+from risk_aggregator import RiskChecked
+from history_batch import BatchedHistory
+import sampling_profiler
 
 
 
-class Trend(Strategy):
+class Trend(RiskChecked, BatchedHistory, TradeJournaling, Strategy):
 
     def initialize(self):
         self.tickers = ["JBI", "SPY", "AAPL"]  # Modify this list to include your desired tickers
@@ -18,9 +22,10 @@ class Trend(Strategy):
         self.ema_long = 48  # 48-day EMA
 
     def on_trading_iteration(self):
+        self.prefetch_history(self.tickers, self.ema_long + 1)
         for symbol in self.tickers:
             # Fetch historical prices for each symbol with the appropriate window size
-            bars = self.get_historical_prices(symbol, self.ema_long + 1, "day")
+            bars = self.get_history(symbol, self.ema_long + 1)
             data = bars.df
 
             # Calculate short-term (13-day) and long-term (48-day) EMAs
@@ -48,32 +53,29 @@ class Trend(Strategy):
             # Get the latest trading signal
             signal = data.iloc[-1]['Signal']
             quantity = 100
+            latest_price = data.iloc[-1]['close']
+            self.mark_price(symbol, latest_price)
+            self.journal_mark(symbol, latest_price)
 
             # Execute trades based on the detected signal
-            if signal == 'BUY':
-                pos = self.get_position(symbol)
-                if pos is not None:
-                    self.sell_all()
+            if signal in ('BUY', 'SELL'):
+                # Close only this symbol's position; sell_all() would flatten every ticker
+                self.close_position(symbol)
 
-                order = self.create_order(symbol, quantity, "buy")
-                self.submit_order(order)
-
-            elif signal == 'SELL':
-                pos = self.get_position(symbol)
-                if pos is not None:
-                    self.sell_all()
-
-                order = self.create_order(symbol, quantity, "sell")
-                self.submit_order(order)
+                side = signal.lower()
+                if self.risk_allows(symbol, side, quantity, latest_price):
+                    order = self.create_order(symbol, quantity, side)
+                    self.submit_order(order)
 
 
 if __name__ == "__main__":
     trade = True  # If true will trade
     if trade:
-        broker = Alpaca(ALPACA_CONFIG)
+        broker = CustomAlpaca(ALPACA_CONFIG)
         strategy = Trend(broker=broker)
         bot = Trader()
         bot.add_strategy(strategy)
+        sampling_profiler.install("golden_cross")
         bot.run_all()
     else:
         start = datetime(2022, 4, 15)
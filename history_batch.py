@@ -0,0 +1,333 @@
+from datetime import datetime, time as dt_time, timedelta
+import logging
+import math
+import threading
+import time
+import pandas as pd
+from bar_scheduler import MarketCalendar
+from broker_client import Bars
+from compact_bars import CompactBars
+
+
+TIMEFRAMES = {"day": "1Day", "minute": "1Min"}  # lumibot timestep names -> data API timeframes
+SESSION_MINUTES = 390
+
+
+def api_timeframe(timeframe):
+    """Data API timeframe for a lumibot timestep ('day'), an API string ('15Min') or a TimeFrame object."""
+    return TIMEFRAMES.get(timeframe, timeframe) if isinstance(timeframe, str) else timeframe
+
+
+def bars_per_session(timeframe):
+    """Regular-session bars per trading day (1 for daily and longer bars)."""
+    delta = pd.Timedelta(str(api_timeframe(timeframe)).replace("Min", "min").replace("Hour", "h"))
+    if delta >= pd.Timedelta(days=1):
+        return 1
+    return max(1, SESSION_MINUTES // int(delta.total_seconds() // 60))
+
+
+def lookback_start(end, length, timeframe="day", calendar=None):
+    """Midnight of the earliest session needed for `length` bars up to end.
+
+    Counts trading sessions on the exchange calendar, plus one spare in case
+    today's session hasn't produced its bars yet, so holidays and weekends
+    don't make the window come up short.
+    """
+    calendar = calendar or MarketCalendar()
+    sessions = math.ceil(length / bars_per_session(timeframe)) + 1
+    day = end.astimezone(calendar.tz).date() if end.tzinfo else end.date()
+    while True:
+        if calendar.is_session(day):
+            sessions -= 1
+            if sessions == 0:
+                return datetime.combine(day, dt_time(0), calendar.tz)
+        day -= timedelta(days=1)
+
+
+class HistoryBatch:
+    """Collects the bar windows an iteration needs and loads them with multi-symbol requests.
+
+    Symbols sharing a start date go to the data API together, max_symbols per
+    request (the client follows next_page_token through the pages), and the
+    long response is split back into one window per symbol. 200 symbols cost
+    one or two requests instead of 200.
+    """
+
+    def __init__(self, api, timeframe="day", max_symbols=200, calendar=None, feed=None):
+        self.api = api
+        self.timeframe = timeframe
+        self.max_symbols = max_symbols
+        self.calendar = calendar or MarketCalendar()
+        self.feed = feed
+        self.requests = {}  # symbol -> (length, start)
+        self.windows = {}
+        self.stats = {"symbols": 0, "requests": 0, "bars": 0}
+
+    def request(self, symbol, length=None, start=None):
+        """Ask for the last `length` bars of symbol, or everything since start."""
+        old_length, old_start = self.requests.get(symbol, (None, None))
+        if old_length is not None and length is not None:
+            length = max(old_length, length)
+        starts = [s for s in (old_start, start) if s is not None]
+        self.requests[symbol] = (length, min(starts) if starts else None)
+
+    def request_all(self, symbols, length=None, start=None):
+        for symbol in symbols:
+            self.request(symbol, length, start)
+        return self
+
+    def _start(self, length, start, end):
+        if length is None:
+            return start
+        needed = lookback_start(end, length, self.timeframe, self.calendar)
+        return min(needed, start) if start is not None else needed
+
+    def _load(self, symbols, start, end):
+        kwargs = {"start": start.isoformat(), "end": end.isoformat(), "adjustment": "raw"}
+        if self.feed:
+            kwargs["feed"] = self.feed
+        df = self.api.get_bars(symbols, api_timeframe(self.timeframe), **kwargs).df
+        self.stats["requests"] += 1
+        self.stats["bars"] += len(df)
+        if "symbol" not in df.columns:
+            df = df.assign(symbol=symbols[0])  # Single-symbol responses leave the column out
+        return df
+
+    def fetch(self, end=None):
+        """Load every requested window; returns {symbol: DataFrame} indexed in exchange time."""
+        end = end or datetime.now(self.calendar.tz)
+        if end.tzinfo is None:
+            end = end.astimezone()
+        groups = {}
+        for symbol, (length, start) in self.requests.items():
+            groups.setdefault(self._start(length, start, end), []).append(symbol)
+        for start, symbols in groups.items():
+            for i in range(0, len(symbols), self.max_symbols):
+                chunk = symbols[i:i + self.max_symbols]
+                try:
+                    df = self._load(chunk, start, end)
+                except Exception as e:
+                    # Leave these symbols out; callers fall back to per-symbol requests for them
+                    logging.error(f"Error loading bars for {chunk[0]}..{chunk[-1]}: {e}")
+                    continue
+                if not df.empty:
+                    df.index = df.index.tz_convert(self.calendar.tz)
+                for symbol, group in df.groupby("symbol", sort=False):
+                    length = self.requests[symbol][0]
+                    window = group.drop(columns="symbol")
+                    self.windows[symbol] = window.tail(length) if length is not None else window
+        self.stats["symbols"] = len(self.requests)
+        logging.info(f"Loaded {self.stats['bars']} bars for {len(self.requests)} symbols in "
+                     f"{self.stats['requests']} request(s)")
+        return self.windows
+
+    def get(self, symbol):
+        """One symbol's window as Bars (empty if the API returned nothing for it)."""
+        df = self.windows.get(symbol)
+        if df is None:
+            df = pd.DataFrame(columns=["open", "high", "low", "close", "volume"],
+                              index=pd.DatetimeIndex([], tz=self.calendar.tz, name="timestamp"))
+        return Bars(df)
+
+
+class HistoryCache:
+    """Bar windows shared by every strategy in the process, reloaded after max_age seconds.
+
+    Keyed by (symbol, timeframe), keeping the window last loaded, so ten
+    strategies trading SPY hold one copy of its bars and load it once per
+    max_age. Symbols missing from the cache are loaded together through one
+    HistoryBatch; a symbol another strategy is already loading is waited for
+    instead of requested twice. Windows are shared, so callers must copy
+    before modifying them (get_history() does).
+    """
+
+    def __init__(self, max_age=30.0, max_symbols=200):
+        self.max_age = max_age
+        self.max_symbols = max_symbols
+        self._windows = {}  # (symbol, timeframe) -> (loaded, length, DataFrame)
+        self._loading = {}  # (symbol, timeframe) -> Event set when the load finishes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "waits": 0, "requests": 0}
+
+    def _fresh(self, key, length, now):
+        entry = self._windows.get(key)
+        return entry is not None and now - entry[0] < self.max_age and entry[1] >= length
+
+    def batch(self, api, symbols, length, timeframe="day", end=None):
+        """A HistoryBatch holding every symbol's window, loading only what the cache lacks."""
+        batch = HistoryBatch(api, timeframe, self.max_symbols).request_all(symbols, length)
+        with self._lock:
+            now = time.monotonic()
+            missing, waiting = [], []
+            for symbol in batch.requests:
+                key = (symbol, timeframe)
+                if self._fresh(key, length, now):
+                    self.stats["hits"] += 1
+                elif key in self._loading:
+                    waiting.append(self._loading[key])
+                else:
+                    self._loading[key] = threading.Event()
+                    missing.append(symbol)
+            self.stats["misses"] += len(missing)
+            self.stats["waits"] += len(waiting)
+            # Another strategy may want a longer window of the same symbols; reload at least that much
+            longest = max([length] + [self._windows[(s, timeframe)][1] for s in missing
+                                      if (s, timeframe) in self._windows])
+
+        if missing:
+            loader = HistoryBatch(api, timeframe, self.max_symbols).request_all(missing, longest)
+            try:
+                loader.fetch(end=end)
+            finally:
+                loaded = time.monotonic()
+                with self._lock:
+                    self.stats["requests"] += loader.stats["requests"]
+                    for symbol in missing:
+                        if symbol in loader.windows:
+                            self._windows[(symbol, timeframe)] = (loaded, longest, loader.windows[symbol])
+                        self._loading.pop((symbol, timeframe)).set()
+        for event in waiting:
+            event.wait()
+
+        with self._lock:
+            for symbol in batch.requests:
+                entry = self._windows.get((symbol, timeframe))
+                if entry is not None:
+                    batch.windows[symbol] = entry[2]
+        return batch
+
+    def prune(self):
+        """Drop windows older than max_age; returns how many were dropped."""
+        with self._lock:
+            now = time.monotonic()
+            stale = [key for key, entry in self._windows.items() if now - entry[0] >= self.max_age]
+            for key in stale:
+                del self._windows[key]
+        return len(stale)
+
+    def status(self):
+        with self._lock:
+            return dict(self.stats, windows=len(self._windows),
+                        bars=sum(len(entry[2]) for entry in self._windows.values()))
+
+
+# Off unless a process runs several strategies (strategy_runner.py turns it on)
+_shared_history = None
+_warm_lock = threading.Lock()
+
+
+def share_history(max_age=30.0):
+    """Have BatchedHistory strategies in this process share one HistoryCache; returns it."""
+    global _shared_history
+    if _shared_history is None:
+        _shared_history = HistoryCache(max_age)
+    return _shared_history
+
+
+class BatchedHistory:
+    """Strategy mixin: fetch every symbol's bars for an iteration up front in a few requests.
+
+    Call prefetch_history(symbols, length) at the top of on_trading_iteration
+    and get_history() in place of get_historical_prices(). Backtests, and any
+    symbol the batch couldn't load, go through get_historical_prices() as before.
+    When share_history() is on, windows come from the process-wide HistoryCache.
+    warm_history() loads symbols ahead of the iteration that first needs them.
+    """
+
+    def prefetch_history(self, symbols, length, timeframe="day"):
+        self._history_batch = None
+        api = getattr(self.broker, "client", None)  # CustomAlpaca's BrokerClient
+        if self.is_backtesting or api is None:
+            return
+        if _shared_history is not None:
+            self._history_batch = _shared_history.batch(api, symbols, length, timeframe, end=self.get_datetime())
+            return
+        warmed = self._take_warmed(symbols, length, timeframe)
+        batch = HistoryBatch(api, timeframe).request_all([s for s in symbols if s not in warmed], length)
+        batch.fetch(end=self.get_datetime())
+        batch.windows.update(warmed)
+        self._history_batch = batch
+
+    def warm_history(self, symbols, length, timeframe="day"):
+        """Load bars ahead of the iteration that needs them, e.g. for a symbol about to be added.
+
+        Safe to call from another thread, since it leaves this iteration's batch
+        alone. The windows go into the shared HistoryCache when there is one;
+        otherwise they are kept on the strategy and used once, by the next
+        prefetch_history() that asks for them, which then doesn't request them.
+        """
+        api = getattr(self.broker, "client", None)
+        if self.is_backtesting or api is None:
+            return
+        if _shared_history is not None:
+            _shared_history.batch(api, symbols, length, timeframe, end=self.get_datetime())
+            return
+        batch = HistoryBatch(api, timeframe).request_all(symbols, length)
+        batch.fetch(end=self.get_datetime())
+        with _warm_lock:
+            if getattr(self, "_warmed_history", None) is None:
+                self._warmed_history = {}  # (symbol, timeframe) -> (length, DataFrame)
+            for symbol, window in batch.windows.items():
+                self._warmed_history[(symbol, timeframe)] = (length, window)
+
+    def _take_warmed(self, symbols, length, timeframe):
+        """Pop the warmed windows of symbols that are long enough for this prefetch."""
+        with _warm_lock:
+            warmed = getattr(self, "_warmed_history", None)
+            if not warmed:
+                return {}
+            taken = {}
+            for symbol in symbols:
+                entry = warmed.pop((symbol, timeframe), None)
+                if entry is not None and entry[0] >= length:
+                    taken[symbol] = entry[1]
+            return taken
+
+    def get_history(self, symbol, length, timeframe="day"):
+        batch = getattr(self, "_history_batch", None)
+        if batch is not None and batch.timeframe == timeframe and symbol in batch.windows:
+            window = batch.windows[symbol]
+            if len(window) >= length:
+                return Bars(window.tail(length).copy())
+        return self.get_historical_prices(symbol, length, timeframe)
+
+    def get_compact_history(self, symbol, length, timeframe="day"):
+        """get_history() as CompactBars, packed straight from the batch's window.
+
+        Skips the per-symbol DataFrame copy get_history() hands out, so only the
+        float32 arrays outlive the iteration.
+        """
+        batch = getattr(self, "_history_batch", None)
+        if batch is not None and batch.timeframe == timeframe and symbol in batch.windows:
+            window = batch.windows[symbol]
+            if len(window) >= length:
+                return CompactBars.from_dataframe(window.tail(length), symbol, timeframe)
+        return CompactBars.from_dataframe(self.get_historical_prices(symbol, length, timeframe).df, symbol, timeframe)
+
+
+if __name__ == "__main__":
+    # 200 symbols x 60 daily bars against the mock broker, batched vs one request per symbol
+    import time
+    from broker_client import BrokerClient
+    from mock_broker import MockBroker
+
+    symbols = [f"S{i:03d}" for i in range(200)]
+    end = datetime(2024, 5, 31, 20, 0, tzinfo=MarketCalendar().tz)
+    with MockBroker(latency=0.02, page_size=10_000, symbols=symbols) as mock:
+        client = BrokerClient("key", "secret", mock.url, data_url=mock.url)
+
+        started = time.perf_counter()
+        batch = HistoryBatch(client).request_all(symbols, 60)
+        windows = batch.fetch(end=end)
+        batched = time.perf_counter() - started
+
+        # The client's rate limiter (200 requests/min) is what one request per symbol really runs into
+        started = time.perf_counter()
+        single = {s: HistoryBatch(client).request_all([s], 60).fetch(end=end)[s] for s in symbols[:40]}
+        one_by_one = time.perf_counter() - started
+
+        same = all(windows[s].equals(single[s]) for s in single)
+        print(f"batched: {len(windows)} symbols in {batch.stats['requests']} request(s) "
+              f"({mock.requests['/v2/stocks/bars'] - 40} pages), {batched:.2f}s; "
+              f"per symbol: 40 requests in {one_by_one:.2f}s; identical windows: {same}")
+        print(windows["S000"].tail(3))
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+import threading
+from compact_bars import CompactBars
+from indicators import ema
+
+
+class IndicatorCache:
+    """LRU cache of indicator series shared by every strategy in the process.
+
+    Entries are keyed by (symbol, timeframe, indicator, params, bars) where bars is
+    the (first bar, last bar, bar count) of the input window. The last bar makes a
+    cached value valid only until the next bar arrives; the first bar and count are
+    needed because an EMA over 22 bars and one over 200 bars ending on the same bar
+    are different series.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def window_key(data):
+        """Identify the bar window an indicator was computed over."""
+        if len(data) == 0:
+            return None, None, 0
+        return data.index[0], data.index[-1], len(data)
+
+    def get_or_compute(self, symbol, timeframe, indicator, params, data, compute):
+        """Return the cached indicator for this bar window, computing it on a miss.
+
+        compute is called with data and its result (a Series or a tuple of Series) is
+        shared with every caller that asks for the same key, so callers must not
+        modify it in place.
+        """
+        key = (symbol, timeframe, indicator, tuple(params), self.window_key(data))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Compute outside the lock so a slow indicator doesn't block other strategies
+        value = compute(data)
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters for logging."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every strategy imported into the same process
+indicator_cache = IndicatorCache()
+
+
+def cached(symbol, timeframe, indicator, params, data, compute, cache=None):
+    """Look up an indicator in the shared cache, computing it with compute(data) on a miss."""
+    cache = indicator_cache if cache is None else cache
+    return cache.get_or_compute(symbol, timeframe, indicator, params, data, compute)
+
+
+def _ema(data, span, column):
+    if isinstance(data, CompactBars):
+        return data.ema(span, column)
+    return ema(data[column], span)
+
+
+def cached_ema(symbol, timeframe, data, span, column='close', cache=None):
+    """Cached exponential moving average (pandas ewm, adjust=False) of a bar column.
+
+    data can be a bars DataFrame or CompactBars; the two are cached separately
+    because they return a Series and a float32 array respectively.
+    """
+    indicator = f"ema_{column}" if not isinstance(data, CompactBars) else f"ema_{column}_compact"
+    return cached(symbol, timeframe, indicator, (span,), data, lambda d: _ema(d, span, column), cache)
@@ -0,0 +1,361 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import talib
+except ImportError:  # talib is optional, the numpy backend reproduces its values
+    talib = None
+
+
+# RSI methods:  "wilder" (talib.RSI), "sma" (rolling mean over `period` changes, day_trend / gldn_options),
+#               "sma_partial" (rolling mean from the first bar on, lumibot_mod / walk_forward)
+# MACD methods: "ema" (pandas ewm adjust=False, day_trend / gldn_options / lumibot_mod), "talib" (talib.MACD)
+# ATR methods:  "wilder" (talib.ATR), "sma" (rolling mean of true range, day_trend / gldn_options)
+TALIB_METHODS = {"rsi": "wilder", "macd": "talib", "atr": "wilder"}
+
+
+def _as_panel(values):
+    """(bars x symbols float64 array, wrap) for a Series, DataFrame or 1-D/2-D array.
+
+    wrap turns a result array back into the input's type and labels.
+    """
+    if isinstance(values, pd.DataFrame):
+        return values.to_numpy(dtype=np.float64), \
+            lambda a: pd.DataFrame(a, index=values.index, columns=values.columns)
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=np.float64)[:, None], \
+            lambda a: pd.Series(a[:, 0], index=values.index, name=values.name)
+    array = np.asarray(values, dtype=np.float64)
+    if array.ndim == 1:
+        return array[:, None], lambda a: a[:, 0]
+    return array, lambda a: a
+
+
+def _use_talib(backend, indicator, method, shape):
+    """talib for the methods it defines: always when asked, and by default for single series.
+
+    talib only takes 1-D input, so a panel costs one call per symbol; the numpy
+    backend handles every symbol in one pass and wins once there are several.
+    """
+    if backend not in ("auto", "numpy", "talib"):
+        raise ValueError(f"Unknown indicator backend {backend!r}")
+    if TALIB_METHODS[indicator] != method or backend == "numpy":
+        if backend == "talib":
+            raise ValueError(f"talib has no {method!r} {indicator}")
+        return False
+    if backend == "talib":
+        if talib is None:
+            raise ImportError("talib is not installed")
+        return True
+    return talib is not None and shape[1] == 1
+
+
+def _by_column(function, *arrays):
+    """Apply a 1-D talib function to every column; returns one array per output."""
+    columns = [function(*(np.ascontiguousarray(a[:, j]) for a in arrays)) for j in range(arrays[0].shape[1])]
+    if isinstance(columns[0], tuple):
+        return tuple(np.column_stack(outputs) for outputs in zip(*columns))
+    return np.column_stack(columns)
+
+
+def first_valid(x):
+    """Row of each column's first non-NaN value (len(x) for all-NaN columns)."""
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+
+
+def _diff(x):
+    delta = np.full_like(x, np.nan)
+    delta[1:] = x[1:] - x[:-1]
+    return delta
+
+
+def _rolling_mean(x, window, min_periods=None):
+    """pandas rolling(window, min_periods).mean() along the first axis, NaNs skipped."""
+    min_periods = window if min_periods is None else min_periods
+    valid = ~np.isnan(x)
+    sums = np.zeros((len(x) + 1, x.shape[1]))
+    counts = np.zeros((len(x) + 1, x.shape[1]))
+    np.cumsum(np.where(valid, x, 0.0), axis=0, out=sums[1:])
+    np.cumsum(valid, axis=0, out=counts[1:])
+    lag = np.maximum(np.arange(1, len(x) + 1) - window, 0)
+    total, count = sums[1:] - sums[lag], counts[1:] - counts[lag]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count >= max(min_periods, 1), total / count, np.nan)
+
+
+def _ewm(x, alpha):
+    return pd.DataFrame(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _seeded_ewm(x, period, seed_row, alpha):
+    """Recursive average seeded at seed_row (per column) with the mean of the `period` values ending there.
+
+    This is how talib starts its EMA, RSI and ATR: no output before the seed,
+    then avg += alpha * (x - avg). Columns whose seed falls past the end stay NaN.
+    """
+    rows = np.arange(len(x))[:, None]
+    window = (seed_row[None, :] - np.arange(period)[::-1, None])
+    ok = (seed_row < len(x)) & (window[0] >= 0)
+    picked = np.take_along_axis(x, np.clip(window, 0, len(x) - 1), axis=0)
+    seeded = np.where(rows > seed_row, x, np.nan)
+    seeded[seed_row[ok], np.flatnonzero(ok)] = picked[:, ok].mean(axis=0)
+    return _ewm(seeded, alpha)
+
+
+def ema(values, span):
+    """EMA matching pandas ewm(span=span, adjust=False) for every column."""
+    x, wrap = _as_panel(values)
+    return wrap(_ewm(x, 2.0 / (span + 1.0)))
+
+
+def sma(values, window, min_periods=None):
+    """Simple moving average matching pandas rolling(window, min_periods).mean()."""
+    x, wrap = _as_panel(values)
+    return wrap(_rolling_mean(x, window, min_periods))
+
+
+def rsi(close, period=14, method="wilder", backend="auto"):
+    """Relative Strength Index of every column of a (bars x symbols) close panel."""
+    x, wrap = _as_panel(close)
+    if _use_talib(backend, "rsi", method, x.shape):
+        return wrap(_by_column(lambda c: talib.RSI(c, timeperiod=period), x))
+    first = first_valid(x)
+    delta = _diff(x)
+    if method == "wilder":
+        gain = _seeded_ewm(np.where(delta > 0, delta, 0.0), period, first + period, 1.0 / period)
+        loss = _seeded_ewm(np.where(delta < 0, -delta, 0.0), period, first + period, 1.0 / period)
+        total = gain + loss
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # talib reports 0 rather than dividing by a zero total
+            return wrap(np.where(np.abs(total) < 1e-8, 0.0, 100 * gain / total))
+    if method not in ("sma", "sma_partial"):
+        raise ValueError(f"Unknown RSI method {method!r}")
+    # pandas' delta.where(delta > 0, 0) turns the first bar's NaN change into a 0 that
+    # counts toward the window; rows before a symbol's first bar don't count at all
+    before = np.arange(len(x))[:, None] < first[None, :]
+    gain = np.where(before, np.nan, np.where(delta > 0, delta, 0.0))
+    loss = np.where(before, np.nan, np.where(delta < 0, -delta, 0.0))
+    min_periods = 1 if method == "sma_partial" else period
+    avg_gain, avg_loss = _rolling_mean(gain, period, min_periods), _rolling_mean(loss, period, min_periods)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return wrap(100 - 100 / (1 + avg_gain / avg_loss))
+
+
+def macd(close, fast=12, slow=26, signal=9, method="ema", backend="auto"):
+    """(MACD line, signal line, histogram) of every column of a close panel."""
+    x, wrap = _as_panel(close)
+    if _use_talib(backend, "macd", method, x.shape):
+        return tuple(wrap(a) for a in _by_column(
+            lambda c: talib.MACD(c, fastperiod=fast, slowperiod=slow, signalperiod=signal), x))
+    if method == "ema":
+        line = _ewm(x, 2.0 / (fast + 1.0)) - _ewm(x, 2.0 / (slow + 1.0))
+        signal_line = _ewm(line, 2.0 / (signal + 1.0))
+    elif method == "talib":
+        # Both EMAs start on the slow EMA's first bar, each seeded with the mean of its own
+        # period; the signal EMA is seeded the same way, and nothing is reported before it
+        start = first_valid(x) + slow - 1
+        line = (_seeded_ewm(x, fast, start, 2.0 / (fast + 1.0)) -
+                _seeded_ewm(x, slow, start, 2.0 / (slow + 1.0)))
+        signal_line = _seeded_ewm(line, signal, start + signal - 1, 2.0 / (signal + 1.0))
+        line = np.where(np.isnan(signal_line), np.nan, line)
+    else:
+        raise ValueError(f"Unknown MACD method {method!r}")
+    return wrap(line), wrap(signal_line), wrap(line - signal_line)
+
+
+def true_range(high, low, close):
+    """True range; a symbol's first bar has no previous close, so its range is high - low."""
+    h, wrap = _as_panel(high)
+    l, _ = _as_panel(low)
+    c, _ = _as_panel(close)
+    previous = np.full_like(c, np.nan)
+    previous[1:] = c[:-1]
+    return wrap(np.fmax(h - l, np.fmax(np.abs(h - previous), np.abs(l - previous))))
+
+
+def atr(high, low, close, period=14, method="wilder", backend="auto"):
+    """Average True Range of every column of high/low/close panels."""
+    h, wrap = _as_panel(high)
+    l, _ = _as_panel(low)
+    c, _ = _as_panel(close)
+    if _use_talib(backend, "atr", method, c.shape):
+        return wrap(_by_column(lambda a, b, d: talib.ATR(a, b, d, timeperiod=period), h, l, c))
+    ranges = true_range(h, l, c)
+    if method == "sma":
+        return wrap(_rolling_mean(ranges, period))
+    if method != "wilder":
+        raise ValueError(f"Unknown ATR method {method!r}")
+    first = first_valid(np.where(np.isnan(h) | np.isnan(l), np.nan, c))
+    # talib skips the first bar's range (no previous close) and seeds with the next `period`
+    return wrap(_seeded_ewm(ranges, period, first + period, 1.0 / period))
+
+
+def panel(frames, column="close"):
+    """{symbol: bars DataFrame} as one (timestamps x symbols) DataFrame of a column."""
+    return pd.DataFrame({symbol: df[column] for symbol, df in frames.items()})
+
+
+if __name__ == "__main__":
+    # Pin every method to the per-file implementations it replaces (and to talib when
+    # installed) on a panel whose symbols start on different bars, then time a wide panel
+    import time
+
+    def reference_rsi_sma(df, period):  # day_trend.py / gldn_options.py
+        delta = df['close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
+        return 100 - (100 / (1 + gain / loss))
+
+    def reference_rsi_sma_partial(df, period=14):  # lumibot_mod.py / walk_forward.py
+        delta = df['close'].diff()
+        gain = (delta.where(delta > 0, 0)).fillna(0)
+        loss = (-delta.where(delta < 0, 0)).fillna(0)
+        avg_gain = gain.rolling(window=period, min_periods=1).mean()
+        avg_loss = loss.rolling(window=period, min_periods=1).mean()
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def reference_macd_ema(df, short_span=12, long_span=26, signal_span=9):  # lumibot_mod / day_trend / gldn_options
+        macd_line = df['close'].ewm(span=short_span, adjust=False).mean() - \
+            df['close'].ewm(span=long_span, adjust=False).mean()
+        signal_line = macd_line.ewm(span=signal_span, adjust=False).mean()
+        return macd_line, signal_line, macd_line - signal_line
+
+    def reference_atr_sma(df, period=14):  # day_trend.py / gldn_options.py
+        high_low = df['high'] - df['low']
+        high_close = abs(df['high'] - df['close'].shift(1))
+        low_close = abs(df['low'] - df['close'].shift(1))
+        return pd.concat([high_low, high_close, low_close], axis=1).max(axis=1).rolling(period).mean()
+
+    # Straight ports of talib's C loops (ta_RSI.c, ta_ATR.c, ta_MACD.c / ta_EMA.c), for when talib isn't installed
+    def reference_talib_rsi(close, period=14):
+        out = np.full(len(close), np.nan)
+        if len(close) <= period:
+            return out
+        gain = loss = 0.0
+        for i in range(1, period + 1):
+            change = close[i] - close[i - 1]
+            gain, loss = (gain, loss - change) if change < 0 else (gain + change, loss)
+        gain, loss = gain / period, loss / period
+        out[period] = 100 * gain / (gain + loss) if abs(gain + loss) >= 1e-8 else 0.0
+        for i in range(period + 1, len(close)):
+            change = close[i] - close[i - 1]
+            gain, loss = gain * (period - 1), loss * (period - 1)
+            gain, loss = (gain, loss - change) if change < 0 else (gain + change, loss)
+            gain, loss = gain / period, loss / period
+            out[i] = 100 * gain / (gain + loss) if abs(gain + loss) >= 1e-8 else 0.0
+        return out
+
+    def reference_talib_atr(high, low, close, period=14):
+        out = np.full(len(close), np.nan)
+        ranges = [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+                  for i in range(1, len(close))]
+        if len(ranges) < period:
+            return out
+        average = sum(ranges[:period]) / period
+        out[period] = average
+        for i in range(period + 1, len(close)):
+            average = (average * (period - 1) + ranges[i - 1]) / period
+            out[i] = average
+        return out
+
+    def reference_talib_ema(values, period, start):
+        out = np.full(len(values), np.nan)
+        k = 2.0 / (period + 1)
+        average = sum(values[start - period + 1:start + 1]) / period
+        out[start] = average
+        for i in range(start + 1, len(values)):
+            average = (values[i] - average) * k + average
+            out[i] = average
+        return out
+
+    def reference_talib_macd(close, fast=12, slow=26, signal=9):
+        line = reference_talib_ema(close, fast, slow - 1) - reference_talib_ema(close, slow, slow - 1)
+        signal_line = np.full(len(close), np.nan)
+        signal_line[slow - 1:] = reference_talib_ema(line[slow - 1:], signal, signal - 1)
+        line[:slow + signal - 2] = np.nan
+        return line, signal_line, line - signal_line
+
+    def check(name, got, expected):
+        got, expected = np.asarray(got, dtype=np.float64), np.asarray(expected, dtype=np.float64)
+        same_nan = np.array_equal(np.isnan(got), np.isnan(expected))
+        error = np.nanmax(np.abs(got - expected)) if same_nan and np.isfinite(expected).any() else np.inf
+        assert same_nan and error < 1e-9, f"{name}: NaNs match {same_nan}, max error {error:.2e}"
+        return error
+
+    rng = np.random.default_rng(3)
+    bars, n = 300, 40
+    index = pd.bdate_range("2023-01-02", periods=bars)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars, n)), axis=0))
+    close[100:120, 0] = close[100, 0]  # A flat stretch: zero gains and losses
+    high = close * (1 + rng.uniform(0, 0.02, (bars, n)))
+    low = close * (1 - rng.uniform(0, 0.02, (bars, n)))
+    starts = rng.integers(0, 60, n)  # symbols that listed later have leading NaNs in the panel
+    for j, start in enumerate(starts):
+        close[:start, j] = high[:start, j] = low[:start, j] = np.nan
+    symbols = [f"S{j:02d}" for j in range(n)]
+    close_panel = pd.DataFrame(close, index=index, columns=symbols)
+    high_panel = pd.DataFrame(high, index=index, columns=symbols)
+    low_panel = pd.DataFrame(low, index=index, columns=symbols)
+
+    results = {
+        "rsi sma": rsi(close_panel, 14, "sma"),
+        "rsi sma_partial": rsi(close_panel, 14, "sma_partial"),
+        "rsi wilder": rsi(close_panel, 14, "wilder", backend="numpy"),
+        "macd ema": macd(close_panel, 12, 26, 9, "ema"),
+        "macd talib": macd(close_panel, 12, 26, 9, "talib", backend="numpy"),
+        "atr sma": atr(high_panel, low_panel, close_panel, 14, "sma"),
+        "atr wilder": atr(high_panel, low_panel, close_panel, 14, "wilder", backend="numpy"),
+    }
+    errors = dict.fromkeys(results, 0.0)
+    for j, symbol in enumerate(symbols):
+        # Each symbol as its own bars DataFrame, the way the strategies see it
+        df = pd.DataFrame({"close": close[starts[j]:, j], "high": high[starts[j]:, j], "low": low[starts[j]:, j]},
+                          index=index[starts[j]:])
+        rows = slice(starts[j], None)
+        expected = {
+            "rsi sma": [reference_rsi_sma(df, 14)],
+            "rsi sma_partial": [reference_rsi_sma_partial(df, 14)],
+            "rsi wilder": [reference_talib_rsi(df["close"].to_numpy())],
+            "macd ema": reference_macd_ema(df),
+            "macd talib": reference_talib_macd(df["close"].to_numpy()),
+            "atr sma": [reference_atr_sma(df)],
+            "atr wilder": [reference_talib_atr(df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy())],
+        }
+        if talib is not None:
+            expected["rsi wilder"].append(talib.RSI(df["close"].to_numpy(), timeperiod=14))
+            expected["atr wilder"].append(talib.ATR(df["high"].to_numpy(), df["low"].to_numpy(),
+                                                    df["close"].to_numpy(), timeperiod=14))
+        for name, outputs in expected.items():
+            got = results[name] if isinstance(results[name], tuple) else (results[name],) * len(outputs)
+            for g, e in zip(got, outputs):
+                errors[name] = max(errors[name], check(f"{name} {symbol}", g[symbol].to_numpy()[rows], e))
+            if talib is not None and name == "macd talib":
+                for g, e in zip(got, talib.MACD(df["close"].to_numpy(), 12, 26, 9)):
+                    errors[name] = max(errors[name], check(f"{name} {symbol} (talib)", g[symbol].to_numpy()[rows], e))
+        # A single series goes through the same code (or talib) and returns a Series
+        single = rsi(df["close"], 14, "sma")
+        assert isinstance(single, pd.Series)
+        check(f"rsi sma series {symbol}", single, expected["rsi sma"][0])
+    print("max abs error vs per-file versions" + (" and talib" if talib is not None else "") + ":")
+    for name, error in errors.items():
+        print(f"  {name:16s} {error:.1e}")
+
+    wide = np.exp(np.cumsum(rng.normal(0, 0.02, (500, 2000)), axis=0))
+    frames = {j: pd.DataFrame({"close": wide[:, j], "high": wide[:, j] * 1.01, "low": wide[:, j] * 0.99})
+              for j in range(wide.shape[1])}
+    for name, panel_call, loop_call in (
+            ("rsi sma", lambda: rsi(wide, 14, "sma"), lambda df: reference_rsi_sma(df, 14)),
+            ("macd ema", lambda: macd(wide), reference_macd_ema),
+            ("atr sma", lambda: atr(wide * 1.01, wide * 0.99, wide, 14, "sma"), reference_atr_sma)):
+        started = time.perf_counter()
+        panel_call()
+        panel_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        for df in frames.values():
+            loop_call(df)
+        loop_ms = (time.perf_counter() - started) * 1000
+        print(f"{name}: 500 bars x 2000 symbols in {panel_ms:.0f}ms vs {loop_ms:.0f}ms one symbol at a time")
+    started = time.perf_counter()
+    rsi(wide, 14, "wilder", backend="numpy")
+    print(f"rsi wilder (numpy backend): {(time.perf_counter() - started) * 1000:.0f}ms")
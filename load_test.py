@@ -0,0 +1,331 @@
+import argparse
+from collections import namedtuple
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+import numpy as np
+import requests
+
+
+SLO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slo.json")
+
+# name -> (method, path, JSON body), shaped like what the dashboard, alerts and scripts send
+ENDPOINTS = {
+    "logs": ("GET", "/logs", None),
+    "chat": ("POST", "/chat", {"message": "Should I trim my SPY position before earnings?"}),
+    "update_symbols": ("POST", "/update_symbols", {"symbols": ["SPY", "QQQ", "AAPL", "MSFT"], "bot": "lumibot_trend"}),
+    "start": ("POST", "/start_lumibot_trend", None),
+    "stop": ("POST", "/stop_lumibot_trend", None),
+    "events": ("POST", "/events", [
+        {"type": "signal", "bot": "lumibot_trend", "symbol": "SPY", "signal": "BUY", "price": 512.3},
+        {"type": "order", "bot": "lumibot_trend", "symbol": "SPY", "side": "buy", "qty": 10, "status": "filled"},
+    ]),
+    "events_latest": ("GET", "/events/latest", None),
+    "portfolio": ("GET", "/portfolio", None),
+    "pnl_summary": ("GET", "/pnl/summary", None),
+    "risk": ("GET", "/risk", None),
+}
+
+# Relative request weights: dashboards poll, bots post events, scripts drive the controls
+MIXES = {
+    "dashboard": {"logs": 4, "events_latest": 4, "portfolio": 4, "pnl_summary": 2, "risk": 1, "chat": 1},
+    "alerts": {"events": 8, "events_latest": 2},
+    "scripts": {"update_symbols": 4, "start": 3, "stop": 3, "logs": 1},
+}
+MIXES["all"] = {name: sum(mix.get(name, 0) for mix in MIXES.values()) for name in ENDPOINTS}
+
+Sample = namedtuple("Sample", ["endpoint", "status", "seconds"])
+
+
+class LoadGenerator:
+    """Replays a weighted request mix against the app from `concurrency` client threads.
+
+    Without a rate each thread sends its next request as soon as the last
+    one returns (closed loop). With a rate, requests go out on a fixed
+    schedule split across the threads and latency is measured from the
+    scheduled time, so a stalled server shows up as queueing delay instead
+    of silently lowering the request rate. Each thread has one request in
+    flight, so a rate run needs enough threads to cover the slow endpoints.
+    """
+
+    def __init__(self, base_url, mix="all", concurrency=8, duration=30.0, rate=None, seed=0, timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.weights = MIXES[mix] if isinstance(mix, str) else dict(mix)
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rate = rate
+        self.seed = seed
+        self.timeout = timeout
+
+    def _worker(self, index, started, samples):
+        rng = random.Random(self.seed * 1000 + index)
+        names = [name for name, weight in self.weights.items() if weight > 0]
+        weights = [self.weights[name] for name in names]
+        interval = self.concurrency / self.rate if self.rate else None
+        session = requests.Session()
+        sent = 0
+        while True:
+            due = started + (index / self.concurrency + sent) * interval if interval else time.perf_counter()
+            if due - started >= self.duration:
+                break
+            if interval:
+                time.sleep(max(0.0, due - time.perf_counter()))
+            name = rng.choices(names, weights)[0]
+            method, path, body = ENDPOINTS[name]
+            try:
+                status = session.request(method, self.base_url + path, json=body, timeout=self.timeout).status_code
+            except requests.RequestException:
+                status = 0
+            samples.append(Sample(name, status, time.perf_counter() - due))
+            sent += 1
+
+    def run(self):
+        samples = []
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(i, started, samples), daemon=True)
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return LoadReport(samples, time.perf_counter() - started)
+
+
+class LoadReport:
+    """Throughput, error rate and latency percentiles per endpoint from one load run."""
+
+    def __init__(self, samples, seconds):
+        self.samples = samples
+        self.seconds = seconds
+
+    @staticmethod
+    def _stats(samples, seconds):
+        ms = np.array([s.seconds for s in samples]) * 1000
+        errors = sum(1 for s in samples if s.status == 0 or s.status >= 500)
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": errors / len(samples),
+            "rps": len(samples) / seconds,
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max()),
+        }
+
+    def summary(self):
+        """{endpoint: stats}, plus "all" for the run as a whole."""
+        by_endpoint = {}
+        for sample in self.samples:
+            by_endpoint.setdefault(sample.endpoint, []).append(sample)
+        result = {name: self._stats(samples, self.seconds) for name, samples in sorted(by_endpoint.items())}
+        if self.samples:
+            result["all"] = self._stats(self.samples, self.seconds)
+        return result
+
+    def check(self, slo):
+        """SLO breaches as readable strings; empty when every target is met.
+
+        slo["endpoints"] holds per-endpoint limits (p50_ms, p95_ms, p99_ms,
+        error_rate, min_rps) and slo["default"] the limits for endpoints not
+        listed there; "all" can set limits for the run as a whole.
+        """
+        breaches = []
+        for name, stats in self.summary().items():
+            limits = slo.get("endpoints", {}).get(name, {} if name == "all" else slo.get("default", {}))
+            for key, limit in limits.items():
+                if key == "min_rps":
+                    if stats["rps"] < limit:
+                        breaches.append(f"{name}: {stats['rps']:.1f} requests/s < {limit}")
+                elif stats[key] > limit:
+                    breaches.append(f"{name}: {key} {stats[key]:.4g} > {limit}")
+        return breaches
+
+    def table(self):
+        lines = [f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                 f"{'p99 ms':>9}{'max ms':>9}"]
+        for name, s in self.summary().items():
+            lines.append(f"{name:<16}{s['requests']:>9}{s['errors']:>8}{s['rps']:>9.1f}{s['p50_ms']:>9.1f}"
+                         f"{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+        return "\n".join(lines)
+
+
+# Local stand-ins for app.py's backends, so a load run never reaches OpenAI, the broker or a real bot
+
+class StubCompletions:
+    """openai.chat.completions with a fixed response time."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def create(self, model, messages):
+        time.sleep(self.latency)
+        reply = SimpleNamespace(content=f" Stub advice on: {messages[-1]['content'][:40]} ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=reply)])
+
+
+class StubProcess:
+    """A bot 'process' with WarmProcess's interface that exits as soon as it's terminated."""
+
+    def __init__(self, timings):
+        self.pid = 0
+        self.timings = timings
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        self.returncode = -15
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+
+class StubPool:
+    """WarmPool whose launches take `latency` seconds, like a warm worker picking up a strategy."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def start(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def launch(self, module_name, class_name, broker=None):
+        time.sleep(self.latency)
+        return StubProcess({"warm": True, "startup_seconds": self.latency})
+
+
+def write_sample_log(path, lines):
+    """A trading_bot.log of `lines` lines shaped like the bots' output."""
+    with open(path, "w") as file:
+        for i in range(lines):
+            file.write(f"2024-05-31 14:{i // 60 % 60:02d}:{i % 60:02d},000 - INFO - SPY: close 512.{i % 100:02d}, "
+                       f"EMA 9 510.4, EMA 21 508.9, RSI 61.2, signal {'BUY' if i % 7 == 0 else 'None'}\n")
+
+
+def serve_stubbed(port, chat_latency=0.5, launch_latency=0.05, broker_latency=0.02):
+    """Run app.py on localhost with stubbed OpenAI, bot launches, risk service and broker.
+
+    Meant to run in its own process and working directory (run_stubbed does
+    both), since the app writes its journal, control files and logs there.
+    """
+    import uvicorn
+    from mock_broker import MockBroker
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    import config
+    import risk_aggregator
+
+    mock = MockBroker(latency=broker_latency).start()
+    config.ALPACA_CONFIG.pop("ENDPOINT", None)
+    config.ALPACA_CONFIG["PAPER"] = mock.url
+    risk_aggregator.serve_in_background = lambda *args, **kwargs: risk_aggregator._book
+
+    import app
+    logging.getLogger().setLevel(logging.WARNING)  # app.py logs every request at INFO
+    app.openai = SimpleNamespace(api_key="stub", chat=SimpleNamespace(completions=StubCompletions(chat_latency)))
+    app.warm_pool = StubPool(launch_latency)
+    uvicorn.run(app.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(base_url, server=None, timeout=60.0):
+    """Wait until the app answers and has a first portfolio snapshot, so start-up 503s aren't counted."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Stubbed app exited with code {server.returncode} before it was ready")
+        try:
+            if requests.get(f"{base_url}/portfolio", timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"App at {base_url} not ready after {timeout:.0f}s")
+
+
+def run_stubbed(generator_args, log_lines=5000, chat_latency=0.5, launch_latency=0.05):
+    """Start a stubbed app.py in a scratch directory, load it, and tear it down; returns the LoadReport."""
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    write_sample_log(os.path.join(workdir, "trading_bot.log"), log_lines)
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port),
+                               "--chat-latency", str(chat_latency), "--launch-latency", str(launch_latency)],
+                              cwd=workdir)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(base_url, server)
+        return LoadGenerator(base_url, **generator_args).run()
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # python load_test.py                       stubbed app, settings and limits from slo.json
+    # python load_test.py --mix dashboard -c 32 override the checked-in run settings
+    # python load_test.py --url http://host:8000 load an app that is already running (no stubs)
+    # Exits non-zero when any SLO in the file is breached
+    parser = argparse.ArgumentParser(description="Load test app.py and check its latency SLOs")
+    parser.add_argument("--url", help="Load an already running app instead of a stubbed one")
+    parser.add_argument("--mix", choices=sorted(MIXES))
+    parser.add_argument("-c", "--concurrency", type=int)
+    parser.add_argument("-d", "--duration", type=float)
+    parser.add_argument("--rate", type=float, help="Requests/s on a fixed schedule (default: closed loop)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slo", default=SLO_FILE)
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="Seconds the stub LLM takes per reply")
+    parser.add_argument("--launch-latency", type=float, default=0.05, help="Seconds a stub bot launch takes")
+    parser.add_argument("--log-lines", type=int, default=5000, help="Size of the stub trading_bot.log")
+    parser.add_argument("--json", help="Also write the summary to this file")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_stubbed(args.serve, args.chat_latency, args.launch_latency)
+        sys.exit()
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(args.slo) as file:
+        slo = json.load(file)
+    run = slo.get("run", {})
+    generator_args = {
+        "mix": args.mix or run.get("mix", "all"),
+        "concurrency": args.concurrency or run.get("concurrency", 8),
+        "duration": args.duration or run.get("duration", 30.0),
+        "rate": args.rate or run.get("rate"),
+        "seed": args.seed,
+    }
+    print(f"Load test: {generator_args}")
+    if args.url:
+        report = LoadGenerator(args.url, **generator_args).run()
+    else:
+        report = run_stubbed(generator_args, args.log_lines, args.chat_latency, args.launch_latency)
+    print(report.table())
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(dict(run=generator_args, summary=report.summary()), file, indent=2)
+    breaches = report.check(slo)
+    for breach in breaches:
+        print(f"SLO breach: {breach}")
+    print("SLOs met" if not breaches else f"{len(breaches)} SLO breach(es)")
+    sys.exit(1 if breaches else 0)
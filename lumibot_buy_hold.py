@@ -4,6 +4,7 @@ from lumibot.backtesting import YahooDataBacktesting
 from lumibot.brokers import Alpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
+import sampling_profiler
 
 
 class BuyHold(Strategy):
@@ -27,6 +28,7 @@ if __name__ == "__main__":
         strategy = BuyHold(broker=broker)
         trader = Trader()
         trader.add_strategy(strategy)
+        sampling_profiler.install("lumibot_buy_hold")
         trader.run_all()
     else:
         start = datetime(2022, 1, 1)
@@ -1,61 +1,59 @@
 from config import ALPACA_CONFIG
 from datetime import datetime
 from lumibot.backtesting import YahooDataBacktesting
-from lumibot.brokers import Alpaca
+from custom_alpaca import CustomAlpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import numpy as np
 import pandas as pd
 import logging
+from indicator_cache import cached, ema
+from indicators import macd, rsi
+from scanner import UniverseScanner, load_universe, tradable_symbols
+from trade_journal import TradeJournaling
+from bar_scheduler import BarAligned
+from history_batch import BatchedHistory
+import sampling_profiler
 
 
-def calculate_rsi(df, period=14):
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-
-    avg_gain = gain.rolling(window=period, min_periods=1).mean()
-    avg_loss = loss.rolling(window=period, min_periods=1).mean()
-
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-
-def calculate_macd(df, short_span=12, long_span=26, signal_span=9):
-    short_ema = df['close'].ewm(span=short_span, adjust=False).mean()
-    long_ema = df['close'].ewm(span=long_span, adjust=False).mean()
-
-    macd = short_ema - long_ema
-    signal = macd.ewm(span=signal_span, adjust=False).mean()
-    histogram = macd - signal
-
-    return macd, signal, histogram
-
-
-class Trend(Strategy):
+class Trend(BarAligned, BatchedHistory, TradeJournaling, Strategy):
 
     def initialize(self):
         self.tickers = ["GME", "SPY", "AAPL"]  # Modify this list to include your desired tickers
-        self.sleeptime = "1S"
+        self.sleeptime = "1S"  # First iteration only; schedule_next_iteration() sets the rest
+        self.bar_timeframe = "1D"  # Wake when a bar of this timeframe closes
         self.rsi_period = 14  # Adjust RSI period as necessary
         self.min_volume = 100000  # Minimum trading volume to filter
+        self.scan_universe = False  # If true, replace tickers with the top scanner candidates each day
+        self.max_candidates = 20  # Number of scanner candidates to trade
+
+    def before_market_opens(self):
+        if self.scan_universe:
+            api = self.broker.client
+            universe = load_universe(api, tradable_symbols(api), days=26 + self.rsi_period + 9)
+            self.tickers = UniverseScanner.for_strategy(self).candidates(universe, self.max_candidates)
+            logging.info(f"Scanner selected {len(self.tickers)} tickers: {self.tickers}")
 
     def on_trading_iteration(self):
+        self.prefetch_history(self.tickers, 26 + self.rsi_period + 9)
         for symbol in self.tickers:
             # Fetch historical data
-            bars = self.get_historical_prices(symbol, 26 + self.rsi_period + 9, "day")
+            bars = self.get_history(symbol, 26 + self.rsi_period + 9)
             data = bars.df
 
             # Calculate Exponential Moving Averages (EMA)
-            data['9-day'] = data['close'].ewm(span=9, adjust=False).mean()
-            data['21-day'] = data['close'].ewm(span=21, adjust=False).mean()
+            data['9-day'] = cached_ema(symbol, "day", data, 9)
+            data['21-day'] = cached_ema(symbol, "day", data, 21)
 
             # Calculate RSI
-            data['RSI'] = calculate_rsi(data, self.rsi_period)
+            data['RSI'] = cached(symbol, "day", "rsi_sma_partial", (self.rsi_period,), data,
+                                 lambda d: rsi(d['close'], self.rsi_period, method="sma_partial"))
 
             # Calculate MACD
-            data['MACD'], data['Signal Line'], data['MACD Histogram'] = calculate_macd(data)
+            data['MACD'], data['Signal Line'], data['MACD Histogram'] = cached(symbol, "day", "macd_histogram", (12, 26, 9),
+                                                                               data, lambda d: macd(d['close'], 12, 26, 9))
+
+            self.journal_mark(symbol, data.iloc[-1]['close'])
 
             # Check volume condition
             last_volume = data.iloc[-1]['volume']
@@ -97,14 +95,17 @@ class Trend(Strategy):
                 order = self.create_order(symbol, quantity, "sell")
                 self.submit_order(order)
 
+        self.schedule_next_iteration()
+
 
 if __name__ == "__main__":
     trade = False  # If true will trade
     if trade:
-        broker = Alpaca(ALPACA_CONFIG)
+        broker = CustomAlpaca(ALPACA_CONFIG)
         strategy = Trend(broker=broker)
         bot = Trader()
         bot.add_strategy(strategy)
+        sampling_profiler.install("lumibot_mod")
         bot.run_all()
     else:
         start = datetime(2022, 4, 15)
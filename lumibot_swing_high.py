@@ -1,15 +1,23 @@
 from config import ALPACA_CONFIG
-from lumibot.brokers import Alpaca
+from custom_alpaca import CustomAlpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import logging
 import pandas as pd
+from bot_control import SymbolHotSwap
+from trade_journal import TradeJournaling
+from history_batch import BatchedHistory
+import sampling_profiler
 
 
 # Configure logging to write to a file
 logging.basicConfig(filename="trading_bot.log", level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-class SwingHigh(Strategy):
+class SwingHigh(SymbolHotSwap, BatchedHistory, TradeJournaling, Strategy):
+    control_name = "lumibot_swing_high"
+    symbol_state = {"high_data": list, "low_data": list, "ema_200": list, "ema_13": list, "ema_48": list,
+                    "ready_to_buy": lambda: False}
+
     def initialize(self):
         self.sleeptime = "10S"
         self.symbols = ["JBI", "AMC", "SOUN", "MARA"]
@@ -26,36 +34,38 @@ class SwingHigh(Strategy):
     def calculate_ema(self, prices, period):
         if len(prices) < period:
             return None
-        prices_series = pd.Series(prices)
+        prices_series = pd.Series(prices, dtype='float64')
         return prices_series.ewm(span=period, adjust=False).mean().iloc[-1]
 
     def on_trading_iteration(self):
+        # Pick up symbol changes sent from app.py before looping
+        self.apply_symbol_updates()
+        self.prefetch_history(self.symbols, 200)
         for symbol in self.symbols:
             try:
-                # Fetch the historical prices with a daily timeframe
-                bars = self.get_historical_prices(symbol, 200, "day")
-                if bars.df.empty:
+                # Daily bars packed into compact float32 arrays straight from the batch
+                stock_data = self.get_compact_history(symbol, 200)
+                if len(stock_data) == 0:
                     continue
-                
-                stock_data = bars.df
-                last_price = stock_data['close'].iloc[-1]
-                self.high_data[symbol] = stock_data['high'].tolist()
-                self.low_data[symbol] = stock_data['low'].tolist()
+                last_price = float(stock_data.last('close'))
+                self.journal_mark(symbol, last_price)
+                self.high_data[symbol] = stock_data['high']
+                self.low_data[symbol] = stock_data['low']
                 
                 # Update the 200-day EMA
-                new_ema_200 = self.calculate_ema(stock_data['close'].tolist(), self.ema_200_period)
+                new_ema_200 = self.calculate_ema(stock_data['close'], self.ema_200_period)
                 self.ema_200[symbol].append(new_ema_200)
                 if len(self.ema_200[symbol]) > self.ema_200_period:
                     self.ema_200[symbol].pop(0)
 
                 # Update the 13-period EMA
-                new_ema_13 = self.calculate_ema(stock_data['close'].tolist(), self.period_high)
+                new_ema_13 = self.calculate_ema(stock_data['close'], self.period_high)
                 self.ema_13[symbol].append(new_ema_13)
                 if len(self.ema_13[symbol]) > self.period_high:
                     self.ema_13[symbol].pop(0)
 
                 # Update the 48-period EMA
-                new_ema_48 = self.calculate_ema(stock_data['close'].tolist(), self.period_low)
+                new_ema_48 = self.calculate_ema(stock_data['close'], self.period_low)
                 self.ema_48[symbol].append(new_ema_48)
                 if len(self.ema_48[symbol]) > self.period_low:
                     self.ema_48[symbol].pop(0)
@@ -106,8 +116,9 @@ class SwingHigh(Strategy):
                 self.sell_all(symbol=symbol)
 
 if __name__ == "__main__":
-    broker = Alpaca(ALPACA_CONFIG)
+    broker = CustomAlpaca(ALPACA_CONFIG)
     strategy = SwingHigh(broker=broker)
     trader = Trader()
     trader.add_strategy(strategy)
+    sampling_profiler.install("lumibot_swing_high")
     trader.run_all()
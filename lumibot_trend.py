@@ -2,14 +2,25 @@
 from config import ALPACA_CONFIG
 from datetime import datetime
 from lumibot.backtesting import YahooDataBacktesting
-from lumibot.brokers import Alpaca
+from custom_alpaca import CustomAlpaca
 from lumibot.strategies import Strategy
 from lumibot.traders import Trader
 import numpy as np
 import pandas as pd
+from indicator_cache import ema
+from bot_control import SymbolHotSwap
+from trade_journal import TradeJournaling
+from event_bus import LiveEvents
+from signal_store import SignalRecording
+from history_batch import BatchedHistory
+import sampling_profiler
 
 
-class Trend(Strategy):
+class Trend(LiveEvents, SignalRecording, SymbolHotSwap, BatchedHistory, TradeJournaling, Strategy):
+    control_name = "lumibot_trend"
+    symbols_attr = "tickers"
+    symbol_state = {"ready_to_buy": lambda: False, "signals": lambda: None}
+    warmup_bars = 22
 
     def initialize(self):
         self.signals = {}
@@ -19,14 +30,17 @@ class Trend(Strategy):
         self.ready_to_buy = {symbol: False for symbol in self.tickers}
 
     def on_trading_iteration(self):
+        # Pick up symbol changes sent from app.py before looping
+        self.apply_symbol_updates()
+        self.prefetch_history(self.tickers, 22)
         for symbol in self.tickers:
             # Fetch historical prices for each symbol with the appropriate window size
-            bars = self.get_historical_prices(symbol, 22, "day")
+            bars = self.get_history(symbol, 22)
             data = bars.df
 
             # Calculate short-term (9-day) and long-term (21-day) EMAs
-            data['9-day'] = data['close'].ewm(span=9, adjust=False).mean()
-            data['21-day'] = data['close'].ewm(span=21, adjust=False).mean()
+            data['9-day'] = cached_ema(symbol, "day", data, 9)
+            data['21-day'] = cached_ema(symbol, "day", data, 21)
 
             # Determine buy and sell signals using the 9/21 crossover logic
             data['Signal'] = np.where(
@@ -48,6 +62,9 @@ class Trend(Strategy):
 
             # Get the latest trading signal for the current symbol
             self.signals[symbol] = data.iloc[-1]['Signal']
+            self.publish_signal(symbol, self.signals[symbol], price=float(data.iloc[-1]['close']))
+            self.record_signal(symbol, self.signals[symbol], data.iloc[-1])
+            self.journal_mark(symbol, data.iloc[-1]['close'])
 
             quantity = 100
 
@@ -105,10 +122,11 @@ class Trend(Strategy):
 if __name__ == "__main__":
     trade = True  # If true, will trade
     if trade:
-        broker = Alpaca(ALPACA_CONFIG)
+        broker = CustomAlpaca(ALPACA_CONFIG)
         strategy = Trend(broker=broker)
         bot = Trader()
         bot.add_strategy(strategy)
+        sampling_profiler.install("lumibot_trend")
         bot.run_all()
     else:
         start = datetime(2022, 4, 15)
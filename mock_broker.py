@@ -0,0 +1,149 @@
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+import uuid
+import pandas as pd
+
+
+class MockBroker:
+    """Local stand-in for the Alpaca trading and data REST APIs.
+
+    Serves account, positions, orders, assets, clock and multi-symbol bars on a
+    random localhost port. latency delays every response, fail_next makes the next
+    N requests return 429, and requests counts hits per path so callers can check
+    rate limiting, coalescing and retries without touching the real broker.
+    """
+
+    def __init__(self, latency=0.0, page_size=50, symbols=("GME", "MRNA", "SPY", "AAPL")):
+        self.latency = latency
+        self.page_size = page_size
+        self.fail_next = 0
+        self.requests = Counter()
+        self.orders = []
+        self.positions = [{"symbol": s, "qty": "100", "avg_entry_price": "10.00", "current_price": "10.50",
+                           "market_value": "1050.00", "unrealized_pl": "50.00", "side": "long"} for s in symbols[:2]]
+        self.assets = [{"symbol": s, "tradable": True, "exchange": "NYSE", "status": "active"} for s in symbols]
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def bars(self, symbol, count=120):
+        """Deterministic daily bars so repeated queries return the same data."""
+        index = pd.bdate_range(end="2024-05-31", periods=count, tz="UTC")
+        base = 10 + sum(map(ord, symbol)) % 50
+        return [{"t": ts.isoformat(), "o": base + i * 0.1, "h": base + i * 0.1 + 0.5, "l": base + i * 0.1 - 0.5,
+                 "c": base + i * 0.1 + 0.2, "v": 100000 + i * 100, "n": 500, "vw": base + i * 0.1}
+                for i, ts in enumerate(index)]
+
+    def _route(self, method, path, query, body):
+        if method == "GET" and path == "/v2/account":
+            return 200, {"id": "mock", "cash": "100000", "equity": "102100", "buying_power": "200000",
+                         "status": "ACTIVE"}
+        if method == "GET" and path == "/v2/positions":
+            return 200, self.positions
+        if method == "GET" and path == "/v2/assets":
+            return 200, self.assets
+        if method == "GET" and path == "/v2/clock":
+            return 200, {"is_open": True, "timestamp": pd.Timestamp.now(tz="UTC").isoformat()}
+        if method == "GET" and path == "/v2/orders":
+            status = query.get("status", ["open"])[0]
+            return 200, [o for o in self.orders if status == "all" or o["status"] == status]
+        if method == "GET" and path == "/v2/orders:by_client_order_id":
+            client_id = query.get("client_order_id", [None])[0]
+            matches = [o for o in self.orders if o["client_order_id"] == client_id]
+            return (200, matches[0]) if matches else (404, {"message": "order not found"})
+        if method == "GET" and path.startswith("/v2/orders/"):
+            order_id = path.rsplit("/", 1)[-1]
+            matches = [o for o in self.orders if o["id"] == order_id]
+            return (200, matches[0]) if matches else (404, {"message": "order not found"})
+        if method == "POST" and path == "/v2/orders":
+            client_id = body.get("client_order_id") or str(uuid.uuid4())
+            if any(o["client_order_id"] == client_id for o in self.orders):
+                return 422, {"message": "client_order_id must be unique"}
+            order = dict(body, id=str(uuid.uuid4()), client_order_id=client_id, status="open",
+                         submitted_at=pd.Timestamp.now(tz="UTC").isoformat())
+            self.orders.append(order)
+            return 200, order
+        if method == "DELETE" and path.startswith("/v2/orders/"):
+            order_id = path.rsplit("/", 1)[-1]
+            for o in self.orders:
+                if o["id"] == order_id:
+                    o["status"] = "canceled"
+            return 204, None
+        if method == "GET" and path == "/v2/stocks/bars":
+            symbols = query["symbols"][0].split(",")
+            limit = int(query["limit"][0]) if "limit" in query else None
+            rows = [(s, bar) for s in symbols for bar in self.bars(s)][:limit]
+            start = int(query.get("page_token", [0])[0])
+            page = rows[start:start + self.page_size]
+            bars = {}
+            for s, bar in page:
+                bars.setdefault(s, []).append(bar)
+            token = str(start + self.page_size) if start + self.page_size < len(rows) else None
+            return 200, {"bars": bars, "next_page_token": token}
+        return 404, {"message": f"no route for {method} {path}"}
+
+    def _handler(self):
+        broker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self, method):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                with broker._lock:
+                    broker.requests[url.path] += 1
+                    throttled = broker.fail_next > 0
+                    if throttled:
+                        broker.fail_next -= 1
+                if broker.latency:
+                    time.sleep(broker.latency)
+                if throttled:
+                    status, payload = 429, {"message": "too many requests"}
+                else:
+                    with broker._lock:
+                        status, payload = broker._route(method, url.path, parse_qs(url.query), body)
+                data = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_DELETE(self):
+                self._serve("DELETE")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,227 @@
+import math
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.special import ndtr as _ndtr
+except ImportError:  # scipy is optional, fall back to a numpy-only approximation
+    _ndtr = None
+
+
+SQRT_2PI = math.sqrt(2 * math.pi)
+DAYS_PER_YEAR = 365.0
+EXCHANGE_TZ = "America/New_York"
+
+
+def norm_pdf(x):
+    """Standard normal probability density."""
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal cumulative distribution, vectorized."""
+    if _ndtr is not None:
+        return _ndtr(x)
+    # Abramowitz & Stegun 26.2.17 (absolute error < 7.5e-8)
+    x = np.asarray(x, dtype=np.float64)
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = 1.0 - norm_pdf(x) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+
+def _prepare(spot, strike, t, rate, vol, is_call, div_yield):
+    """Broadcast all inputs to float64 arrays of a common shape."""
+    spot, strike, t, rate, vol, div_yield = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in (spot, strike, t, rate, vol, div_yield))
+    )
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), spot.shape)
+    # Clamp time and volatility so expired or zero-vol contracts don't divide by zero
+    t = np.maximum(t, 1e-8)
+    vol = np.maximum(vol, 1e-8)
+    return spot, strike, t, rate, vol, is_call, div_yield
+
+
+def black_scholes(spot, strike, t, rate, vol, is_call=True, div_yield=0.0):
+    """Black-Scholes price and Greeks for every contract in one vectorized pass.
+
+    All arguments broadcast against each other, so a whole chain can be priced by
+    passing arrays of strikes, expiries (in years) and call/put flags. Returns a dict
+    of arrays: price, delta, gamma, theta (per calendar day) and vega (per 1 vol point).
+    """
+    spot, strike, t, rate, vol, is_call, div_yield = _prepare(spot, strike, t, rate, vol, is_call, div_yield)
+
+    sqrt_t = np.sqrt(t)
+    vol_sqrt_t = vol * sqrt_t
+    d1 = (np.log(spot / strike) + (rate - div_yield + 0.5 * vol * vol) * t) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+
+    disc_r = np.exp(-rate * t)
+    disc_q = np.exp(-div_yield * t)
+    pdf_d1 = norm_pdf(d1)
+    # Puts use N(-d), so flip the sign of d1/d2 once and share a single cdf call
+    sign = np.where(is_call, 1.0, -1.0)
+    cdf_d1 = norm_cdf(sign * d1)
+    cdf_d2 = norm_cdf(sign * d2)
+
+    price = sign * (spot * disc_q * cdf_d1 - strike * disc_r * cdf_d2)
+    delta = sign * disc_q * cdf_d1
+    gamma = disc_q * pdf_d1 / (spot * vol_sqrt_t)
+    vega = spot * disc_q * pdf_d1 * sqrt_t
+    theta = (-(spot * disc_q * pdf_d1 * vol) / (2 * sqrt_t)
+             - sign * rate * strike * disc_r * cdf_d2
+             + sign * div_yield * spot * disc_q * cdf_d1)
+
+    return {
+        "price": price,
+        "delta": delta,
+        "gamma": gamma,
+        "theta": theta / DAYS_PER_YEAR,
+        "vega": vega / 100.0,
+    }
+
+
+def implied_vol(market_price, spot, strike, t, rate, is_call=True, div_yield=0.0,
+                initial_vol=0.3, tol=1e-6, max_iter=50):
+    """Solve implied volatility for a whole chain at once.
+
+    Uses Newton steps on every contract simultaneously and falls back to bisection
+    where vega is too small for Newton to make progress. Contracts whose price is
+    outside the no-arbitrage bounds come back as NaN.
+    """
+    market_price = np.asarray(market_price, dtype=np.float64)
+    spot, strike, t, rate, vol, is_call, div_yield = _prepare(
+        spot, strike, t, rate, np.full(np.shape(market_price), initial_vol), is_call, div_yield
+    )
+    market_price = np.broadcast_to(market_price, spot.shape)
+
+    disc_r = np.exp(-rate * t)
+    disc_q = np.exp(-div_yield * t)
+    lower_bound = np.where(is_call,
+                           np.maximum(spot * disc_q - strike * disc_r, 0.0),
+                           np.maximum(strike * disc_r - spot * disc_q, 0.0))
+    upper_bound = np.where(is_call, spot * disc_q, strike * disc_r)
+    valid = (market_price > lower_bound) & (market_price < upper_bound)
+
+    vol = vol.copy()
+    low = np.full(spot.shape, 1e-4)
+    high = np.full(spot.shape, 5.0)
+    active = valid.copy()
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        greeks = black_scholes(spot[active], strike[active], t[active], rate[active],
+                               vol[active], is_call[active], div_yield[active])
+        diff = greeks["price"] - market_price[active]
+        vega = greeks["vega"] * 100.0
+
+        # Keep a bracket around the root so bisection is always available
+        lo, hi, v = low[active], high[active], vol[active]
+        lo = np.where(diff < 0, v, lo)
+        hi = np.where(diff > 0, v, hi)
+
+        newton = v - diff / np.where(vega > 1e-10, vega, np.nan)
+        use_newton = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        v = np.where(use_newton, newton, 0.5 * (lo + hi))
+
+        low[active], high[active], vol[active] = lo, hi, v
+        done = np.abs(diff) < tol
+        idx = np.flatnonzero(active)
+        active[idx[done]] = False
+
+    return np.where(valid, vol, np.nan)
+
+
+def year_fraction(expiry, now=None):
+    """Convert expiry dates to a year fraction from now."""
+    now = pd.Timestamp.now(EXCHANGE_TZ) if now is None else pd.Timestamp(now)
+    if now.tzinfo is not None:
+        # Expiry dates are exchange dates, compare against exchange wall-clock time
+        now = now.tz_convert(EXCHANGE_TZ).tz_localize(None)
+    expiry = pd.to_datetime(expiry)
+    # Options expire at the close, treat the expiry date as 16:00
+    expiry = expiry + pd.Timedelta(hours=16)
+    seconds = (expiry - now) / pd.Timedelta(seconds=1)
+    return np.maximum(np.asarray(seconds, dtype=np.float64), 0.0) / (DAYS_PER_YEAR * 86400)
+
+
+def monthly_expiry(now=None, min_days=7):
+    """The next standard monthly expiry (third Friday) at least min_days after now, as YYYY-MM-DD."""
+    now = pd.Timestamp.now(EXCHANGE_TZ) if now is None else pd.Timestamp(now)
+    if now.tzinfo is not None:
+        now = now.tz_convert(EXCHANGE_TZ).tz_localize(None)
+    today = now.normalize()
+    month = today.replace(day=1)
+    while True:
+        third_friday = month + pd.Timedelta(days=(4 - month.weekday()) % 7 + 14)
+        if (third_friday - today).days >= min_days:
+            return third_friday.strftime("%Y-%m-%d")
+        month = month + pd.offsets.MonthBegin(1)
+
+
+def price_chain(chain, spot, rate=0.05, div_yield=0.0, now=None):
+    """Add theoretical value, implied vol and Greeks columns to an option chain.
+
+    The chain needs 'strike', 'expiry' and 'option_type' ('call'/'put') columns. If it
+    has a 'mid' (or 'bid'/'ask') column, implied vol is solved from it; otherwise an
+    'iv' column must already be present.
+    """
+    chain = chain.copy()
+    strike = chain['strike'].to_numpy(dtype=np.float64)
+    t = year_fraction(chain['expiry'], now)
+    is_call = chain['option_type'].str.lower().eq('call').to_numpy()
+
+    if 'mid' not in chain and {'bid', 'ask'} <= set(chain.columns):
+        chain['mid'] = (chain['bid'] + chain['ask']) / 2
+    if 'mid' in chain:
+        chain['iv'] = implied_vol(chain['mid'].to_numpy(dtype=np.float64), spot, strike, t,
+                                  rate, is_call, div_yield)
+
+    greeks = black_scholes(spot, strike, t, rate, chain['iv'].to_numpy(dtype=np.float64),
+                           is_call, div_yield)
+    chain['theo'] = greeks['price']
+    for name in ('delta', 'gamma', 'theta', 'vega'):
+        chain[name] = greeks[name]
+    return chain
+
+
+def synthetic_chain(spot, expiry, vol, strike_step=1.0, width=0.2):
+    """Build a strike ladder around spot priced at a single volatility.
+
+    Used when no broker chain is available, e.g. in backtests, so strategies can
+    still select contracts by delta.
+    """
+    low = math.floor(spot * (1 - width) / strike_step) * strike_step
+    high = math.ceil(spot * (1 + width) / strike_step) * strike_step
+    strikes = np.arange(low, high + strike_step, strike_step)
+    chain = pd.DataFrame({
+        'strike': np.concatenate([strikes, strikes]),
+        'expiry': expiry,
+        'option_type': ['call'] * len(strikes) + ['put'] * len(strikes),
+        'iv': vol,
+    })
+    return chain
+
+
+def select_by_delta(chain, target_delta, option_type):
+    """Pick the contract whose delta is closest to the target (absolute value)."""
+    side = chain[chain['option_type'].str.lower() == option_type]
+    side = side[np.isfinite(side['delta'])]
+    if side.empty:
+        return None
+    distance = (side['delta'].abs() - abs(target_delta)).abs()
+    return side.loc[distance.idxmin()]
+
+
+def historical_vol(close, window=20, periods_per_year=252):
+    """Annualized close-to-close volatility over the trailing window."""
+    returns = np.log(close).diff().dropna()
+    return float(returns.tail(window).std() * math.sqrt(periods_per_year))
+
+
+def option_value(spot, strike, expiry, vol, option_type, rate=0.05, now=None):
+    """Theoretical value of a single contract, used for option-value exits."""
+    t = year_fraction(expiry, now)
+    greeks = black_scholes(spot, strike, t, rate, vol, option_type == 'call')
+    return float(greeks['price'])
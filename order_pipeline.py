@@ -0,0 +1,239 @@
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import queue
+import threading
+import time
+import uuid
+import numpy as np
+from broker_client import Entity
+
+
+# Broker order statuses after which an order can't fill any further
+DONE_STATUSES = {"filled", "canceled", "expired", "rejected", "replaced"}
+
+# status is "accepted", "duplicate" (the broker already had an order with this key, e.g. sent before a
+# restart; order is that earlier order), "rejected" (the broker refused it) or "failed" (the client's
+# retries ran out)
+OrderAck = namedtuple("OrderAck", ["key", "symbol", "side", "qty", "status", "order", "error",
+                                   "queued_seconds", "submit_seconds", "context"])
+
+
+def order_key(*parts):
+    """Deterministic client_order_id from e.g. (strategy, symbol, side, bar time).
+
+    The same signal evaluated again on the next iteration yields the same key, so
+    it can't turn into a second order even after a restart.
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:24]
+    return f"{str(parts[0])[:16]}-{digest}"
+
+
+def error_status(error):
+    """HTTP status carried by a broker exception (BrokerError.status, alpaca APIError.status_code)."""
+    for attr in ("status", "status_code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+class OrderPipeline:
+    """Submits queued orders on a small thread pool so a slow broker never blocks the strategy loop.
+
+    Every order carries a client_order_id (idempotency key). Retrying is left to
+    the API client (BrokerClient retries submissions that carry one), and a
+    "client_order_id must be unique" rejection means an earlier submission got
+    through, so an order can't be filled twice. That earlier order may be long
+    done (e.g. sent before a restart), so it is acked as "duplicate" rather than
+    "accepted". Keys of orders in flight, accepted or duplicate are also dropped
+    locally before reaching the broker; a rejected or failed order's key is
+    forgotten so the order can be sent again. At most max_in_flight orders
+    are at the broker at once; submit() blocks once max_pending orders are waiting.
+    Results come back as OrderAck events on a queue for the strategy thread to drain.
+    """
+
+    def __init__(self, api, max_in_flight=4, max_pending=100, history=10_000, executor=None):
+        self.api = api
+        self.acks = queue.Queue()
+        self.submit_seconds = deque(maxlen=1000)
+        # duplicate: the broker had the key already; duplicates: dropped here before reaching the broker
+        self.counts = {"submitted": 0, "accepted": 0, "duplicate": 0, "rejected": 0, "failed": 0, "duplicates": 0}
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="orders")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._seen = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+
+    def submit(self, order, key=None, context=None):
+        """Queue an order dict (broker.client.submit_order kwargs); returns its key, or None if it's a duplicate."""
+        key = key or order.get("client_order_id") or uuid.uuid4().hex
+        with self._lock:
+            if key in self._seen:
+                self.counts["duplicates"] += 1
+                logging.info(f"Order {key} for {order.get('symbol')} already submitted, skipping")
+                return None
+            self._seen[key] = None
+            if len(self._seen) > self._history:
+                self._seen.popitem(last=False)
+            self.counts["submitted"] += 1
+        self._slots.acquire()
+        self._executor.submit(self._run, dict(order, client_order_id=key), time.perf_counter(), context)
+        return key
+
+    def _lookup(self, key):
+        lookup = getattr(self.api, "get_order_by_client_order_id", None)
+        try:
+            return lookup(key) if lookup else None
+        except Exception as e:
+            logging.warning(f"Could not look up order {key}: {e}")
+            return None
+
+    def _send(self, order):
+        """Submit once, the client does the retrying; returns (status, order, error)."""
+        try:
+            return "accepted", self.api.submit_order(**order), None
+        except Exception as e:
+            status = error_status(e)
+            if status == 422 and "client_order_id" in str(e):
+                # An earlier submission with this key reached the broker, whether or not we saw its response
+                return "duplicate", self._lookup(order["client_order_id"]), str(e)
+            if status is not None and 400 <= status < 500 and status != 429:
+                return "rejected", None, str(e)
+            return "failed", None, str(e)
+
+    def _run(self, order, queued_at, context):
+        try:
+            started = time.perf_counter()
+            status, created, error = self._send(order)
+            finished = time.perf_counter()
+            with self._lock:
+                self.counts[status] += 1
+                self.submit_seconds.append(finished - started)
+                if status not in ("accepted", "duplicate"):
+                    self._seen.pop(order["client_order_id"], None)  # Let the same signal try again
+            self.acks.put(OrderAck(order["client_order_id"], order["symbol"], order["side"], order["qty"], status,
+                                   created, error, started - queued_at, finished - started, context))
+        finally:
+            self._slots.release()
+
+    def drain(self):
+        """All acknowledgements received since the last drain."""
+        acks = []
+        while True:
+            try:
+                acks.append(self.acks.get_nowait())
+            except queue.Empty:
+                return acks
+
+    def stats(self):
+        """Order counts and submit latency percentiles (ms) over the last 1000 orders."""
+        with self._lock:
+            latencies = np.array(self.submit_seconds) * 1000
+            result = dict(self.counts)
+        if len(latencies):
+            result.update({f"p{p}_ms": float(np.percentile(latencies, p)) for p in (50, 95, 99)})
+            result["max_ms"] = float(latencies.max())
+        return result
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+class AsyncOrders:
+    """Strategy mixin: queue broker.client orders through an OrderPipeline.
+
+    Call process_order_acks() at the top of on_trading_iteration; each ack is
+    passed to on_order_ack() on the strategy thread. These orders never reach
+    lumibot's fill events, so with track_fills on, accepted orders and their
+    bracket legs are polled until done and each new fill goes to on_api_fill().
+    """
+
+    max_orders_in_flight = 4
+    order_executor = None  # Replays substitute an inline executor so acks arrive deterministically
+    track_fills = False
+
+    @property
+    def order_pipeline(self):
+        if getattr(self, "_order_pipeline", None) is None:
+            self._order_pipeline = OrderPipeline(self.broker.client, max_in_flight=self.max_orders_in_flight,
+                                                 executor=self.order_executor)
+        return self._order_pipeline
+
+    def queue_order(self, order, key=None, context=None):
+        return self.order_pipeline.submit(order, key, context)
+
+    def process_order_acks(self):
+        for ack in self.order_pipeline.drain():
+            try:
+                self.on_order_ack(ack)
+            except Exception as e:
+                logging.error(f"Error handling ack for order {ack.key}: {e}")
+            if self.track_fills and ack.status == "accepted" and ack.order is not None:
+                self._tracked_fills()[ack.order.id] = {}
+        if self.track_fills:
+            self.poll_fills()
+
+    def _tracked_fills(self):
+        if getattr(self, "_tracked_orders", None) is None:
+            self._tracked_orders = {}  # order id -> {order or leg id: (filled qty, filled notional)}
+        return self._tracked_orders
+
+    def poll_fills(self):
+        """Report fills since the last poll on tracked orders and their legs; forget orders that are done."""
+        tracked = self._tracked_fills()
+        for order_id in list(tracked):
+            try:
+                order = self.broker.client.get_order(order_id, nested=True)
+            except Exception as e:
+                logging.warning(f"Could not poll order {order_id} for fills: {e}")
+                continue
+            seen = tracked[order_id]
+            legs = [order] + [Entity(leg) for leg in (getattr(order, "legs", None) or [])]
+            for leg in legs:
+                filled = float(getattr(leg, "filled_qty", None) or 0)
+                old_qty, old_notional = seen.get(leg.id, (0.0, 0.0))
+                if filled <= old_qty:
+                    continue
+                notional = filled * float(leg.filled_avg_price)
+                seen[leg.id] = (filled, notional)
+                qty = filled - old_qty
+                try:
+                    self.on_api_fill(leg, qty, (notional - old_notional) / qty)
+                except Exception as e:
+                    logging.error(f"Error handling fill of order {leg.id}: {e}")
+            if all(leg.status in DONE_STATUSES for leg in legs):
+                del tracked[order_id]
+
+    def on_api_fill(self, order, qty, price):
+        """A new fill of qty at price on an order (or bracket leg) sent through the pipeline."""
+        logging.info(f"{order.symbol}: {order.side} {qty} filled at {price:.2f} (order {order.id})")
+
+    def on_order_ack(self, ack):
+        if ack.status == "accepted":
+            logging.info(f"{ack.symbol}: {ack.side} {ack.qty} accepted in {ack.submit_seconds * 1000:.0f}ms "
+                         f"(queued {ack.queued_seconds * 1000:.0f}ms, key {ack.key})")
+        elif ack.status == "duplicate":
+            logging.warning(f"{ack.symbol}: {ack.side} {ack.qty} already at the broker as order "
+                            f"{getattr(ack.order, 'id', None)} (key {ack.key}), not sent again")
+        else:
+            logging.error(f"{ack.symbol}: {ack.side} {ack.qty} {ack.status}: {ack.error}")
+
+
+if __name__ == "__main__":
+    # Against the mock broker: 20 orders with 200ms broker latency, then a duplicate key that is dropped
+    from broker_client import BrokerClient
+    from mock_broker import MockBroker
+
+    with MockBroker(latency=0.2) as mock:
+        client = BrokerClient("key", "secret", mock.url, data_url=mock.url)
+        pipeline = OrderPipeline(client, max_in_flight=4)
+        started = time.perf_counter()
+        keys = [pipeline.submit({"symbol": "GME", "qty": 1, "side": "buy", "type": "market", "time_in_force": "day"},
+                                key=order_key("demo", "GME", i)) for i in range(20)]
+        print(f"queued 20 orders in {(time.perf_counter() - started) * 1000:.1f}ms")
+        pipeline.submit({"symbol": "GME", "qty": 1, "side": "buy", "type": "market"}, key=keys[0])
+        pipeline.shutdown()
+        print(f"all acked after {time.perf_counter() - started:.2f}s: {pipeline.stats()}")
+        print(f"broker holds {len(mock.orders)} orders")
@@ -1,4 +1,6 @@
+import pandas as pd
 import quantstats as qs
+from rolling_cov import RollingCovariance
 
 
 qs.extend_pandas()
@@ -9,4 +11,13 @@ portfolio = qs.utils.make_index(index, period='3y')
 portfolio.index = portfolio.index.tz_localize(None)
 portfolio.plot_earnings(start_balance= 10000, savefig="output/portfolio_earnings.png")
 portfolio.plot_monthly_heatmap(savefig="output/portfolio_heat.png")
-#print(portfolio.head())
\ No newline at end of file
+#print(portfolio.head())
+
+# Covariance view of the components: 60-day correlation and what it means for the fixed weights
+returns = pd.DataFrame({symbol: qs.utils.download_returns(symbol, period='3y') for symbol in index}).dropna()
+covariance = RollingCovariance(list(index), window=60)
+for _, row in returns.iterrows():
+    covariance.update(row)
+print(covariance.correlation_frame())
+print(f"Volatility at fixed weights: {covariance.portfolio_volatility(index):.1%}")
+print(f"Inverse-volatility weights: {covariance.inverse_volatility_weights().round(2).to_dict()}")
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from event_bus import Subscriber
+
+
+FILL_STATUSES = ("filled", "partially_filled")
+
+
+def change_key(change):
+    """Changes with the same key supersede each other: the account, or one symbol's position."""
+    return ("account",) if change["type"] == "account" else ("position", change["symbol"])
+
+
+class PortfolioSnapshot:
+    """One cached view of the broker account and open positions, shared by every dashboard client.
+
+    A task on app.py's event loop fetches the account and positions every ttl
+    seconds, or sooner when a fill is reported (poke), so page loads never
+    reach the broker. Reads get the serialized snapshot and its ETag. Each
+    refresh diffs the new view against the old one and sends subscribers
+    only what changed. A short log of changes lets a polling client ask for
+    the changes since its version instead of the whole list. All state is
+    touched from the event loop only; fetch runs in a worker thread.
+    """
+
+    def __init__(self, fetch, ttl=15.0, min_interval=1.0, history=256, max_pending=256):
+        self.fetch = fetch  # () -> (account dict, [position dicts])
+        self.ttl = ttl
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self.account = None
+        self.positions = {}
+        self.version = 0
+        self.changed = None
+        self.checked = None
+        self.body = None
+        self.etag = None
+        self.error = None
+        self.log = deque(maxlen=history)  # (version, [changes])
+        self.subscribers = set()
+        self.stats = {"refreshes": 0, "errors": 0, "pokes": 0, "reads": 0, "not_modified": 0}
+        self._boot = f"{int(time.time()):x}"  # Keeps ETags from one run matching another's
+        self._last_fetch = 0.0
+        self._wake = None
+        self._task = None
+
+    @classmethod
+    def from_client(cls, client, **kwargs):
+        """Snapshot served from a broker_client.BrokerClient."""
+        return cls(lambda: (client.get_account().to_dict(), [p.to_dict() for p in client.list_positions()]), **kwargs)
+
+    def start(self):
+        """Start refreshing; call from the running event loop (e.g. a startup handler)."""
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def poke(self):
+        """Refresh soon, e.g. after a fill; bursts of pokes share one refresh."""
+        self.stats["pokes"] += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.ttl)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # Fills arrive in bursts; waiting out min_interval lets one fetch cover them all
+            wait = self._last_fetch + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def refresh(self):
+        """Fetch the account and positions and apply them; False if the broker call failed."""
+        self._last_fetch = time.monotonic()
+        try:
+            account, positions = await asyncio.to_thread(self.fetch)
+        except Exception as e:
+            self.stats["errors"] += 1
+            self.error = str(e)
+            logging.warning(f"Portfolio refresh failed, serving the snapshot from version {self.version}: {e}")
+            return False
+        self.apply(account, positions)
+        return True
+
+    def apply(self, account, positions):
+        """Swap in a new view, fan out what changed, and return the changes."""
+        self.stats["refreshes"] += 1
+        self.checked = time.time()
+        self.error = None
+        positions = {p["symbol"]: p for p in positions}
+        changes = []
+        if account != self.account:
+            changes.append({"type": "account", "account": account})
+        for symbol, position in positions.items():
+            if self.positions.get(symbol) != position:
+                changes.append({"type": "position", "symbol": symbol, "position": position})
+        for symbol in self.positions.keys() - positions.keys():
+            changes.append({"type": "position", "symbol": symbol, "position": None})  # Closed
+        if not changes:
+            return []
+
+        self.version += 1
+        self.changed = self.checked
+        self.account, self.positions = account, positions
+        self.body = json.dumps(self.snapshot(), default=str)
+        self.etag = f'"{self._boot}-{self.version}"'
+        for change in changes:
+            change["version"] = self.version
+        self.log.append((self.version, changes))
+        for change in changes:
+            payload = json.dumps(change, default=str)
+            for subscriber in self.subscribers:
+                subscriber.offer(change_key(change), self.version, payload)
+        return changes
+
+    def snapshot(self):
+        return {"version": self.version, "changed": self.changed, "account": self.account,
+                "positions": list(self.positions.values())}
+
+    def read(self, if_none_match=None):
+        """(body, etag) for a GET, or (None, etag) when the client's copy is current."""
+        self.stats["reads"] += 1
+        if if_none_match is not None and self.etag is not None and if_none_match == self.etag:
+            self.stats["not_modified"] += 1
+            return None, self.etag
+        return self.body, self.etag
+
+    def changes_since(self, version):
+        """The latest change per account/symbol after version, or None if the log no longer reaches back."""
+        if version == self.version:
+            return []
+        if version > self.version or not self.log or self.log[0][0] > version + 1:
+            return None
+        latest = {}
+        for logged, changes in self.log:
+            if logged > version:
+                for change in changes:
+                    latest.pop(change_key(change), None)
+                    latest[change_key(change)] = change
+        return list(latest.values())
+
+    def subscribe(self):
+        """A Subscriber that starts with the full snapshot and then gets changes, coalesced per symbol."""
+        subscriber = Subscriber(max_pending=self.max_pending)
+        if self.body is not None:
+            subscriber.offer(("snapshot",), self.version, json.dumps(dict(self.snapshot(), type="snapshot"), default=str))
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def status(self):
+        return dict(self.stats, version=self.version, positions=len(self.positions), checked=self.checked,
+                    changed=self.changed, error=self.error, subscribers=len(self.subscribers))
+
+
+if __name__ == "__main__":
+    # 1,000 dashboard reads and 20 subscribers against a broker whose prices move every fetch
+    import random
+
+    rng = random.Random(0)
+    symbols = [f"S{i:03d}" for i in range(200)]
+    fetches = []
+
+    def fake_fetch():
+        fetches.append(time.monotonic())
+        time.sleep(0.05)  # Broker round trip
+        positions = [{"symbol": s, "qty": "100", "current_price": f"{100 + rng.random():.2f}"}
+                     for s in symbols[:150 + len(fetches) % 3]]
+        return {"equity": f"{100000 + len(fetches):.2f}", "cash": "25000.00"}, positions
+
+    async def main():
+        snapshot = PortfolioSnapshot(fake_fetch, ttl=0.5, min_interval=0.2)
+        snapshot.start()
+        await asyncio.sleep(0.2)
+        subscribers = [snapshot.subscribe() for _ in range(20)]
+        etag = None
+        started = time.perf_counter()
+        for _ in range(1000):
+            body, tag = snapshot.read(etag)
+            etag = tag
+        read_us = (time.perf_counter() - started) * 1e6 / 1000
+        version = snapshot.version
+        for _ in range(5):
+            snapshot.poke()  # A burst of fills
+        await asyncio.sleep(1.5)
+        message = json.loads(await subscribers[0].next_message(linger=0))
+        delta = snapshot.changes_since(version)
+        print(f"{len(fetches)} broker fetches, reads {read_us:.1f}us each ({snapshot.stats['not_modified']} not modified)")
+        print(f"version {version} -> {snapshot.version}: first subscriber message has {len(message)} entries "
+              f"(types {sorted({m['type'] for m in message})}), changes since {version}: {len(delta)}")
+        print(snapshot.status())
+        await snapshot.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,291 @@
+import logging
+from multiprocessing.managers import BaseManager
+import os
+import secrets
+import threading
+from trade_journal import apply_fill
+
+
+RISK_ADDRESS = ("127.0.0.1", 50051)
+# The manager speaks pickle, so the authkey is what stops other local processes from sending it code.
+# It comes from RISK_AUTHKEY (environment or config.py) or is generated by app.py for each run and
+# written to RISK_KEY_FILE, readable only by the user running it, for the bots to pick up.
+RISK_KEY_FILE = "risk_service.key"
+
+
+class RiskBook:
+    """Cross-bot exposure, P&L and concentration, kept current incrementally.
+
+    Every fill and price update adjusts running totals in O(1) instead of
+    revaluing the whole book, so check_order() can answer from a few dict lookups.
+    Per-symbol notional is the net quantity across all bots times the last price.
+    The concentration limit only applies once the book is big enough for it to
+    mean something: gross exposure of at least concentration_min_gross, or at
+    least concentration_min_symbols symbols open. Before that, the first few
+    positions would always be a large share of a small book.
+    """
+
+    def __init__(self, max_gross_exposure=1_000_000, max_symbol_exposure=100_000, max_concentration=0.25,
+                 concentration_min_gross=250_000, concentration_min_symbols=5):
+        self.max_gross_exposure = max_gross_exposure
+        self.max_symbol_exposure = max_symbol_exposure
+        self.max_concentration = max_concentration
+        self.concentration_min_gross = concentration_min_gross
+        self.concentration_min_symbols = concentration_min_symbols
+        self.positions = {}  # (bot, symbol) -> [qty, avg_price]
+        self.net_qty = {}  # symbol -> net quantity across bots, open symbols only
+        self.prices = {}  # symbol -> last price
+        self.gross_exposure = 0.0
+        self.net_exposure = 0.0
+        self.unrealized_pnl = 0.0
+        self.realized_pnl = 0.0
+        self._lock = threading.RLock()
+
+    def _symbol_exposure(self, symbol):
+        return self.net_qty.get(symbol, 0.0) * self.prices.get(symbol, 0.0)
+
+    def on_price(self, symbol, price):
+        """Mark a symbol to a new price."""
+        with self._lock:
+            old = self.prices.get(symbol)
+            self.prices[symbol] = price
+            qty = self.net_qty.get(symbol, 0.0)
+            if old is None or qty == 0:
+                return
+            move = price - old
+            self.net_exposure += qty * move
+            self.gross_exposure += abs(qty) * move
+            self.unrealized_pnl += qty * move
+
+    def on_fill(self, bot, symbol, side, qty, price):
+        """Apply a fill from one bot to its position and to the book totals."""
+        signed = qty if side.lower() == "buy" else -qty
+        with self._lock:
+            self.on_price(symbol, price)
+            pos_qty, avg_price = self.positions.get((bot, symbol), (0.0, 0.0))
+            new_qty, new_avg, realized = apply_fill(pos_qty, avg_price, signed, price)
+
+            before = self.net_qty.get(symbol, 0.0)
+            after = before + signed
+            if abs(after) < 1e-9:
+                self.net_qty.pop(symbol, None)  # Flat symbols don't count toward concentration
+            else:
+                self.net_qty[symbol] = after
+            self.net_exposure += signed * price
+            self.gross_exposure += (abs(after) - abs(before)) * price
+            # Unrealized P&L is relative to each bot's average cost
+            self.unrealized_pnl += (new_qty * (price - new_avg)) - (pos_qty * (price - avg_price))
+            self.realized_pnl += realized
+            if new_qty == 0:
+                self.positions.pop((bot, symbol), None)
+            else:
+                self.positions[(bot, symbol)] = (new_qty, new_avg)
+
+    def check_order(self, bot, symbol, side, qty, price=None):
+        """Would this order keep the book inside its limits? Returns (allowed, reason)."""
+        with self._lock:
+            price = price if price is not None else self.prices.get(symbol)
+            if price is None:
+                return True, "no price for symbol yet"
+            signed = qty if side.lower() == "buy" else -qty
+            before = self.net_qty.get(symbol, 0.0)
+            after = before + signed
+            symbol_exposure = abs(after) * price
+            gross = self.gross_exposure + (abs(after) - abs(before)) * price
+
+            if abs(after) > abs(before):
+                if symbol_exposure > self.max_symbol_exposure:
+                    return False, f"{symbol} exposure {symbol_exposure:.0f} over {self.max_symbol_exposure:.0f}"
+                if gross > self.max_gross_exposure:
+                    return False, f"gross exposure {gross:.0f} over {self.max_gross_exposure:.0f}"
+                open_symbols = len(self.net_qty) + (symbol not in self.net_qty)
+                applies = gross >= self.concentration_min_gross or open_symbols >= self.concentration_min_symbols
+                if applies and gross > 0 and open_symbols > 1 and symbol_exposure / gross > self.max_concentration:
+                    holders = sorted(b for b, s in self.positions if s == symbol and b != bot)
+                    return False, (f"{symbol} would be {symbol_exposure / gross:.0%} of gross exposure"
+                                   + (f" (also held by {', '.join(holders)})" if holders else ""))
+            return True, "ok"
+
+    def snapshot(self):
+        """Totals and per-symbol breakdown for dashboards."""
+        with self._lock:
+            symbols = {}
+            for symbol, qty in self.net_qty.items():
+                exposure = self._symbol_exposure(symbol)
+                symbols[symbol] = {
+                    "net_qty": qty,
+                    "price": self.prices.get(symbol),
+                    "exposure": exposure,
+                    "concentration": abs(exposure) / self.gross_exposure if self.gross_exposure else 0.0,
+                    "bots": sorted(b for b, s in self.positions if s == symbol),
+                }
+            return {
+                "gross_exposure": self.gross_exposure,
+                "net_exposure": self.net_exposure,
+                "unrealized_pnl": self.unrealized_pnl,
+                "realized_pnl": self.realized_pnl,
+                "symbols": symbols,
+            }
+
+
+class RiskManager(BaseManager):
+    pass
+
+
+def _limits():
+    """Per-deployment RiskBook limits from config.RISK_LIMITS, if set."""
+    try:
+        import config
+    except ImportError:
+        return {}
+    return dict(getattr(config, "RISK_LIMITS", {}))
+
+
+_book = RiskBook(**_limits())
+RiskManager.register("risk_book", callable=lambda: _book)
+
+
+def risk_authkey():
+    """The risk service's authkey as bytes, or None if none is configured and app.py hasn't written one."""
+    key = os.environ.get("RISK_AUTHKEY")
+    if not key:
+        try:
+            import config
+            key = getattr(config, "RISK_AUTHKEY", None)
+        except ImportError:
+            key = None
+    if not key:
+        try:
+            with open(RISK_KEY_FILE) as file:
+                key = file.read().strip()
+        except OSError:
+            return None
+    return key.encode() if isinstance(key, str) else key
+
+
+def _generate_authkey():
+    key = secrets.token_hex(32)
+    fd = os.open(RISK_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(fd, 0o600)  # O_CREAT leaves the mode of an existing file alone
+    with os.fdopen(fd, "w") as file:
+        file.write(key)
+    os.environ["RISK_AUTHKEY"] = key  # Inherited by the bots app.py starts
+    return key.encode()
+
+
+def serve_in_background(address=RISK_ADDRESS, authkey=None):
+    """Serve the process-wide RiskBook to bot processes (run inside app.py).
+
+    Without a configured authkey a random one is generated for this run.
+    """
+    authkey = authkey or risk_authkey() or _generate_authkey()
+    server = RiskManager(address=address, authkey=authkey).get_server()
+    thread = threading.Thread(target=server.serve_forever, name="risk-server", daemon=True)
+    thread.start()
+    return _book
+
+
+_client_book = None
+_client_lock = threading.Lock()
+
+
+def get_risk_book(address=RISK_ADDRESS, authkey=None):
+    """The shared RiskBook served by app.py, or a local one if app.py isn't running."""
+    global _client_book
+    with _client_lock:
+        if _client_book is None:
+            authkey = authkey or risk_authkey()
+            if authkey is None:
+                logging.warning("No risk service authkey (RISK_AUTHKEY or risk_service.key), "
+                                "using a local risk book for this process")
+                _client_book = _book
+                return _client_book
+            manager = RiskManager(address=address, authkey=authkey)
+            try:
+                manager.connect()
+                _client_book = manager.risk_book()
+            except (ConnectionError, OSError) as e:
+                logging.warning(f"Risk service unavailable ({e}), using a local risk book for this process")
+                _client_book = _book
+        return _client_book
+
+
+def _call_book(method, *args):
+    """Call the shared book; (True, result), or (False, None) with a reconnect on the next call."""
+    global _client_book
+    try:
+        return True, getattr(get_risk_book(), method)(*args)
+    except (ConnectionError, EOFError, OSError) as e:
+        # Lost the risk service (app.py restarted); reconnect on the next call
+        logging.error(f"Risk book {method} failed: {e}")
+        _client_book = None
+        return False, None
+
+
+class RiskChecked:
+    """Strategy mixin: feed fills into the shared risk book and gate new orders on it.
+
+    Backtests leave the live book alone: every order is allowed and nothing is recorded.
+    """
+
+    def risk_allows(self, symbol, side, qty, price=None):
+        if self.is_backtesting:
+            return True
+        ok, result = _call_book("check_order", self.name, symbol, side, float(qty), price)
+        if not ok:
+            logging.error(f"Risk check unavailable for {symbol}, allowing order")
+            return True
+        allowed, reason = result
+        if not allowed:
+            logging.info(f"{symbol}: {side} {qty} blocked by risk check: {reason}")
+        return allowed
+
+    def mark_price(self, symbol, price):
+        if not self.is_backtesting:
+            _call_book("on_price", symbol, float(price))
+
+    def record_fill(self, symbol, side, qty, price):
+        """For orders sent straight to the broker API, which bypass lumibot's fill events."""
+        if not self.is_backtesting:
+            _call_book("on_fill", self.name, symbol, side, float(qty), float(price))
+
+    def close_position(self, symbol):
+        """Flatten one symbol, leaving the strategy's other positions alone (unlike sell_all())."""
+        pos = self.get_position(symbol)
+        if pos is None or pos.quantity == 0:
+            return None
+        side = "sell" if pos.quantity > 0 else "buy"
+        return self.submit_order(self.create_order(symbol, abs(pos.quantity), side))
+
+    def on_filled_order(self, position, order, price, quantity, multiplier):
+        self.record_fill(order.asset.symbol, order.side, quantity * multiplier, price)
+        super().on_filled_order(position, order, price, quantity, multiplier)
+
+
+if __name__ == "__main__":
+    # Time check_order in-process and through the manager, as a bot process would call it
+    import random
+    import time
+
+    serve_in_background()
+    for i in range(200):
+        symbol = f"SYM{i}"
+        _book.on_fill(f"bot{i % 5}", symbol, "buy", 10, 100.0)
+    for _ in range(100_000):
+        _book.on_price(f"SYM{random.randrange(200)}", 100 + random.gauss(0, 1))
+
+    started = time.perf_counter()
+    for _ in range(100_000):
+        _book.check_order("bot0", "SYM7", "buy", 10, 101.0)
+    print(f"in-process check_order: {(time.perf_counter() - started) * 10:.2f} us")
+
+    _client_book = None
+    manager = RiskManager(address=RISK_ADDRESS, authkey=risk_authkey())
+    manager.connect()
+    remote = manager.risk_book()
+    started = time.perf_counter()
+    for _ in range(2_000):
+        remote.check_order("bot0", "SYM7", "buy", 10, 101.0)
+    print(f"remote check_order: {(time.perf_counter() - started) / 2_000 * 1e6:.1f} us")
+    snapshot = remote.snapshot()
+    print({k: round(v, 2) for k, v in snapshot.items() if k != "symbols"})
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+
+
+class RollingCovariance:
+    """Covariance and correlation of returns across a symbol universe, updated one bar at a time.
+
+    Window mode keeps the last `window` return vectors in a ring buffer with
+    running sums and cross-products, so a new bar adds its outer product and
+    drops the oldest one: O(N^2) per bar instead of O(window * N^2) for a
+    recompute. The sums are rebuilt from the buffer once per window to stop
+    rounding error from accumulating. With halflife set, an exponentially
+    weighted covariance is kept instead (no buffer). Missing returns count as 0.
+    """
+
+    def __init__(self, symbols, window=60, halflife=None, periods_per_year=252):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.window = window
+        self.halflife = halflife
+        self.periods_per_year = periods_per_year
+        n = len(self.symbols)
+        self.count = 0
+        self.last_prices = None
+        if halflife is None:
+            self.buffer = np.zeros((window, n))
+            self.sum = np.zeros(n)
+            self.cross = np.zeros((n, n))
+        else:
+            self.alpha = 1 - 0.5 ** (1 / halflife)
+            self.mean = np.zeros(n)
+            self.cov = np.zeros((n, n))
+
+    def _vector(self, returns):
+        if isinstance(returns, (dict, pd.Series)):
+            x = np.zeros(len(self.symbols))
+            for symbol, value in returns.items():
+                i = self.index.get(symbol)
+                if i is not None:
+                    x[i] = value
+        else:
+            x = np.asarray(returns, dtype=np.float64)
+        return np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def update(self, returns):
+        """Add one bar of returns ({symbol: return}, a Series, or an array in symbol order)."""
+        x = self._vector(returns)
+        if self.halflife is not None:
+            if self.count == 0:
+                self.mean = x.copy()  # Start from the first bar, like pandas' ewm(adjust=False)
+            else:
+                # West's exponentially weighted update: shift the mean, then decay and add the new deviation
+                delta = x - self.mean
+                self.mean += self.alpha * delta
+                self.cov *= 1 - self.alpha
+                self.cov += (self.alpha * (1 - self.alpha)) * np.outer(delta, delta)
+            self.count += 1
+            return
+        slot = self.count % self.window
+        if self.count >= self.window:
+            old = self.buffer[slot]
+            rows = np.stack([x, old])
+            self.sum += x - old
+            self.cross += (rows.T * np.array([1.0, -1.0])) @ rows
+        else:
+            self.sum += x
+            self.cross += np.outer(x, x)
+        self.buffer[slot] = x
+        self.count += 1
+        if self.count % self.window == 0:
+            self.sum = self.buffer.sum(axis=0)
+            self.cross = self.buffer.T @ self.buffer
+
+    def update_prices(self, prices):
+        """Add one bar of prices in symbol order (or {symbol: price}); log returns are taken against the last bar."""
+        if isinstance(prices, (dict, pd.Series)):
+            prices = np.array([prices.get(s, np.nan) for s in self.symbols], dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        if self.last_prices is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.update(np.log(prices / self.last_prices))
+        # Keep the last known price for symbols that didn't print this bar
+        self.last_prices = np.where(np.isfinite(prices), prices,
+                                    self.last_prices if self.last_prices is not None else np.nan)
+
+    @property
+    def observations(self):
+        return min(self.count, self.window) if self.halflife is None else self.count
+
+    def covariance(self):
+        """Sample covariance matrix (N x N) of per-bar returns."""
+        if self.halflife is not None:
+            return self.cov.copy()
+        n = self.observations
+        if n < 2:
+            return np.full_like(self.cross, np.nan)
+        return (self.cross - np.outer(self.sum, self.sum) / n) / (n - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+    def covariance_frame(self):
+        return pd.DataFrame(self.covariance(), index=self.symbols, columns=self.symbols)
+
+    def correlation_frame(self):
+        return pd.DataFrame(self.correlation(), index=self.symbols, columns=self.symbols)
+
+    def most_correlated(self, symbol, n=10):
+        """The n symbols moving most closely with symbol."""
+        row = pd.Series(self.correlation()[self.index[symbol]], index=self.symbols).drop(symbol)
+        return row.sort_values(ascending=False).head(n)
+
+    def volatility(self):
+        """Annualized volatility per symbol."""
+        return pd.Series(np.sqrt(np.clip(np.diag(self.covariance()), 0.0, None) * self.periods_per_year),
+                         index=self.symbols)
+
+    def portfolio_volatility(self, weights):
+        """Annualized volatility of a {symbol: weight} portfolio, correlations included."""
+        w = self._vector(weights)
+        return float(np.sqrt(max(w @ self.covariance() @ w, 0.0) * self.periods_per_year))
+
+    def inverse_volatility_weights(self, symbols=None):
+        """Weights proportional to 1/volatility, summing to 1."""
+        vol = self.volatility()
+        vol = vol[symbols] if symbols is not None else vol
+        inverse = 1 / vol.replace(0.0, np.nan)
+        return (inverse / inverse.sum()).fillna(0.0)
+
+
+if __name__ == "__main__":
+    # 2,000 symbols in 20 sectors, 60-bar window: per-bar update vs recomputing np.cov on the window
+    import time
+
+    rng = np.random.default_rng(0)
+    n, bars, window = 2000, 200, 60
+    sector = rng.normal(0, 0.01, (bars, 20))
+    returns = 0.7 * np.repeat(sector, n // 20, axis=1) + rng.normal(0, 0.01, (bars, n))
+
+    rolling = RollingCovariance(range(n), window=window)
+    for row in returns[:-window]:
+        rolling.update(row)
+    started = time.perf_counter()
+    for row in returns[-window:]:
+        rolling.update(row)
+    update_ms = (time.perf_counter() - started) * 1000 / window  # Includes the once-per-window rebuild
+
+    started = time.perf_counter()
+    full = np.cov(returns[-window:], rowvar=False)
+    recompute_ms = (time.perf_counter() - started) * 1000
+    print(f"update {update_ms:.1f}ms vs recompute {recompute_ms:.1f}ms for {n} symbols; "
+          f"max error {np.abs(rolling.covariance() - full).max():.2e}")
+    print(rolling.most_correlated(0, 3).round(2).to_dict())
+
+    ewm = RollingCovariance(["GME", "AMC", "MARA"], halflife=20)
+    moves = rng.normal(0, 0.03, (250, 1)) + rng.normal(0, 0.02, (250, 3))
+    for row in moves:
+        ewm.update(row)
+    expected = pd.DataFrame(moves).ewm(halflife=20, adjust=False).cov(bias=True).iloc[-3:].to_numpy()
+    print(ewm.correlation_frame().round(2))
+    print(f"EWM max error vs pandas: {np.abs(ewm.covariance() - expected).max():.2e}")
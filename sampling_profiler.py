@@ -0,0 +1,220 @@
+from collections import Counter
+import json
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+from bot_control import ControlChannel
+
+
+PROFILE_DIR = "profiles"
+STDLIB = os.path.normcase(sysconfig.get_paths()["stdlib"])
+
+
+def _package(filename):
+    """Top-level package a source file belongs to: 'pandas', 'requests', 'logging', or the bot's own module."""
+    path = os.path.normcase(filename)
+    for marker in ("site-packages", "dist-packages"):
+        if marker in path:
+            rest = path.split(marker, 1)[1].lstrip("\\/")
+            return rest.split(os.sep)[0].split("/")[0].removesuffix(".py")
+    if path.startswith(STDLIB):
+        rest = path[len(STDLIB):].lstrip("\\/")
+        return rest.split(os.sep)[0].split("/")[0].removesuffix(".py")
+    return os.path.basename(path).removesuffix(".py")
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler for a live process.
+
+    A background thread reads every other thread's current frame with
+    sys._current_frames() each interval and counts whole stacks, so the cost is
+    one stack walk per thread per sample and nothing is traced in between.
+    Frame labels are cached per code object.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.started = self.stopped = None
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename.replace("\\", "/").split("/")
+            label = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def sample(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if names.get(ident, "").startswith("profiler-"):
+                continue  # The sampler and its control threads
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self, deadline):
+        while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+            began = time.perf_counter()
+            self.sample()
+            self.sampling_seconds += time.perf_counter() - began
+            self._stop.wait(self.interval)
+        self.stopped = time.time()
+
+    def start(self, duration=None):
+        self._stop.clear()
+        self.started = time.time()
+        deadline = time.monotonic() + duration if duration else None
+        self._thread = threading.Thread(target=self._run, args=(deadline,), name="profiler-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def wait(self):
+        self._thread.join()
+
+    def _frames(self, stack):
+        return [stack[0]] + [self._label(code) for code in stack[1:]]
+
+    def collapsed(self):
+        """Brendan Gregg collapsed-stack lines ('thread;outer;...;leaf count') for flamegraph.pl/speedscope."""
+        lines = [f"{';'.join(self._frames(stack))} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def top(self, n=20, by="self"):
+        """Hottest functions ranked by self samples (leaf) or total samples (anywhere on the stack)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            if len(stack) > 1:
+                own[stack[-1]] += count
+            for code in set(stack[1:]):
+                total[code] += count
+        samples = sum(self.stacks.values()) or 1
+        order = (lambda c: (own[c], total[c])) if by == "self" else (lambda c: (total[c], own[c]))
+        ranked = sorted(total, key=order, reverse=True)[:n]
+        return [{"function": self._label(code), "self": own[code], "self_pct": 100 * own[code] / samples,
+                 "total": total[code], "total_pct": 100 * total[code] / samples} for code in ranked]
+
+    def packages(self):
+        """Share of samples with each top-level package (pandas, requests, logging, ...) on the stack."""
+        counts = Counter()
+        for stack, count in self.stacks.items():
+            for package in {_package(code.co_filename) for code in stack[1:]}:
+                counts[package] += count
+        samples = sum(self.stacks.values()) or 1
+        return {package: 100 * count / samples for package, count in counts.most_common()}
+
+    def report(self, n=20):
+        elapsed = (self.stopped or time.time()) - self.started
+        return {
+            "started": self.started,
+            "seconds": elapsed,
+            "samples": self.samples,
+            "interval": self.interval,
+            "overhead_pct": 100 * self.sampling_seconds / elapsed if elapsed else 0.0,
+            "top_self": self.top(n, "self"),
+            "top_total": self.top(n, "total"),
+            "packages": self.packages(),
+        }
+
+    def write(self, name, directory=PROFILE_DIR, n=20):
+        """Write <name>-<time>.collapsed and .json; returns their paths."""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))}")
+        with open(f"{base}.collapsed", "w") as file:
+            file.write(self.collapsed())
+        report = dict(self.report(n), collapsed=f"{base}.collapsed")
+        with open(f"{base}.json", "w") as file:
+            json.dump(report, file, indent=2)
+        return f"{base}.collapsed", f"{base}.json"
+
+
+def latest_report(name, directory=PROFILE_DIR):
+    """Path of the newest JSON report for a bot, or None."""
+    if not os.path.isdir(directory):
+        return None
+    reports = [f for f in os.listdir(directory) if f.startswith(f"{name}-") and f.endswith(".json")]
+    return os.path.join(directory, max(reports)) if reports else None
+
+
+_installed = set()
+
+
+def install(bot, poll_interval=1.0):
+    """Let app.py start and stop profiling of this process through the bot_control 'profile' channel.
+
+    Messages are {"action": "start", "duration": seconds, "interval": seconds}
+    or {"action": "stop"}; results are written under profiles/ when a run ends.
+    Installing the same bot twice in a process is a no-op.
+    """
+    if bot in _installed:
+        return
+    _installed.add(bot)
+    channel = ControlChannel(bot, "profile")
+    channel.poll()  # Ignore a request left over from a previous run
+
+    def finish(profiler):
+        profiler.wait()
+        collapsed, report = profiler.write(bot)
+        logging.info(f"Profile of {bot} written to {collapsed} and {report}")
+
+    def watch():
+        profiler = None
+        while True:
+            time.sleep(poll_interval)
+            message = channel.poll()
+            if message is None:
+                continue
+            action = message.get("action", "start")
+            if action == "start" and (profiler is None or profiler.stopped is not None):
+                profiler = SamplingProfiler(message.get("interval", 0.01)).start(message.get("duration", 30))
+                threading.Thread(target=finish, args=(profiler,), name="profiler-writer", daemon=True).start()
+                logging.info(f"Profiling {bot} for {message.get('duration', 30)}s")
+            elif action == "stop" and profiler is not None:
+                profiler.stop()
+
+    threading.Thread(target=watch, name="profiler-control", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # Profile a toy loop shaped like a bot iteration: EWMs, logging a DataFrame, and a slow "broker" call
+    import numpy as np
+    import pandas as pd
+
+    logging.basicConfig(level=logging.INFO, stream=open(os.devnull, "w"))
+    df = pd.DataFrame({"close": np.random.rand(5000).cumsum()})
+
+    def broker_call():
+        time.sleep(0.02)
+
+    def iteration():
+        for span in (9, 21, 50, 200):
+            df[f"ema{span}"] = df["close"].ewm(span=span, adjust=False).mean()
+        logging.info(f"data:\n{df.tail()}")
+        broker_call()
+
+    profiler = SamplingProfiler(interval=0.005).start(duration=2)
+    while profiler.stopped is None:
+        iteration()
+    report = profiler.report(10)
+    print(f"{report['samples']} samples, overhead {report['overhead_pct']:.2f}%")
+    for row in report["top_total"]:
+        print(f"{row['self_pct']:6.1f}% self {row['total_pct']:6.1f}% total  {row['function']}")
+    print({k: round(v, 1) for k, v in list(report["packages"].items())[:8]})
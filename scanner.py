@@ -0,0 +1,108 @@
+import time
+import numpy as np
+import pandas as pd
+from compact_bars import CompactUniverse
+from history_batch import HistoryBatch
+from indicators import ema, rsi
+
+
+def tradable_symbols(api, exchanges=("NASDAQ", "NYSE", "ARCA", "AMEX", "BATS")):
+    """All active, tradable US equity symbols from the broker's asset list."""
+    assets = api.list_assets(status='active', asset_class='us_equity')
+    return sorted(a.symbol for a in assets if a.tradable and a.exchange in exchanges)
+
+
+def load_universe(api, symbols, days=60, timeframe="1Day", chunk_size=200):
+    """Bulk-load the last `days` daily bars for many symbols with multi-symbol bar requests.
+
+    The data API accepts a list of symbols per request, so 5,000 symbols take
+    about 25 requests instead of 5,000.
+    """
+    windows = HistoryBatch(api, timeframe, max_symbols=chunk_size).request_all(symbols, days).fetch()
+    return CompactUniverse.from_frames(windows, 'day')
+
+
+class UniverseScanner:
+    """Screens a whole universe for volume, EMA trend and RSI in one vectorized pass."""
+
+    def __init__(self, min_volume=100000, ema_short=9, ema_long=21, rsi_period=14, rsi_min=30, rsi_max=70,
+                 direction="long"):
+        self.min_volume = min_volume
+        self.ema_short = ema_short
+        self.ema_long = ema_long
+        self.rsi_period = rsi_period
+        self.rsi_min = rsi_min
+        self.rsi_max = rsi_max
+        self.direction = direction
+
+    @classmethod
+    def for_strategy(cls, strategy, **overrides):
+        """Build a scanner from a strategy's own ema_short/ema_long/rsi_period/volume settings."""
+        params = {
+            "min_volume": getattr(strategy, "minimum_volume", getattr(strategy, "min_volume", 100000)),
+            "ema_short": getattr(strategy, "ema_short", 9),
+            "ema_long": getattr(strategy, "ema_long", 21),
+            "rsi_period": getattr(strategy, "rsi_period", 14),
+        }
+        params.update(overrides)
+        return cls(**params)
+
+    def scan(self, universe):
+        """Return passing symbols ranked by EMA trend strength, strongest first."""
+        if len(universe) == 0 or len(universe.index) <= self.rsi_period:
+            return pd.DataFrame(columns=["symbol", "close", "volume", f"{self.ema_short}-ema",
+                                         f"{self.ema_long}-ema", "RSI", "score"])
+        close = universe.close.astype(np.float64)
+        volume = universe.volume[-1]
+        last_close = close[-1]
+
+        ema_short = ema(close, self.ema_short)[-1]
+        ema_long = ema(close, self.ema_long)[-1]
+        # The rolling-mean RSI of the strategies; its last value only needs the last period changes
+        last_rsi = rsi(close[-(self.rsi_period + 1):], self.rsi_period, method="sma")[-1]
+        trend = ema_short / ema_long - 1
+
+        if self.direction == "long":
+            trend_ok = ema_short > ema_long
+        else:
+            trend_ok = ema_short < ema_long
+            trend = -trend
+        passed = (
+            np.isfinite(last_close) &
+            (volume >= self.min_volume) &
+            trend_ok &
+            (last_rsi >= self.rsi_min) & (last_rsi <= self.rsi_max)
+        )
+
+        idx = np.flatnonzero(passed)
+        result = pd.DataFrame({
+            "symbol": np.asarray(universe.symbols, dtype=object)[idx],
+            "close": last_close[idx],
+            "volume": volume[idx],
+            f"{self.ema_short}-ema": ema_short[idx],
+            f"{self.ema_long}-ema": ema_long[idx],
+            "RSI": last_rsi[idx],
+            "score": trend[idx],
+        })
+        return result.sort_values("score", ascending=False, ignore_index=True)
+
+    def candidates(self, universe, limit=20):
+        """Top ranked symbols, ready to assign to a strategy's symbol list."""
+        return self.scan(universe)["symbol"].head(limit).tolist()
+
+
+if __name__ == "__main__":
+    from alpaca_trade_api import REST
+    from config import ALPACA_CONFIG
+
+    api = REST(ALPACA_CONFIG['API_KEY'], ALPACA_CONFIG['API_SECRET'], base_url=ALPACA_CONFIG['PAPER'])
+    symbols = tradable_symbols(api)
+
+    start = time.perf_counter()
+    universe = load_universe(api, symbols)
+    loaded = time.perf_counter()
+    ranked = UniverseScanner(min_volume=100000, ema_short=9, ema_long=21).scan(universe)
+    scanned = time.perf_counter()
+
+    print(ranked.head(25))
+    print(f"Loaded {len(universe)} symbols in {loaded - start:.2f}s, scanned in {(scanned - loaded) * 1000:.1f}ms")
@@ -0,0 +1,437 @@
+from collections import defaultdict, deque
+import datetime as dt
+import functools
+import importlib
+import logging
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from broker_client import Bars, Entity
+
+
+SESSION_DIR = "sessions"
+MAGIC = b"QTSESS1\n"
+HEADER = struct.Struct("<BqI")  # kind, time_ns, payload length
+
+# Record kinds
+START, ITERATION, ITERATION_END, CALL, ORDER = range(5)
+
+# Strategy methods whose results are recorded and served back on replay
+STRATEGY_INPUTS = ["get_historical_prices", "get_last_price", "get_position", "get_positions", "get_cash",
+                   "get_portfolio_value", "get_datetime", "get_orders"]
+# Strategy methods that place orders; recorded as ORDER records and captured on replay
+STRATEGY_ORDERS = ["submit_order", "sell_all", "cancel_open_orders"]
+API_ORDERS = {"submit_order", "cancel_order"}
+# Mixin methods that write to live stores (trade journal, dashboard feed, risk book, signal store);
+# they do nothing on replay, and the risk check allows every order
+SIDE_EFFECTS = ["journal_order", "journal_fill", "journal_mark", "publish_signal", "publish_status", "publish_order",
+                "mark_price", "record_fill", "record_signal"]
+
+
+def snapshot(value):
+    """Reduce a lumibot/alpaca result to plain picklable data (DataFrames, Entity, Bars)."""
+    if value is None or isinstance(value, (str, bytes, int, float, bool, dt.datetime, dt.date,
+                                           pd.DataFrame, pd.Series, np.generic)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [snapshot(v) for v in value]
+    if isinstance(value, dict):
+        return {k: snapshot(v) for k, v in value.items()}
+    if hasattr(value, "df"):
+        return Bars(value.df)
+    if hasattr(value, "quantity"):
+        return Entity(order_fields(value))
+    if hasattr(value, "_raw"):
+        return Entity(dict(value._raw))
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return repr(value)
+
+
+def order_fields(order):
+    """symbol/quantity/side of a lumibot Order or Position (or a replayed Entity)."""
+    asset = getattr(order, "asset", None)
+    return {"symbol": getattr(asset, "symbol", None) or getattr(order, "symbol", None),
+            "quantity": float(getattr(order, "quantity", 0) or 0),
+            "side": getattr(order, "side", None)}
+
+
+def args_key(args, kwargs):
+    """Call arguments for divergence checks; wall-clock datetimes differ run to run, so they're masked."""
+    def mask(v):
+        return "<datetime>" if isinstance(v, (dt.datetime, pd.Timestamp)) else repr(v)
+    return tuple(mask(a) for a in args), tuple(sorted((k, mask(v)) for k, v in kwargs.items()))
+
+
+class SessionWriter:
+    """Appends zlib-compressed pickled records to a session file; safe to call from any thread."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+
+    def write(self, kind, payload, ts=None):
+        data = zlib.compress(pickle.dumps(payload, protocol=5), 1)
+        with self._lock:
+            self._file.write(HEADER.pack(kind, ts or time.time_ns(), len(data)))
+            self._file.write(data)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_session(path):
+    """Yield (kind, time_ns, payload) for every record in a session file."""
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a session file")
+        while True:
+            header = file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            kind, ts, size = HEADER.unpack(header)
+            yield kind, ts, pickle.loads(zlib.decompress(file.read(size)))
+
+
+# Only the outermost call is recorded, so calls lumibot makes internally (e.g. sell_all
+# reading positions) don't end up in the session
+_depth = threading.local()
+
+
+def _picklable_error(error):
+    try:
+        pickle.loads(pickle.dumps(error))
+        return error
+    except Exception:
+        return RuntimeError(repr(error))
+
+
+def _recorded(writer, name, func, order=False):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        outer = not getattr(_depth, "value", 0)
+        if outer and order:
+            writer.write(ORDER, {"call": name, "args": snapshot(list(args)), "kwargs": snapshot(kwargs)})
+        _depth.value = getattr(_depth, "value", 0) + 1
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if outer:
+                # Broker errors are part of the session; replay raises them again
+                writer.write(CALL, {"call": name, "key": args_key(args, kwargs), "error": _picklable_error(e)})
+            raise
+        finally:
+            _depth.value -= 1
+        if outer:
+            writer.write(CALL, {"call": name, "key": args_key(args, kwargs), "result": snapshot(result)})
+        return result
+    return wrapper
+
+
+class RecordingApi:
+    """Wraps broker.client so every call and its response lands in the session."""
+
+    def __init__(self, api, writer):
+        self._api = api
+        self._writer = writer
+
+    def __getattr__(self, name):
+        attr = getattr(self._api, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        return _recorded(self._writer, f"api.{name}", attr, order=name in API_ORDERS)
+
+
+def record_session(strategy, path=None):
+    """Record everything a running strategy sees and does into a session file.
+
+    Patches the instance (not the class): iterations are bracketed with their
+    datetime and duration, the data/account methods and broker.client calls are
+    recorded with their results, and order calls are recorded as orders.
+    """
+    name = getattr(strategy, "name", None) or type(strategy).__name__
+    path = path or os.path.join(SESSION_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.qts")
+    writer = SessionWriter(path)
+    cls = type(strategy)
+    writer.write(START, {"module": cls.__module__, "class": cls.__name__, "name": name})
+
+    for method in STRATEGY_INPUTS + STRATEGY_ORDERS:
+        func = getattr(strategy, method, None)
+        if func is not None:
+            setattr(strategy, method, _recorded(writer, method, func, order=method in STRATEGY_ORDERS))
+    if getattr(strategy.broker, "client", None) is not None:
+        strategy.broker.client = RecordingApi(strategy.broker.client, writer)
+
+    iteration = strategy.on_trading_iteration
+
+    def on_trading_iteration():
+        writer.write(ITERATION, {"datetime": dt.datetime.now().astimezone()})
+        started = time.perf_counter()
+        try:
+            iteration()
+        finally:
+            writer.write(ITERATION_END, {"seconds": time.perf_counter() - started})
+            writer.flush()
+
+    strategy.on_trading_iteration = on_trading_iteration
+    logging.info(f"Recording {name} to {path}")
+    return writer
+
+
+class SimClock:
+    """Simulated wall clock, moved forward by the replay engine to each recorded iteration."""
+
+    def __init__(self, now=None):
+        self.now = now or dt.datetime.now().astimezone()
+
+    def datetime_class(self):
+        clock = self
+
+        class SimDatetime(dt.datetime):
+            @classmethod
+            def now(cls, tz=None):
+                now = clock.now if tz is not None else clock.now.replace(tzinfo=None)
+                return now.astimezone(tz) if tz is not None else now
+
+            @classmethod
+            def utcnow(cls):
+                return clock.now.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+        return SimDatetime
+
+
+class InlineExecutor:
+    """Runs submitted work immediately, so order acks during replay arrive in a fixed order."""
+
+    def submit(self, fn, *args, **kwargs):
+        fn(*args, **kwargs)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class ReplayCalls:
+    """Recorded call results, served back per method in the order they were made."""
+
+    def __init__(self):
+        self.calls = defaultdict(deque)
+        self.divergences = []
+
+    def next(self, name, args, kwargs):
+        queue = self.calls[name]
+        wanted = args_key(args, kwargs)
+        if not queue:
+            self.divergences.append(f"{name}{wanted}: no recorded call left")
+            return None
+        # Calls made from the order pipeline's threads were recorded in completion order,
+        # so take the first recorded call with the same arguments before falling back to FIFO
+        for i, (key, result, error) in enumerate(queue):
+            if key == wanted:
+                del queue[i]
+                break
+        else:
+            key, result, error = queue.popleft()
+            self.divergences.append(f"{name}: called with {wanted}, recorded {key}")
+        if error is not None:
+            raise error
+        return result
+
+
+class ReplayApi:
+    def __init__(self, calls, orders):
+        self._calls = calls
+        self._orders = orders
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            if name in API_ORDERS:
+                self._orders.append({"call": f"api.{name}", "args": snapshot(list(args)), "kwargs": snapshot(kwargs)})
+            return self._calls.next(f"api.{name}", args, kwargs)
+        return call
+
+
+class ReplayBroker:
+    def __init__(self, api):
+        self.client = api
+        self.name = "replay"
+
+
+def replay_class(strategy_class):
+    """Subclass of strategy_class whose data, account and order methods are served from a session."""
+
+    def make_input(method):
+        def served(self, *args, **kwargs):
+            return self._replay_calls.next(method, args, kwargs)
+        served.__name__ = method
+        return served
+
+    def make_order(method):
+        def captured(self, *args, **kwargs):
+            self._replay_orders.append({"call": method, "args": snapshot(list(args)), "kwargs": snapshot(kwargs)})
+            return self._replay_calls.next(method, args, kwargs)
+        captured.__name__ = method
+        return captured
+
+    def create_order(self, asset, quantity, side, *args, **kwargs):
+        symbol = getattr(asset, "symbol", asset)
+        return Entity({"symbol": symbol, "quantity": float(quantity), "side": side})
+
+    def side_effect(self, *args, **kwargs):
+        return None
+
+    def risk_allows(self, *args, **kwargs):
+        return True
+
+    attrs = {m: make_input(m) for m in STRATEGY_INPUTS}
+    attrs.update({m: make_order(m) for m in STRATEGY_ORDERS})
+    attrs.update({m: side_effect for m in SIDE_EFFECTS if hasattr(strategy_class, m)})
+    if hasattr(strategy_class, "risk_allows"):
+        attrs["risk_allows"] = risk_allows
+    # Plain attributes shadow lumibot's properties so initialize() can run without a Trader
+    attrs.update(create_order=create_order, name=None, broker=None, sleeptime=None, is_backtesting=False,
+                 order_executor=InlineExecutor())
+    return type(f"Replay{strategy_class.__name__}", (strategy_class,), attrs)
+
+
+class ReplayReport:
+    def __init__(self, name, orders, recorded_orders, divergences, iteration_seconds, recorded_seconds,
+                 wall_seconds, session_seconds):
+        self.name = name
+        self.orders = orders
+        self.recorded_orders = recorded_orders
+        self.divergences = divergences
+        self.iteration_seconds = np.asarray(iteration_seconds)
+        self.recorded_seconds = np.asarray(recorded_seconds)
+        self.wall_seconds = wall_seconds
+        self.session_seconds = session_seconds
+
+    @property
+    def orders_match(self):
+        """Strategy orders must match in sequence; broker.client orders (sent concurrently) as a multiset."""
+        def split(orders):
+            direct = [o for o in orders if not o["call"].startswith("api.")]
+            api = sorted(repr(o) for o in orders if o["call"].startswith("api."))
+            return direct, api
+        return split(self.orders) == split(self.recorded_orders)
+
+    def summary(self):
+        ms = self.iteration_seconds * 1000
+        result = {
+            "strategy": self.name,
+            "iterations": len(ms),
+            "orders": len(self.orders),
+            "orders_match": self.orders_match,
+            "divergences": len(self.divergences),
+            "session_seconds": self.session_seconds,
+            "replay_seconds": self.wall_seconds,
+            "speedup": self.session_seconds / self.wall_seconds if self.wall_seconds else None,
+        }
+        if len(ms):
+            result.update(p50_ms=float(np.percentile(ms, 50)), p95_ms=float(np.percentile(ms, 95)),
+                          max_ms=float(ms.max()))
+        if len(self.recorded_seconds):
+            result["recorded_p50_ms"] = float(np.percentile(self.recorded_seconds * 1000, 50))
+        return result
+
+
+def replay(path, strategy_class=None, speed=None):
+    """Run a recorded session back through its Strategy class on a simulated clock.
+
+    speed=None replays as fast as the strategy can iterate; speed=100 waits 1/100th
+    of each recorded gap between iterations. Returns a ReplayReport with the orders
+    placed, divergences from the recording and per-iteration cost.
+    """
+    calls = ReplayCalls()
+    recorded_orders, iterations, recorded_seconds = [], [], []
+    meta = None
+    first_ts = last_ts = None
+    for kind, ts, payload in read_session(path):
+        first_ts = first_ts or ts
+        last_ts = ts
+        if kind == START:
+            meta = payload
+        elif kind == ITERATION:
+            iterations.append((ts, payload["datetime"]))
+        elif kind == ITERATION_END:
+            recorded_seconds.append(payload["seconds"])
+        elif kind == CALL:
+            calls.calls[payload["call"]].append((payload["key"], payload.get("result"), payload.get("error")))
+        elif kind == ORDER:
+            recorded_orders.append(payload)
+    if meta is None:
+        raise ValueError(f"{path} has no session header")
+
+    if strategy_class is None:
+        strategy_class = getattr(importlib.import_module(meta["module"]), meta["class"])
+    module = sys.modules[strategy_class.__module__]
+    clock = SimClock(iterations[0][1] if iterations else None)
+    patched = getattr(module, "datetime", None) is dt.datetime
+    if patched:
+        module.datetime = clock.datetime_class()
+
+    orders = []
+    cls = replay_class(strategy_class)
+    strategy = cls.__new__(cls)
+    strategy.name = meta["name"]
+    strategy.broker = ReplayBroker(ReplayApi(calls, orders))
+    strategy._replay_calls = calls
+    strategy._replay_orders = orders
+
+    iteration_seconds = []
+    started = time.perf_counter()
+    try:
+        strategy.initialize()
+        for ts, now in iterations:
+            if speed:
+                # Hold each iteration back to its recorded start time, compressed by speed
+                due = started + (ts - iterations[0][0]) / 1e9 / speed
+                time.sleep(max(0.0, due - time.perf_counter()))
+            clock.now = now
+            began = time.perf_counter()
+            try:
+                strategy.on_trading_iteration()
+            except Exception as e:
+                calls.divergences.append(f"iteration at {now} raised {e!r}")
+            iteration_seconds.append(time.perf_counter() - began)
+    finally:
+        if patched:
+            module.datetime = dt.datetime
+    wall = time.perf_counter() - started
+
+    return ReplayReport(meta["name"], orders, recorded_orders, calls.divergences, iteration_seconds,
+                        recorded_seconds, wall, (last_ts - first_ts) / 1e9)
+
+
+if __name__ == "__main__":
+    # python session_replay.py sessions/OptionsTrend-....qts [speed] [max_p95_ms]
+    # Exits non-zero if orders differ from the recording or p95 iteration cost exceeds max_p95_ms
+    logging.basicConfig(level=logging.WARNING)
+    session = sys.argv[1]
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2] != "max" else None
+    max_p95_ms = float(sys.argv[3]) if len(sys.argv) > 3 else None
+    report = replay(session, speed=speed)
+    summary = report.summary()
+    print(summary)
+    for divergence in report.divergences[:20]:
+        print(f"  divergence: {divergence}")
+    failed = not report.orders_match or (max_p95_ms is not None and summary.get("p95_ms", 0) > max_p95_ms)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,416 @@
+import atexit
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+from compact_bars import from_nanoseconds, to_nanoseconds
+
+
+SIGNAL_DIR = os.path.join("store", "signals")
+SIGNAL_CODES = {None: 0, "HOLD": 0, "BUY": 1, "SELL": -1, "BUY_CALL": 2, "BUY_PUT": -2}
+SIGNAL_NAMES = {0: None, 1: "BUY", -1: "SELL", 2: "BUY_CALL", -2: "BUY_PUT"}
+FIXED_COLUMNS = {"ts": np.int64, "symbol": np.int32, "signal": np.int8}
+
+
+def signal_code(signal):
+    if signal is None or (isinstance(signal, float) and np.isnan(signal)):
+        return 0
+    return SIGNAL_CODES[str(signal)]
+
+
+def _months_of(ns):
+    """YYYY-MM partition name of each nanosecond timestamp."""
+    return np.asarray(ns, dtype="datetime64[ns]").astype("datetime64[M]").astype(str)
+
+
+def _months(start, end):
+    """Partition names from the month of start through the month of end."""
+    return [p.strftime("%Y-%m") for p in pd.period_range(start.tz_convert("UTC").tz_localize(None),
+                                                         end.tz_convert("UTC").tz_localize(None), freq="M")]
+
+
+def _timestamp(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts
+
+
+class Partition:
+    """One strategy-month of signal rows as append-only raw column files.
+
+    ts, symbol and signal are fixed columns; every indicator column is float64
+    (NaN where a row didn't have it). ts is written last, so its length is the
+    committed row count readers trust. Live appends arrive in time order; a
+    block older than the last row (a backfill) clears the sorted flag until
+    the partition is compacted.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta_path = os.path.join(path, "meta.json")
+        self.columns, self.sorted = [], True
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as file:
+                meta = json.load(file)
+            self.columns, self.sorted = meta["columns"], meta.get("sorted", True)
+
+    def _file(self, column):
+        # Fixed columns are prefixed so an indicator called e.g. "Signal" can't clash on case-insensitive disks
+        return os.path.join(self.path, f"_{column}.bin" if column in FIXED_COLUMNS else f"{column}.bin")
+
+    def _write_meta(self):
+        with open(self.meta_path + ".tmp", "w") as file:
+            json.dump({"columns": self.columns, "sorted": self.sorted}, file)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+
+    def last_ts(self):
+        rows = self.rows()
+        if rows == 0:
+            return None
+        with open(self._file("ts"), "rb") as file:
+            file.seek((rows - 1) * 8)
+            return int(np.frombuffer(file.read(8), dtype=np.int64)[0])
+
+    def rows(self):
+        path = self._file("ts")
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def repair(self):
+        """Cut every column back to the committed row count (after a crash between column writes)."""
+        rows = self.rows()
+        for column, dtype in list(FIXED_COLUMNS.items()) + [(c, np.float64) for c in self.columns]:
+            path = self._file(column)
+            if os.path.exists(path) and os.path.getsize(path) > rows * np.dtype(dtype).itemsize:
+                os.truncate(path, rows * np.dtype(dtype).itemsize)
+
+    def append(self, ts, symbols, signals, values):
+        """Append a block of rows; values is {column: float64 array}."""
+        os.makedirs(self.path, exist_ok=True)
+        rows = self.rows()
+        new_columns = [c for c in values if c not in self.columns]
+        for column in new_columns:
+            # Earlier rows didn't have this column
+            np.full(rows, np.nan).tofile(self._file(column))
+        last = self.last_ts()
+        in_order = last is None or bool(ts[0] >= last)
+        if new_columns or not os.path.exists(self.meta_path) or (self.sorted and not in_order):
+            self.columns += new_columns
+            self.sorted = self.sorted and in_order
+            self._write_meta()
+        n = len(ts)
+        for column in self.columns:
+            data = values.get(column)
+            with open(self._file(column), "ab") as file:
+                np.asarray(data if data is not None else np.full(n, np.nan), dtype=np.float64).tofile(file)
+        for column, data in (("symbol", symbols), ("signal", signals), ("ts", ts)):
+            with open(self._file(column), "ab") as file:
+                np.asarray(data, dtype=FIXED_COLUMNS[column]).tofile(file)
+
+    def arrays(self, columns=None):
+        """Memory-mapped columns, each cut to the committed row count."""
+        rows = self.rows()
+        if rows == 0:
+            return None
+        wanted = list(FIXED_COLUMNS) + [c for c in (self.columns if columns is None else columns)
+                                        if c in self.columns]
+        result = {}
+        for column in wanted:
+            dtype = FIXED_COLUMNS.get(column, np.float64)
+            result[column] = np.memmap(self._file(column), dtype=dtype, mode="r", shape=(rows,))
+        for column in (columns or []):
+            if column not in result:
+                result[column] = np.full(rows, np.nan)
+        return result
+
+    def compact(self):
+        """Rewrite the partition in time order (rows with equal timestamps keep their order)."""
+        arrays = self.arrays()
+        if arrays is None or self.sorted:
+            return False
+        order = np.argsort(arrays["ts"], kind="stable")
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        for column, data in arrays.items():
+            data[order].tofile(os.path.join(tmp, os.path.basename(self._file(column))))
+        with open(os.path.join(tmp, "meta.json"), "w") as file:
+            json.dump({"columns": self.columns, "sorted": True}, file)
+        del arrays
+        old = f"{self.path}.old-{os.getpid()}"
+        os.replace(self.path, old)
+        os.replace(tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        self.sorted = True
+        return True
+
+
+class SignalStore:
+    """Every computed signal row, partitioned by strategy and month, with time and symbol indexes.
+
+    Layout: <root>/<strategy>/<YYYY-MM>/ with one raw file per column, plus a per-strategy
+    symbols.json dictionary, so symbols are stored as int32 codes. A query
+    only opens the partitions overlapping its time range, finds the range in
+    the sorted ts column with a binary search, and slices the memory maps;
+    without a symbol filter the result columns are views of the files.
+    Each strategy process appends to its own partitions, so writers never race.
+    """
+
+    def __init__(self, root=SIGNAL_DIR, flush_rows=500, flush_seconds=5.0):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._pending = {}  # strategy -> list of (ts, symbol, signal, values)
+        self._symbols = {}  # strategy -> {symbol: code}
+        self._repaired = set()
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Strategies sharing a process flush from their own threads
+
+    # Writing
+
+    def _codes(self, strategy):
+        codes = self._symbols.get(strategy)
+        if codes is None:
+            path = os.path.join(self.root, strategy, "symbols.json")
+            names = json.load(open(path)) if os.path.exists(path) else []
+            codes = self._symbols[strategy] = {s: i for i, s in enumerate(names)}
+        return codes
+
+    def _code(self, strategy, symbol):
+        codes = self._codes(strategy)
+        if symbol not in codes:
+            codes[symbol] = len(codes)
+            path = os.path.join(self.root, strategy, "symbols.json")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "w") as file:
+                json.dump(list(codes), file)
+            os.replace(path + ".tmp", path)
+        return codes[symbol]
+
+    def append(self, strategy, timestamp, symbol, signal, **values):
+        """Buffer one signal row; indicator values are stored as float64 columns."""
+        row = (to_nanoseconds([_timestamp(timestamp)])[0], symbol, signal_code(signal),
+               {k: float(v) for k, v in values.items() if v is not None})
+        with self._lock:
+            self._pending.setdefault(strategy, []).append(row)
+            due = (sum(len(rows) for rows in self._pending.values()) >= self.flush_rows
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+        if due:
+            self.flush()
+
+    def append_frame(self, strategy, symbol, df, signal_column="Signal", columns=None):
+        """Append a whole history for one symbol, e.g. a DataFrame of indicators with a Signal column."""
+        self.append_frames(strategy, {symbol: df}, signal_column, columns)
+
+    def append_frames(self, strategy, frames, signal_column="Signal", columns=None):
+        """Append {symbol: DataFrame} histories as one time-ordered block per month."""
+        ts, symbols, signals, values = [], [], [], []
+        for symbol, df in frames.items():
+            index = pd.DatetimeIndex(df.index)
+            ts.append(to_nanoseconds(index.tz_localize("UTC") if index.tz is None else index))
+            with self._write_lock:
+                code = self._code(strategy, symbol)
+            symbols.append(np.full(len(df), code, dtype=np.int32))
+            signals.append(pd.Series(df[signal_column]).map(signal_code).to_numpy(dtype=np.int8))
+            numeric = columns or [c for c in df.columns
+                                  if c != signal_column and pd.api.types.is_numeric_dtype(df[c])]
+            values.append({str(c): df[c].to_numpy(dtype=np.float64) for c in numeric})
+        if not ts:
+            return
+        names = list(dict.fromkeys(c for v in values for c in v))
+        merged = {c: np.concatenate([v.get(c, np.full(len(t), np.nan)) for v, t in zip(values, ts)]) for c in names}
+        with self._write_lock:
+            self._write(strategy, np.concatenate(ts), np.concatenate(symbols), np.concatenate(signals), merged)
+
+    def _write(self, strategy, ts, symbols, signals, values):
+        order = np.argsort(ts, kind="stable")
+        ts, symbols, signals = ts[order], symbols[order], signals[order]
+        values = {c: v[order] for c, v in values.items() if c not in FIXED_COLUMNS}
+        months = _months_of(ts)
+        for month in dict.fromkeys(months):
+            rows = months == month
+            partition = Partition(os.path.join(self.root, strategy, month))
+            if partition.path not in self._repaired:
+                partition.repair()
+                self._repaired.add(partition.path)
+            partition.append(ts[rows], symbols[rows], signals[rows], {c: v[rows] for c, v in values.items()})
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        with self._write_lock:
+            for strategy, rows in pending.items():
+                try:
+                    columns = list(dict.fromkeys(c for row in rows for c in row[3]))
+                    values = {c: np.array([row[3].get(c, np.nan) for row in rows]) for c in columns}
+                    self._write(strategy, np.array([row[0] for row in rows], dtype=np.int64),
+                                np.array([self._code(strategy, row[1]) for row in rows], dtype=np.int32),
+                                np.array([row[2] for row in rows], dtype=np.int8), values)
+                except OSError as e:
+                    logging.error(f"Could not write {len(rows)} signal rows for {strategy}: {e}")
+
+    def compact(self, strategy=None):
+        """Sort any partitions that backfills left out of time order; returns how many were rewritten."""
+        self.flush()
+        rewritten = 0
+        for name in ([strategy] if strategy else self.strategies()):
+            directory = os.path.join(self.root, name)
+            for month in sorted(os.listdir(directory)):
+                path = os.path.join(directory, month)
+                if os.path.isdir(path) and ".tmp-" not in month and ".old-" not in month:
+                    rewritten += Partition(path).compact()
+        return rewritten
+
+    # Reading
+
+    def strategies(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def latest(self, strategy, symbol=None):
+        """Timestamp of the newest stored row for a strategy (and symbol), or None."""
+        self.flush()
+        directory = os.path.join(self.root, strategy)
+        if not os.path.isdir(directory):
+            return None
+        code = self._codes(strategy).get(symbol) if symbol is not None else None
+        if symbol is not None and code is None:
+            return None
+        months = [m for m in os.listdir(directory) if len(m) == 7 and os.path.isdir(os.path.join(directory, m))]
+        for month in sorted(months, reverse=True):
+            arrays = Partition(os.path.join(directory, month)).arrays([])
+            if arrays is None:
+                continue
+            ts = arrays["ts"] if code is None else arrays["ts"][arrays["symbol"] == code]
+            if len(ts):
+                return from_nanoseconds(np.array([ts.max()]))[0]
+        return None
+
+    def query_arrays(self, start, end, symbols=None, strategy=None, columns=None):
+        """[(strategy, {column: array})] for rows with start <= ts < end, per partition.
+
+        Arrays are memory-map slices (no copy) unless a symbol filter applies.
+        """
+        start, end = _timestamp(start), _timestamp(end)
+        lo, hi = to_nanoseconds([start, end])
+        parts = []
+        for name in ([strategy] if strategy else self.strategies()):
+            codes = self._codes(name) if symbols is not None else None
+            wanted = np.array([codes[s] for s in symbols if s in codes], dtype=np.int32) if codes is not None else None
+            if wanted is not None and len(wanted) == 0:
+                continue
+            for month in _months(start, end):
+                partition = Partition(os.path.join(self.root, name, month))
+                arrays = partition.arrays(columns)
+                if arrays is None:
+                    continue
+                if partition.sorted:
+                    first, last = np.searchsorted(arrays["ts"], [lo, hi])
+                    if first == last:
+                        continue
+                    arrays = {c: a[first:last] for c, a in arrays.items()}
+                else:
+                    keep = (arrays["ts"] >= lo) & (arrays["ts"] < hi)
+                    arrays = {c: a[keep] for c, a in arrays.items()}
+                if wanted is not None:
+                    keep = np.isin(arrays["symbol"], wanted)
+                    arrays = {c: a[keep] for c, a in arrays.items()}
+                parts.append((name, arrays))
+        return parts
+
+    def query(self, start, end, symbols=None, strategy=None, columns=None):
+        """Signal rows in [start, end) as a DataFrame with timestamp, strategy, symbol, signal and indicator columns."""
+        frames = []
+        for name, arrays in self.query_arrays(start, end, symbols, strategy, columns):
+            names = np.array(list(self._codes(name)), dtype=object)
+            df = pd.DataFrame({c: a for c, a in arrays.items() if c not in FIXED_COLUMNS}, copy=False)
+            df.insert(0, "signal", pd.Categorical.from_codes(pd.Series(arrays["signal"]).map(
+                {c: i for i, c in enumerate(SIGNAL_NAMES)}).to_numpy(), [str(n) for n in SIGNAL_NAMES.values()]))
+            df.insert(0, "symbol", names[arrays["symbol"]])
+            df.insert(0, "strategy", name)
+            df.insert(0, "timestamp", from_nanoseconds(np.asarray(arrays["ts"])))
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=["timestamp", "strategy", "symbol", "signal"])
+        return pd.concat(frames, ignore_index=True).sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_signal_store():
+    """Process-wide store, flushed when the process exits."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SignalStore()
+            atexit.register(_store.flush)
+        return _store
+
+
+class SignalRecording:
+    """Strategy mixin: append each evaluated live signal and its indicator values to the signal store."""
+
+    def record_signal(self, symbol, signal, row=None, **values):
+        """row is the bar the signal was computed on (e.g. stock_data.iloc[-1]); its numeric fields are stored."""
+        if self.is_backtesting:
+            return
+        if row is not None:
+            # Missing values are stored as NaN anyway; skipping them also skips text columns
+            # like Signal, whose None shows up as a float NaN in a row of mixed types
+            values = dict({k: v for k, v in row.items() if isinstance(v, (int, float, np.number))
+                           and not isinstance(v, bool) and np.isfinite(v)}, **values)
+            timestamp = row.name
+        else:
+            timestamp = self.get_datetime()
+        try:
+            get_signal_store().append(self.name, timestamp, symbol, signal, **values)
+        except (KeyError, ValueError, OSError) as e:
+            logging.error(f"Could not record signal for {symbol}: {e}")
+
+
+if __name__ == "__main__":
+    # A month of daily signals for 500 symbols from 4 strategies, then typical dashboard queries
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    store = SignalStore(tempfile.mkdtemp())
+    days = pd.date_range("2024-01-01", "2024-06-30", freq="15min", tz="UTC")
+    days = days[(days.dayofweek < 5) & (days.hour >= 14) & (days.hour < 21)]
+    symbols = [f"S{i:03d}" for i in range(500)]
+    started = time.perf_counter()
+    n = len(days)
+    for strategy in ("trend", "orb", "gldn_options", "day_trend"):
+        frames = {}
+        for symbol in symbols[:125] if strategy != "trend" else symbols:
+            frames[symbol] = pd.DataFrame({"close": rng.random(n) * 100, "ema13": rng.random(n) * 100,
+                                           "ema48": rng.random(n) * 100, "RSI": rng.random(n) * 100,
+                                           "Signal": rng.choice(["BUY", "SELL", None], n, p=[0.05, 0.05, 0.9])},
+                                          index=days)
+        store.append_frames(strategy, frames)
+    # A live bar after the backfill, then a late backfill that leaves March out of order until compacted
+    store.append("trend", "2024-03-29 20:45", "S001", "BUY", close=101.5, RSI=71.0)
+    store.flush()
+    late = days[(days >= "2024-03-01") & (days < "2024-04-01")]
+    store.append_frame("trend", "NEW", pd.DataFrame({"close": np.ones(len(late)), "Signal": None}, index=late))
+    print(f"wrote signal history in {time.perf_counter() - started:.1f}s")
+    unsorted = store.query("2024-03-10", "2024-03-20", strategy="trend")
+    print(f"compacted {store.compact()} partition(s); mid-month query unchanged: "
+          f"{unsorted.sort_values(['timestamp', 'symbol'], ignore_index=True).equals(store.query('2024-03-10', '2024-03-20', strategy='trend').sort_values(['timestamp', 'symbol'], ignore_index=True))}")
+
+    for label, kwargs in (("a month, all symbols and strategies", {}),
+                          ("a month, 500 symbols of trend", {"symbols": symbols, "strategy": "trend"}),
+                          ("a month, one symbol", {"symbols": ["S007"]})):
+        started = time.perf_counter()
+        rows = sum(len(a["ts"]) for _, a in store.query_arrays("2024-03-01", "2024-04-01", **kwargs))
+        arrays_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        df = store.query("2024-03-01", "2024-04-01", **kwargs)
+        frame_ms = (time.perf_counter() - started) * 1000
+        print(f"{label}: {rows} rows, arrays {arrays_ms:.1f}ms, DataFrame {frame_ms:.1f}ms")
+    print(df[df["signal"] != "None"].head())
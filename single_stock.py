@@ -1,4 +1,5 @@
 import quantstats as qs
+from resampling import resample_returns
 
 stock ="SPY"
 
@@ -16,4 +17,8 @@ qs.extend_pandas()
 
 print(portfolio.cagr())
 print(portfolio.max_drawdown())
+
+# How far the Sharpe, CAGR and drawdown above could be from luck: 100k block-bootstrapped 3y paths
+resampled = resample_returns(portfolio, n_paths=100_000, log_returns=False)
+print(resampled.intervals())
 print(portfolio.monthly_returns())
@@ -7,6 +7,7 @@ import numpy as np
 import quantstats as qs
 import webbrowser as web
 import yfinance as yf
+from resampling import resample_returns
 
 
 def ma_cross_strategy(ticker, slow=200, fast=50, end=None, period=3):
@@ -26,6 +27,7 @@ def ma_cross_strategy(ticker, slow=200, fast=50, end=None, period=3):
 
 gld_cross = ma_cross_strategy("GLD", slow=21, fast=9, period=3)
 gld_cross.index = gld_cross.index.tz_localize(None)
+print(resample_returns(gld_cross, n_paths=100_000).intervals())
 gld = qs.utils.download_returns("GLD", period='3y')
 gld.index = gld.index.tz_localize(None)
 
@@ -0,0 +1,249 @@
+from collections import namedtuple
+import json
+import logging
+import sys
+import threading
+import time
+from history_batch import share_history
+from indicator_cache import indicator_cache
+from warm_pool import _load
+
+
+# path is "module:Class"; settings are attributes set after the strategy's initialize()
+StrategySpec = namedtuple("StrategySpec", ["name", "path", "settings"], defaults=[None])
+
+DEFAULT_BROKER = "custom_alpaca:CustomAlpaca"  # Its BrokerClient pools connections and rate-limits for everyone
+GUARDED_HOOKS = ["before_market_opens", "before_market_closes", "after_market_closes", "on_new_order",
+                 "on_filled_order", "on_partially_filled_order", "on_canceled_order"]
+
+
+class Isolated:
+    """Strategy mixin that keeps one strategy's errors from reaching the others in the process.
+
+    on_trading_iteration and the lumibot event hooks are run inside a
+    try/except. After max_failures iterations in a row fail, the strategy
+    stops trading and logs why; the rest of the process carries on.
+    """
+
+    max_failures = 5
+    settings = {}
+
+    def initialize(self, *args, **kwargs):
+        self.failures = 0
+        self.errors = 0
+        self.last_error = None
+        self.disabled = False
+        super().initialize(*args, **kwargs)
+        for attr, value in self.settings.items():
+            setattr(self, attr, value)
+
+    def _guarded(self, hook, *args, **kwargs):
+        try:
+            result = getattr(super(), hook)(*args, **kwargs)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{hook}: {e!r}"
+            logging.exception(f"{self.name}: {hook} failed")
+            return None, False
+        return result, True
+
+    def on_trading_iteration(self):
+        if self.disabled:
+            return
+        _, ok = self._guarded("on_trading_iteration")
+        self.failures = 0 if ok else self.failures + 1
+        if self.failures >= self.max_failures:
+            self.disabled = True
+            logging.error(f"{self.name}: {self.failures} failed iterations in a row, no longer trading "
+                          f"(last error {self.last_error})")
+
+    def status(self):
+        return {"errors": self.errors, "failures": self.failures, "disabled": self.disabled,
+                "last_error": self.last_error}
+
+
+def _guard(hook):
+    def method(self, *args, **kwargs):
+        return self._guarded(hook, *args, **kwargs)[0]
+    method.__name__ = hook
+    return method
+
+
+for _hook in GUARDED_HOOKS:
+    setattr(Isolated, _hook, _guard(_hook))
+
+
+def isolated(spec, max_failures=Isolated.max_failures):
+    """The spec's Strategy class with Isolated in front, named for app.py's bot controls."""
+    cls = _load(spec.path)
+    return type(cls.__name__, (Isolated, cls), {
+        "__module__": cls.__module__,
+        "control_name": spec.name,
+        "settings": dict(spec.settings or {}),
+        "max_failures": max_failures,
+    })
+
+
+def parse_specs(args):
+    """Specs from "module:Class[=name]" arguments or one JSON file of [{name, path, settings}]."""
+    if len(args) == 1 and args[0].endswith(".json"):
+        with open(args[0]) as file:
+            return [StrategySpec(**entry) for entry in json.load(file)]
+    specs = []
+    for arg in args:
+        path, _, name = arg.partition("=")
+        specs.append(StrategySpec(name or path.partition(":")[0], path))
+    return specs
+
+
+class StrategyRunner:
+    """Many Strategy subclasses in one process, sharing a broker, bar data and indicators.
+
+    Every strategy is added to one Trader and trades on its own thread
+    against one broker instance, so there is one login, one pooled and
+    rate-limited HTTP session and one set of broker streams. Bars loaded
+    through BatchedHistory go through the process-wide HistoryCache and
+    indicators through indicator_cache, so both grow with the distinct
+    symbols traded rather than with the number of strategies. Each strategy
+    gets its own name, which lumibot uses to tell its orders and positions
+    apart and which the journal, signal store and risk book key on.
+    """
+
+    def __init__(self, specs, broker=DEFAULT_BROKER, history_max_age=30.0, max_failures=5, stats_interval=300.0):
+        names = [spec.name for spec in specs]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Strategy names must be unique, got {duplicates} more than once")
+        self.specs = list(specs)
+        self.broker_path = broker
+        self.history_max_age = history_max_age
+        self.max_failures = max_failures
+        self.stats_interval = stats_interval
+        self.broker = None
+        self.history = None
+        self.strategies = {}
+
+    def build(self, broker=None):
+        """Connect the shared broker (unless one is given) and construct every strategy."""
+        if broker is None:
+            from config import ALPACA_CONFIG
+            broker = _load(self.broker_path)(ALPACA_CONFIG)
+        self.broker = broker
+        self.history = share_history(self.history_max_age)
+        for spec in self.specs:
+            try:
+                self.strategies[spec.name] = isolated(spec, self.max_failures)(name=spec.name, broker=broker)
+            except Exception as e:
+                logging.error(f"Could not load strategy {spec.name} ({spec.path}): {e}")
+        logging.info(f"Loaded {len(self.strategies)} of {len(self.specs)} strategies on one "
+                     f"{type(broker).__name__}: {list(self.strategies)}")
+        return self.strategies
+
+    def status(self):
+        api = getattr(self.broker, "client", None)
+        return {
+            "strategies": {name: strategy.status() for name, strategy in self.strategies.items()
+                           if hasattr(strategy, "failures")},
+            "history": self.history.status() if self.history is not None else None,
+            "indicators": indicator_cache.stats(),
+            "broker": dict(getattr(api, "stats", {})),
+        }
+
+    def _report(self):
+        while True:
+            time.sleep(self.stats_interval)
+            self.history.prune()
+            logging.info(f"Runner status: {self.status()}")
+
+    def run(self):
+        from lumibot.traders import Trader
+        from sampling_profiler import install
+
+        if not self.strategies:
+            self.build()
+        trader = Trader()
+        for strategy in self.strategies.values():
+            trader.add_strategy(strategy)
+        threading.Thread(target=self._report, name="runner-status", daemon=True).start()
+        install("strategy_runner")
+        trader.run_all()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # e.g. python strategy_runner.py lumibot_trend:Trend advanced_trend:Trend ORB:OpenRangeBreakout
+        StrategyRunner(parse_specs(sys.argv[1:])).run()
+        sys.exit()
+
+    # 12 strategies over overlapping 40-symbol universes against the mock broker, each on its own
+    # thread as under lumibot, with and without the shared history cache; one strategy always fails
+    from datetime import datetime
+    import history_batch
+    from bar_scheduler import MarketCalendar
+    from broker_client import BrokerClient
+    from history_batch import BatchedHistory
+    from indicators import ema
+    from mock_broker import MockBroker
+
+    logging.basicConfig(level=logging.CRITICAL)
+    universe = [f"S{i:03d}" for i in range(60)]
+    end = datetime(2024, 5, 31, 20, 0, tzinfo=MarketCalendar().tz)
+
+    class DemoStrategy:
+        is_backtesting = False
+
+        def __init__(self, name, broker):
+            self.name = name
+            self.broker = broker
+
+        def initialize(self):
+            self.symbols = universe[:40]
+
+        def get_datetime(self):
+            return end
+
+    class Crossing(BatchedHistory, DemoStrategy):
+        def on_trading_iteration(self):
+            self.prefetch_history(self.symbols, 60)
+            for symbol in self.symbols:
+                bars = self.get_history(symbol, 60)
+                close = bars.df["close"]
+                indicator_cache.get_or_compute(symbol, "day", "ema", (20,), close, lambda data: ema(data, 20))
+
+    class Broken(DemoStrategy):
+        def on_trading_iteration(self):
+            raise RuntimeError("bad data")
+
+    class Broker:
+        pass
+
+    def run(strategies):
+        threads = [threading.Thread(target=s.on_trading_iteration) for s in strategies]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    with MockBroker(latency=0.02, page_size=10_000, symbols=universe) as mock:
+        for shared in (False, True):
+            broker = Broker()
+            broker.client = BrokerClient("key", "secret", mock.url, data_url=mock.url)
+            history_batch._shared_history = None
+            indicator_cache.clear()
+            specs = [StrategySpec(f"crossing_{i}", "__main__:Crossing", {"symbols": universe[i * 2:i * 2 + 40]})
+                     for i in range(11)]
+            runner = StrategyRunner(specs + [StrategySpec("broken", "__main__:Broken")], max_failures=3)
+            strategies = list(runner.build(broker).values())
+            if not shared:
+                runner.history = history_batch._shared_history = None
+            for strategy in strategies:
+                strategy.initialize()  # lumibot calls this when the strategy's thread starts
+            before = mock.requests["/v2/stocks/bars"]
+            started = time.perf_counter()
+            for _ in range(3):
+                run(strategies)
+            elapsed = time.perf_counter() - started
+            status = runner.status()
+            print(f"shared={shared}: 3 iterations of {len(strategies)} strategies in {elapsed:.2f}s, "
+                  f"{mock.requests['/v2/stocks/bars'] - before} bar requests, history {status['history']}")
+            print(f"  indicators {status['indicators']}, broken: {status['strategies']['broken']}")
@@ -0,0 +1,293 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+
+JOURNAL_PATH = "trade_journal.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    qty REAL NOT NULL,
+    price REAL NOT NULL,
+    order_id TEXT,
+    realized_pnl REAL NOT NULL
+);
+-- Covering indexes: P&L aggregates are answered from the index without touching the table
+CREATE INDEX IF NOT EXISTS fills_ts ON fills (ts, symbol, strategy, realized_pnl, qty);
+CREATE INDEX IF NOT EXISTS fills_symbol_ts ON fills (symbol, ts, strategy, realized_pnl, qty);
+CREATE INDEX IF NOT EXISTS fills_strategy_ts ON fills (strategy, ts, symbol, realized_pnl, qty);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    qty REAL NOT NULL,
+    type TEXT,
+    order_id TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_ts ON orders (ts);
+CREATE INDEX IF NOT EXISTS orders_symbol_ts ON orders (symbol, ts);
+CREATE INDEX IF NOT EXISTS orders_strategy_ts ON orders (strategy, ts);
+
+CREATE TABLE IF NOT EXISTS positions (
+    strategy TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    qty REAL NOT NULL,
+    avg_price REAL NOT NULL,
+    realized_pnl REAL NOT NULL,
+    updated_ts INTEGER NOT NULL,
+    PRIMARY KEY (strategy, symbol)
+);
+
+CREATE TABLE IF NOT EXISTS marks (
+    symbol TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    ts INTEGER NOT NULL
+);
+"""
+
+
+def connect(path=JOURNAL_PATH):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    # WAL lets app.py read while bot processes write
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def apply_fill(qty, avg_price, fill_qty, price):
+    """Average-cost position update. fill_qty is signed (+buy, -sell); returns (qty, avg_price, realized)."""
+    if qty == 0 or (qty > 0) == (fill_qty > 0):
+        new_qty = qty + fill_qty
+        return new_qty, (qty * avg_price + fill_qty * price) / new_qty, 0.0
+    closed = min(abs(fill_qty), abs(qty))
+    realized = closed * (price - avg_price) * (1 if qty > 0 else -1)
+    new_qty = qty + fill_qty
+    if new_qty == 0:
+        return 0.0, 0.0, realized
+    if (new_qty > 0) != (qty > 0):
+        return new_qty, price, realized  # Flipped: the remainder opens at the fill price
+    return new_qty, avg_price, realized
+
+
+class TradeJournal:
+    """Append-only journal of orders and fills in SQLite, written in batches off the hot path.
+
+    record_* calls only put a tuple on a queue; a background thread drains it and
+    writes each batch in one transaction. Realized P&L is worked out per fill at
+    write time and the positions table is kept current, so P&L queries are index
+    range sums rather than replays of the whole history.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._conn = connect(path)
+        self._thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+        self._thread.start()
+
+    def record_fill(self, strategy, symbol, side, qty, price, order_id=None, ts=None):
+        self._queue.put(("fill", ts or time.time_ns(), strategy, symbol, side, float(qty), float(price), order_id))
+
+    def record_order(self, strategy, symbol, side, qty, type=None, order_id=None, status=None, ts=None):
+        self._queue.put(("order", ts or time.time_ns(), strategy, symbol, side, float(qty), type, order_id, status))
+
+    def mark(self, symbol, price, ts=None):
+        """Record the latest price of a symbol for unrealized P&L."""
+        self._queue.put(("mark", ts or time.time_ns(), symbol, float(price)))
+
+    def flush(self, timeout=10):
+        """Block until everything queued so far is written."""
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(5)
+        self._conn.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+                if batch[-1] is None or batch[-1][0] == "flush":
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                logging.error(f"Trade journal write failed, dropped {len(batch)} records: {e}")
+            for record in batch:
+                if record is not None and record[0] == "flush":
+                    record[1].set()
+            if batch[-1] is None:
+                return
+
+    def _write(self, batch):
+        conn = self._conn
+        # IMMEDIATE takes the write lock up front so position updates from several bots can't interleave
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for record in batch:
+                if record is None:
+                    continue
+                kind = record[0]
+                if kind == "fill":
+                    self._write_fill(conn, *record[1:])
+                elif kind == "order":
+                    conn.execute("INSERT INTO orders (ts, strategy, symbol, side, qty, type, order_id, status) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", record[1:])
+                elif kind == "mark":
+                    ts, symbol, price = record[1:]
+                    conn.execute("INSERT INTO marks (symbol, price, ts) VALUES (?, ?, ?) "
+                                 "ON CONFLICT(symbol) DO UPDATE SET price = excluded.price, ts = excluded.ts "
+                                 "WHERE excluded.ts >= marks.ts", (symbol, price, ts))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _write_fill(conn, ts, strategy, symbol, side, qty, price, order_id):
+        signed = qty if side.lower() == "buy" else -qty
+        row = conn.execute("SELECT qty, avg_price, realized_pnl FROM positions WHERE strategy = ? AND symbol = ?",
+                           (strategy, symbol)).fetchone()
+        pos_qty, avg_price, total_realized = row if row else (0.0, 0.0, 0.0)
+        pos_qty, avg_price, realized = apply_fill(pos_qty, avg_price, signed, price)
+        conn.execute("INSERT INTO fills (ts, strategy, symbol, side, qty, price, order_id, realized_pnl) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (ts, strategy, symbol, side, qty, price, order_id, realized))
+        conn.execute("INSERT OR REPLACE INTO positions (strategy, symbol, qty, avg_price, realized_pnl, updated_ts) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", (strategy, symbol, pos_qty, avg_price, total_realized + realized, ts))
+
+
+GROUP_COLUMNS = {"symbol": "symbol", "strategy": "strategy", "day": "date(ts / 1000000000, 'unixepoch')"}
+
+
+def realized_pnl(conn, start=None, end=None, group_by="symbol", symbol=None, strategy=None):
+    """Realized P&L, fill count and traded quantity per group over a time range (ns timestamps)."""
+    column = GROUP_COLUMNS[group_by]
+    where, params = ["1 = 1"], []
+    for clause, value in (("ts >= ?", start), ("ts < ?", end), ("symbol = ?", symbol), ("strategy = ?", strategy)):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+    rows = conn.execute(f"SELECT {column} AS key, SUM(realized_pnl), COUNT(*), SUM(qty) FROM fills "
+                        f"WHERE {' AND '.join(where)} GROUP BY key ORDER BY key", params).fetchall()
+    return [{group_by: key, "realized_pnl": pnl, "fills": fills, "quantity": qty} for key, pnl, fills, qty in rows]
+
+
+def unrealized_pnl(conn, strategy=None):
+    """Open positions valued at their latest mark."""
+    sql = ("SELECT p.strategy, p.symbol, p.qty, p.avg_price, m.price, (m.price - p.avg_price) * p.qty "
+           "FROM positions p LEFT JOIN marks m ON m.symbol = p.symbol WHERE p.qty != 0")
+    params = []
+    if strategy is not None:
+        sql += " AND p.strategy = ?"
+        params.append(strategy)
+    return [{"strategy": s, "symbol": sym, "qty": q, "avg_price": avg, "mark": mark, "unrealized_pnl": pnl}
+            for s, sym, q, avg, mark, pnl in conn.execute(sql, params)]
+
+
+def pnl_summary(conn, strategy=None):
+    """Total realized and unrealized P&L per strategy."""
+    sql = ("SELECT p.strategy, SUM(p.realized_pnl), SUM(CASE WHEN p.qty != 0 THEN (m.price - p.avg_price) * p.qty END) "
+           "FROM positions p LEFT JOIN marks m ON m.symbol = p.symbol")
+    params = []
+    if strategy is not None:
+        sql += " WHERE p.strategy = ?"
+        params.append(strategy)
+    sql += " GROUP BY p.strategy"
+    return [{"strategy": s, "realized_pnl": realized or 0.0, "unrealized_pnl": unrealized or 0.0}
+            for s, realized, unrealized in conn.execute(sql, params)]
+
+
+# One journal per process, created on first use
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = TradeJournal()
+        return _journal
+
+
+class TradeJournaling:
+    """Strategy mixin that journals lumibot order and fill events.
+
+    Backtests leave the live journal alone: their simulated trades would land
+    in trade_journal.db stamped with wall-clock time.
+    """
+
+    def journal_order(self, symbol, side, qty, type=None, order_id=None, status=None):
+        """For orders sent straight to the broker API, which bypass lumibot's order events."""
+        if not self.is_backtesting:
+            get_journal().record_order(self.name, symbol, side, qty, type=type, order_id=order_id, status=status)
+
+    def journal_mark(self, symbol, price):
+        """Record the iteration's price of a symbol, so unrealized P&L moves between fills."""
+        if not self.is_backtesting:
+            get_journal().mark(symbol, price)
+
+    def journal_fill(self, symbol, side, qty, price, order_id=None):
+        """Record a fill and mark the symbol at its price."""
+        if self.is_backtesting:
+            return
+        journal = get_journal()
+        journal.record_fill(self.name, symbol, side, qty, price, order_id=order_id)
+        journal.mark(symbol, price)
+
+    def on_new_order(self, order):
+        self.journal_order(order.asset.symbol, order.side, order.quantity, type=getattr(order, "type", None),
+                           order_id=order.identifier, status="new")
+
+    def on_filled_order(self, position, order, price, quantity, multiplier):
+        self.journal_fill(order.asset.symbol, order.side, quantity * multiplier, price, order_id=order.identifier)
+
+
+if __name__ == "__main__":
+    # Unrealized P&L follows iteration marks between fills, not just the last fill price
+    import os
+    import tempfile
+
+    class Demo(TradeJournaling):
+        name = "demo"
+        is_backtesting = False
+
+    path = os.path.join(tempfile.mkdtemp(), "journal.db")
+    _journal = TradeJournal(path)
+    strategy = Demo()
+    strategy.journal_fill("SPY", "buy", 10, 100.0)
+    _journal.flush()
+    conn = connect(path)
+    at_fill = unrealized_pnl(conn)[0]["unrealized_pnl"]
+    strategy.journal_mark("SPY", 104.5)
+    _journal.flush()
+    marked = unrealized_pnl(conn)[0]["unrealized_pnl"]
+    print(f"unrealized at fill {at_fill:.2f}, after a mark at 104.50 {marked:.2f}; summary {pnl_summary(conn)}")
+    assert at_fill == 0 and marked == 45.0, "marks between fills must move unrealized P&L"
+    _journal.close()
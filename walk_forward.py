@@ -0,0 +1,173 @@
+from concurrent.futures import ProcessPoolExecutor
+import datetime as dt
+from itertools import product
+import numpy as np
+import pandas as pd
+import indicators
+
+
+class IndicatorColumns:
+    """Indicator columns over the full history, computed once per parameter value.
+
+    Every fold reads slices of the same columns, so an EMA span or RSI period that
+    appears in many parameter combinations and overlapping folds is only computed
+    a single time.
+    """
+
+    def __init__(self, close):
+        self.close = close
+        self.columns = {}
+        self.computed = 0
+
+    def get(self, name, param, compute):
+        key = (name, param)
+        if key not in self.columns:
+            self.columns[key] = compute(param)
+            self.computed += 1
+        return self.columns[key]
+
+    def ema(self, span):
+        return self.get("ema", span, lambda s: self.close.ewm(span=s, adjust=False).mean().to_numpy())
+
+    def rsi(self, period):
+        return self.get("rsi", period, self._rsi)
+
+    def _rsi(self, period):
+        # Same rolling-mean RSI as lumibot_mod
+        return indicators.rsi(self.close, period, method="sma_partial").to_numpy()
+
+
+def ema_rsi_positions(columns, params):
+    """Long while the short EMA is above the long EMA and RSI isn't overbought, short in the mirror case."""
+    short = columns.ema(params["ema_short"])
+    long = columns.ema(params["ema_long"])
+    rsi = columns.rsi(params["rsi_period"])
+    position = np.where((short > long) & (rsi < params["rsi_overbought"]), 1.0, 0.0)
+    position = np.where((short < long) & (rsi > params["rsi_oversold"]), -1.0, position)
+    return position
+
+
+def parameter_grid(grid):
+    """Expand {name: [values]} into a list of parameter dicts, skipping short >= long EMAs."""
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in product(*(grid[n] for n in names))]
+    return [p for p in combos if p.get("ema_short", 0) < p.get("ema_long", np.inf)]
+
+
+def strategy_returns(close, combos, positions=ema_rsi_positions):
+    """Log returns of every parameter combination as a (bars x combos) matrix.
+
+    Positions are shifted one bar so a signal on today's close earns tomorrow's return.
+    """
+    columns = IndicatorColumns(close)
+    returns = np.log(close).diff().fillna(0).to_numpy()
+    matrix = np.empty((len(close), len(combos)))
+    for i, params in enumerate(combos):
+        position = np.roll(positions(columns, params), 1)
+        position[0] = 0
+        matrix[:, i] = position * returns
+    return matrix, columns.computed
+
+
+def make_folds(bars, train_size, test_size, step=None):
+    """Rolling (train, test) index ranges that walk forward through the history."""
+    step = step or test_size
+    folds = []
+    start = 0
+    while start + train_size + test_size <= bars:
+        train = (start, start + train_size)
+        test = (start + train_size, start + train_size + test_size)
+        folds.append((train, test))
+        start += step
+    return folds
+
+
+def sharpe(returns, periods_per_year=252):
+    """Annualized Sharpe ratio for each column of a returns matrix."""
+    std = returns.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = returns.mean(axis=0) / std * np.sqrt(periods_per_year)
+    return np.where(std > 0, ratio, -np.inf)
+
+
+# Set once per worker process so the returns matrix isn't pickled for every fold
+_worker_returns = None
+
+
+def _init_worker(returns):
+    global _worker_returns
+    _worker_returns = returns
+
+
+def _run_fold(fold):
+    (train_start, train_end), (test_start, test_end) = fold
+    train_scores = sharpe(_worker_returns[train_start:train_end])
+    best = int(np.argmax(train_scores))
+    test_returns = _worker_returns[test_start:test_end, best]
+    return best, float(train_scores[best]), test_returns
+
+
+def walk_forward(close, grid, train_size=252, test_size=63, step=None, workers=None,
+                 positions=ema_rsi_positions):
+    """Walk-forward optimization with a stitched out-of-sample equity curve.
+
+    Each fold picks the parameter combination with the best in-sample Sharpe on its
+    training window and trades it on the following test window. Folds run in a
+    process pool; workers=1 runs them inline. Returns (folds, equity) where folds is
+    a DataFrame describing each fold and equity is the compounded out-of-sample
+    equity curve starting at 1.
+    """
+    combos = parameter_grid(grid)
+    returns, computed = strategy_returns(close, combos, positions)
+    folds = make_folds(len(close), train_size, test_size, step)
+    if not folds:
+        raise ValueError(f"Need at least {train_size + test_size} bars, got {len(close)}")
+
+    if workers == 1:
+        _init_worker(returns)
+        results = [_run_fold(fold) for fold in folds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(returns,)) as pool:
+            results = list(pool.map(_run_fold, folds))
+
+    index = close.index
+    rows = []
+    oos = []
+    for ((train_start, train_end), (test_start, test_end)), (best, train_sharpe, test_returns) in zip(folds, results):
+        rows.append({
+            "train_start": index[train_start],
+            "train_end": index[train_end - 1],
+            "test_start": index[test_start],
+            "test_end": index[test_end - 1],
+            **combos[best],
+            "train_sharpe": train_sharpe,
+            "test_sharpe": float(sharpe(test_returns[:, None])[0]),
+        })
+        oos.append(pd.Series(test_returns, index=index[test_start:test_end]))
+
+    # Overlapping test windows (step < test_size) keep the later fold's returns
+    oos_returns = pd.concat(oos)
+    oos_returns = oos_returns[~oos_returns.index.duplicated(keep="last")]
+    equity = np.exp(oos_returns.cumsum())
+    folds_df = pd.DataFrame(rows)
+    folds_df.attrs["indicator_columns_computed"] = computed
+    folds_df.attrs["combinations"] = len(combos)
+    return folds_df, equity
+
+
+if __name__ == "__main__":
+    import yfinance as yf
+
+    data = yf.download("SPY", start="2005-01-01", end=dt.date.today())
+    close = data["Close"].squeeze()
+    grid = {
+        "ema_short": [5, 9, 13, 20],
+        "ema_long": [21, 26, 48, 100],
+        "rsi_period": [7, 14, 21],
+        "rsi_oversold": [20, 30],
+        "rsi_overbought": [70, 80],
+    }
+    folds, equity = walk_forward(close, grid, train_size=504, test_size=126)
+    print(folds)
+    print(f"{folds.attrs['combinations']} combinations, {folds.attrs['indicator_columns_computed']} indicator columns computed")
+    print(f"Out-of-sample return: {equity.iloc[-1] - 1:.2%}")
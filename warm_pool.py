@@ -0,0 +1,220 @@
+import importlib
+import logging
+import multiprocessing as mp
+import subprocess
+import sys
+import threading
+import time
+
+
+# Imported once per worker before any strategy is dispatched to it
+HEAVY_MODULES = ["numpy", "pandas", "talib", "alpaca_trade_api", "lumibot.brokers", "lumibot.strategies",
+                 "lumibot.traders", "config", "custom_alpaca"]
+DEFAULT_BROKER = "custom_alpaca:CustomAlpaca"  # lumibot's Alpaca plus the pooled BrokerClient
+
+
+def _load(path):
+    """Resolve 'package.module:attr' to the attribute."""
+    module, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _worker_main(conn, modules, brokers):
+    """Body of a warm worker: import heavy modules, log in, then wait for a strategy."""
+    started = time.perf_counter()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logging.warning(f"Warm worker could not preload {name}: {e}")
+    imported = time.perf_counter()
+
+    from config import ALPACA_CONFIG
+    ready_brokers = {}
+    for path in brokers:
+        try:
+            ready_brokers[path] = _load(path)(ALPACA_CONFIG)
+        except Exception as e:
+            logging.warning(f"Warm worker could not connect {path}: {e}")
+    conn.send(("ready", {"import_seconds": imported - started, "login_seconds": time.perf_counter() - imported}))
+
+    job = conn.recv()
+    if job is None:
+        return
+    dispatched = time.perf_counter()
+    module_name, class_name, broker_path = job
+    try:
+        from lumibot.traders import Trader
+        strategy_class = getattr(importlib.import_module(module_name), class_name)
+        broker = ready_brokers.pop(broker_path, None) or _load(broker_path)(ALPACA_CONFIG)
+        strategy = strategy_class(broker=broker)
+        trader = Trader()
+        trader.add_strategy(strategy)
+    except Exception as e:
+        conn.send(("error", repr(e)))
+        return
+    conn.send(("started", {"dispatch_seconds": time.perf_counter() - dispatched}))
+    conn.close()
+    # app.py can profile the bot on demand through bot_control (POST /profile/start)
+    from sampling_profiler import install
+    install(module_name)
+    trader.run_all()
+
+
+class WarmProcess:
+    """A dispatched worker, with the poll/terminate/wait interface of subprocess.Popen."""
+
+    def __init__(self, process, timings):
+        self.process = process
+        self.pid = process.pid
+        self.timings = timings
+
+    def poll(self):
+        return None if self.process.is_alive() else self.process.exitcode
+
+    def terminate(self):
+        self.process.terminate()
+
+    def wait(self, timeout=None):
+        self.process.join(timeout)
+        return self.process.exitcode
+
+
+class WarmPool:
+    """Pre-started Python workers with lumibot, pandas, numpy, talib and the broker already loaded.
+
+    launch() hands a strategy to an idle worker, so it skips the interpreter,
+    import and broker login cost, and the pool immediately starts a replacement in
+    the background to stay warm for the next launch (e.g. a restart after a crash).
+    """
+
+    def __init__(self, size=1, modules=None, brokers=(DEFAULT_BROKER,)):
+        self.size = size
+        self.modules = HEAVY_MODULES if modules is None else modules
+        self.brokers = list(brokers)
+        # forkserver keeps workers clean of the parent's threads; Windows only has spawn
+        method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        self.context = mp.get_context(method)
+        self.idle = []
+        self.warming = 0  # Workers started but not yet idle
+        self._lock = threading.Lock()
+
+    def _spawn(self):
+        parent, child = self.context.Pipe()
+        process = self.context.Process(target=_worker_main, args=(child, self.modules, self.brokers), daemon=False)
+        process.start()
+        child.close()
+        return process, parent
+
+    def _warm_one(self):
+        started = time.perf_counter()
+        try:
+            process, conn = self._spawn()
+            try:
+                status, timings = conn.recv()
+            except EOFError:
+                logging.error("Warm worker exited during warm-up")
+                return
+            timings["warm_seconds"] = time.perf_counter() - started
+            logging.info(f"Warm worker {process.pid} ready: {timings}")
+            with self._lock:
+                self.idle.append((process, conn, timings))
+        finally:
+            with self._lock:
+                self.warming -= 1
+
+    def start(self):
+        """Warm workers in the background until the pool is full, counting those already warming."""
+        with self._lock:
+            missing = max(0, self.size - len(self.idle) - self.warming)
+            self.warming += missing
+        for _ in range(missing):
+            threading.Thread(target=self._warm_one, daemon=True).start()
+
+    def _take_idle(self):
+        """Pop the first idle worker that is still alive, discarding dead ones."""
+        with self._lock:
+            while self.idle:
+                process, conn, timings = self.idle.pop(0)
+                if process.is_alive():
+                    return process, conn, timings
+                logging.warning(f"Warm worker {process.pid} died while idle (exit code {process.exitcode})")
+                conn.close()
+        return None
+
+    def _spawn_cold(self):
+        process, conn = self._spawn()
+        try:
+            _, timings = conn.recv()
+        except EOFError:
+            conn.close()
+            process.join(5)
+            raise RuntimeError(f"Cold worker exited before it was ready (exit code {process.exitcode})") from None
+        return process, conn, timings
+
+    def launch(self, module_name, class_name, broker=DEFAULT_BROKER):
+        """Run a Strategy subclass in a warm worker, falling back to a cold one if none is idle.
+
+        Returns a WarmProcess whose timings hold the measured startup time.
+        """
+        started = time.perf_counter()
+        try:
+            while True:
+                entry = self._take_idle()
+                warm = entry is not None
+                if entry is None:
+                    logging.info("No warm worker idle, starting a cold one")
+                    entry = self._spawn_cold()
+                process, conn, timings = entry
+                try:
+                    conn.send((module_name, class_name, broker))
+                    status, result = conn.recv()
+                    break
+                except (EOFError, OSError) as e:  # BrokenPipeError is an OSError
+                    conn.close()
+                    if not warm:
+                        process.join(5)
+                        raise RuntimeError(f"{module_name}.{class_name}: worker exited before starting it ({e!r})")
+                    logging.warning(f"Warm worker {process.pid} failed at dispatch ({e!r}), trying another")
+        finally:
+            self.start()  # Replace the workers we used or discarded
+        conn.close()
+        if status == "error":
+            process.join(5)
+            raise RuntimeError(f"{module_name}.{class_name} failed to start: {result}")
+
+        timings = dict(timings, **result, warm=warm, startup_seconds=time.perf_counter() - started)
+        logging.info(f"{module_name}.{class_name} started in {timings['startup_seconds']:.3f}s "
+                     f"({'warm' if warm else 'cold'} worker)")
+        return WarmProcess(process, timings)
+
+    def shutdown(self):
+        """Stop idle workers; dispatched bots keep running until stopped."""
+        with self._lock:
+            idle, self.idle = self.idle, []
+        for process, conn, _ in idle:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(5)
+
+
+def cold_start_seconds(modules=None):
+    """Time a fresh interpreter importing the heavy modules, for comparison with a warm launch."""
+    modules = HEAVY_MODULES if modules is None else modules
+    code = "; ".join(f"__import__('{m}')" for m in modules)
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=False, capture_output=True)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Cold interpreter + imports: {cold_start_seconds():.2f}s")
+    pool = WarmPool(size=1)
+    pool.start()
+    while not pool.idle:
+        time.sleep(0.1)
+    print(f"Warm worker ready: {pool.idle[0][2]}")
+    pool.shutdown()